@@ -0,0 +1,232 @@
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from .config import logging
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+COMPRESSIBLE_TYPES: frozenset[str] = frozenset({
+  'text/css', 'text/html', 'text/plain', 'text/javascript', 'application/javascript',
+  'application/json', 'image/svg+xml'
+})
+ENCODING_PREFERENCE: Tuple[str, ...] = ('br', 'gzip', 'identity')
+IMMUTABLE_CACHE_CONTROL: str = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL: str = 'no-cache'
+STATIC_URL_PATTERN: re.Pattern = re.compile(r'((?:href|src)=["\'])/static/([^"\'?#]+)')
+
+
+def hashed_name(path: str, digest: str) -> str:
+  posix_path = PurePosixPath(path)
+  return str(posix_path.with_name(f"{posix_path.stem}.{digest}{posix_path.suffix}"))
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+  weights: Dict[str, float] = {}
+  for part in header.split(','):
+    coding, _, params = part.strip().partition(';')
+    coding = coding.strip().lower()
+    if not coding:
+      continue
+    weight = 1.0
+    params = params.strip()
+    if params.startswith('q='):
+      try:
+        weight = float(params[2:])
+      except ValueError:
+        weight = 0.0
+    weights[coding] = weight
+  return weights
+
+
+def choose_encoding(header: str, available: List[str]) -> str:
+  weights = parse_accept_encoding(header)
+  wildcard = weights.get('*', 0.0)
+  best, best_weight = 'identity', 0.0
+  for coding in ENCODING_PREFERENCE:
+    if coding not in available or coding == 'identity':
+      continue
+    weight = weights.get(coding, wildcard)
+    if weight > best_weight:
+      best, best_weight = coding, weight
+  return best
+
+
+def etag_matches(header: str, etag: str) -> bool:
+  candidates = [candidate.strip() for candidate in header.split(',')]
+  return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def header_value(scope: Scope, name: bytes) -> str:
+  for key, value in scope.get('headers', []):
+    if key == name:
+      return value.decode('latin-1')
+  return ''
+
+
+def conditional_response(scope: Scope, content: bytes, etag: str, media_type: str,
+                         cache_control: str, encoding: str = 'identity', vary: bool = False) -> Response:
+  headers = {'ETag': etag, 'Cache-Control': cache_control}
+  if vary:
+    headers['Vary'] = 'Accept-Encoding'
+  if etag_matches(header_value(scope, b'if-none-match'), etag):
+    return Response(status_code=304, headers=headers)
+  if encoding != 'identity':
+    headers['Content-Encoding'] = encoding
+  if scope['method'] == 'HEAD':
+    headers['Content-Length'] = str(len(content))
+    return Response(status_code=200, headers=headers, media_type=media_type)
+  return Response(content, headers=headers, media_type=media_type)
+
+
+class StaticAsset:
+  def __init__(self, path: str, content: bytes):
+    self.path = path
+    self.digest = hashlib.sha256(content).hexdigest()[:12]
+    self.hashed_path = hashed_name(path, self.digest)
+    self.media_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    self.variants: Dict[str, bytes] = {'identity': content}
+
+  def compress(self, min_size: int, gzip_level: int, brotli_quality: int) -> None:
+    content = self.variants['identity']
+    if self.media_type not in COMPRESSIBLE_TYPES or len(content) < min_size:
+      return
+    compressed = {'gzip': gzip.compress(content, compresslevel=gzip_level, mtime=0)}
+    if brotli is not None:
+      compressed['br'] = brotli.compress(content, quality=brotli_quality)
+    for encoding, data in compressed.items():
+      if len(data) < len(content):
+        self.variants[encoding] = data
+
+  def etag(self, encoding: str) -> str:
+    return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+
+class StaticAssets:
+  def __init__(self, directory: Path, prefix: str = '/static', min_size: int = 512,
+               gzip_level: int = 9, brotli_quality: int = 11):
+    self._directory = Path(directory)
+    self._prefix = prefix.rstrip('/')
+    self._min_size = min_size
+    self._gzip_level = gzip_level
+    self._brotli_quality = brotli_quality
+    self._assets: Dict[str, StaticAsset] = {}
+    self._routes: Dict[str, Tuple[StaticAsset, bool]] = {}
+
+  @property
+  def loaded(self) -> bool:
+    return bool(self._assets)
+
+  def load(self) -> None:
+    assets: Dict[str, StaticAsset] = {}
+    for file_path in sorted(self._directory.rglob('*')):
+      if not file_path.is_file():
+        continue
+      path = file_path.relative_to(self._directory).as_posix()
+      asset = StaticAsset(path, file_path.read_bytes())
+      previous = self._assets.get(path)
+      if previous is not None and previous.digest == asset.digest:
+        asset = previous
+      else:
+        asset.compress(self._min_size, self._gzip_level, self._brotli_quality)
+      assets[path] = asset
+    routes: Dict[str, Tuple[StaticAsset, bool]] = {}
+    for asset in assets.values():
+      routes[asset.path] = (asset, False)
+      routes[asset.hashed_path] = (asset, True)
+    self._assets, self._routes = assets, routes
+    logging.info(f"Загружено статических файлов: {len(assets)}")
+
+  def signature(self) -> Tuple[Tuple[str, int, int], ...]:
+    entries = []
+    for file_path in sorted(self._directory.rglob('*')):
+      if file_path.is_file():
+        stat = file_path.stat()
+        entries.append((file_path.as_posix(), stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+  def url_for(self, path: str) -> str:
+    asset = self._assets.get(path.lstrip('/'))
+    return f"{self._prefix}/{asset.hashed_path if asset else path.lstrip('/')}"
+
+  def response(self, scope: Scope, path: str) -> Response:
+    route = self._routes.get(path)
+    if route is None:
+      return Response("Not Found", status_code=404, media_type='text/plain')
+    asset, immutable = route
+    encoding = choose_encoding(header_value(scope, b'accept-encoding'), list(asset.variants))
+    return conditional_response(
+      scope, asset.variants[encoding], asset.etag(encoding), asset.media_type,
+      IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+      encoding=encoding, vary=len(asset.variants) > 1
+    )
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope['method'] not in ('GET', 'HEAD'):
+      response = Response("Method Not Allowed", status_code=405, headers={'Allow': 'GET, HEAD'})
+    else:
+      if not self.loaded:
+        self.load()
+      path = scope['path']
+      root_path = scope.get('root_path', '')
+      if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+      response = self.response(scope, path.lstrip('/'))
+    await response(scope, receive, send)
+
+
+class IndexPage:
+  def __init__(self, file_path: Path, assets: StaticAssets, min_size: int = 512,
+               gzip_level: int = 9, brotli_quality: int = 11):
+    self._file_path = Path(file_path)
+    self._assets = assets
+    self._min_size = min_size
+    self._gzip_level = gzip_level
+    self._brotli_quality = brotli_quality
+    self._page: Optional[StaticAsset] = None
+
+  @property
+  def loaded(self) -> bool:
+    return self._page is not None
+
+  def render(self) -> None:
+    html = self._file_path.read_text(encoding='utf-8')
+    rendered = STATIC_URL_PATTERN.sub(lambda match: match.group(1) + self._assets.url_for(match.group(2)), html)
+    page = StaticAsset(self._file_path.name, rendered.encode('utf-8'))
+    page.compress(self._min_size, self._gzip_level, self._brotli_quality)
+    self._page = page
+
+  def reload(self) -> None:
+    self._assets.load()
+    self.render()
+
+  def response(self, scope: Scope) -> Response:
+    if not self.loaded:
+      self.reload()
+    page = self._page
+    encoding = choose_encoding(header_value(scope, b'accept-encoding'), list(page.variants))
+    return conditional_response(
+      scope, page.variants[encoding], page.etag(encoding), 'text/html', REVALIDATE_CACHE_CONTROL,
+      encoding=encoding, vary=len(page.variants) > 1
+    )
+
+  async def watch(self, interval: float = 1.0) -> None:
+    signature = await asyncio.to_thread(self._assets.signature)
+    while True:
+      await asyncio.sleep(interval)
+      try:
+        current = await asyncio.to_thread(self._assets.signature)
+        if current != signature:
+          await asyncio.to_thread(self.reload)
+          signature = current
+          logging.info("Статические файлы изменились, главная страница перестроена")
+      except Exception as e:
+        logging.error(f"Ошибка перезагрузки статических файлов: {e}")
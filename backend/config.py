@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 import logging
 from pydantic_settings import BaseSettings
 from pydantic import Field, EmailStr, ConfigDict
@@ -11,12 +12,89 @@ class Settings(BaseSettings):
   smtp_port: int = Field(default=465, env='APP_SMTP_PORT', description="SMTP server port", ge=1, le=65535)
   smtp_user: str = Field(default='team.terrasite@yandex.ru', env='APP_SMTP_USER', description="SMTP auth username")
   smtp_password: str = Field(default='lncsiaezbmfjaltp', env='APP_SMTP_PASSWORD', description="SMTP auth password")
+  smtp_use_tls: bool = Field(default=True, env='APP_SMTP_USE_TLS', description="Connect to SMTP over implicit TLS")
+  smtp_pool_size: int = Field(default=2, env='APP_SMTP_POOL_SIZE', ge=0,
+                              description="Persistent SMTP connections per worker, 0 disables pooling")
+  smtp_idle_timeout: float = Field(default=60.0, env='APP_SMTP_IDLE_TIMEOUT', gt=0,
+                                   description="Seconds before an idle SMTP connection is dropped")
   from_email: EmailStr = Field(default='team.terrasite@yandex.ru', env='APP_FROM_EMAIL',
                                description="Sender email address")
   to_email: EmailStr = Field(default='team.terrasite@yandex.ru', env='APP_TO_EMAIL',
                              description="Recipient email address")
   leads_file: Path = Field(default=BASE_DIR / "data" / "leads.json", env='APP_LEADS_FILE',
                            description="Path to leads JSON file")
+  leads_storage: Literal['json', 'jsonl', 'sqlite', 'segmented'] = Field(default='json', env='APP_LEADS_STORAGE',
+                                                                         description="Lead storage backend")
+  leads_cache: bool = Field(default=True, env='APP_LEADS_CACHE', description="Keep parsed leads in memory for json and jsonl storage")
+  json_serializer: Literal['auto', 'orjson', 'json'] = Field(default='auto', env='APP_JSON_SERIALIZER',
+                                                             description="JSON library for storage and responses, auto prefers orjson")
+  lead_id_block_size: int = Field(default=1, env='APP_LEAD_ID_BLOCK_SIZE', ge=1,
+                                  description="Lead IDs reserved per counter file or SQLite sequence access")
+  write_batch_size: int = Field(default=100, env='APP_WRITE_BATCH_SIZE', ge=1,
+                                description="Leads persisted per group commit, 1 disables batching")
+  write_batch_delay: float = Field(default=0.002, env='APP_WRITE_BATCH_DELAY', ge=0,
+                                   description="Seconds to collect concurrent writes into one commit")
+  import_batch_size: int = Field(default=1000, env='APP_IMPORT_BATCH_SIZE', ge=1,
+                                 description="Records validated and written per bulk import batch")
+  import_token: str = Field(default='', env='APP_IMPORT_TOKEN',
+                            description="Bearer token for the bulk import endpoint, empty disables it")
+  import_max_body_size: int = Field(default=50 * 1024 * 1024, env='APP_IMPORT_MAX_BODY_SIZE', ge=1,
+                                    description="Largest accepted import upload in bytes")
+  export_chunk_rows: int = Field(default=500, env='APP_EXPORT_CHUNK_ROWS', ge=1,
+                                 description="Rows buffered per chunk of a streamed lead export")
+  export_gzip_level: int = Field(default=6, env='APP_EXPORT_GZIP_LEVEL', ge=1, le=9,
+                                 description="gzip level for streamed CSV exports")
+  stats_rebuild_interval: float = Field(default=3600.0, env='APP_STATS_REBUILD_INTERVAL', ge=0,
+                                        description="Seconds between full rebuilds of lead indexes and statistics, 0 disables")
+  duplicate_checker: Literal['scan', 'index', 'redis'] = Field(default='scan', env='APP_DUPLICATE_CHECKER',
+                                                               description="Duplicate detection strategy")
+  duplicate_window_seconds: int = Field(default=300, env='APP_DUPLICATE_WINDOW_SECONDS', ge=1,
+                                        description="Window for repeated submissions from one contact")
+  redis_url: str = Field(default='redis://localhost:6379/0', env='APP_REDIS_URL',
+                         description="Redis URL for state shared between workers")
+  rate_limit_enabled: bool = Field(default=True, env='APP_RATE_LIMIT_ENABLED', description="Limit form submissions")
+  rate_limit_store: Literal['memory', 'redis'] = Field(default='memory', env='APP_RATE_LIMIT_STORE',
+                                                       description="Where token buckets are kept")
+  rate_limit_ip_per_minute: float = Field(default=6.0, env='APP_RATE_LIMIT_IP_PER_MINUTE', gt=0,
+                                          description="Sustained submissions per client IP")
+  rate_limit_ip_burst: int = Field(default=10, env='APP_RATE_LIMIT_IP_BURST', ge=1,
+                                   description="Submissions a client IP may send at once")
+  rate_limit_contact_per_minute: float = Field(default=0.2, env='APP_RATE_LIMIT_CONTACT_PER_MINUTE', gt=0,
+                                               description="Sustained submissions per contact")
+  rate_limit_contact_burst: int = Field(default=3, env='APP_RATE_LIMIT_CONTACT_BURST', ge=1,
+                                        description="Submissions one contact may send at once")
+  rate_limit_max_body_size: int = Field(default=65536, env='APP_RATE_LIMIT_MAX_BODY_SIZE', ge=1,
+                                        description="Largest accepted form body in bytes")
+  rate_limit_import_per_minute: float = Field(default=2.0, env='APP_RATE_LIMIT_IMPORT_PER_MINUTE', gt=0,
+                                              description="Sustained bulk imports per client IP")
+  rate_limit_import_burst: int = Field(default=3, env='APP_RATE_LIMIT_IMPORT_BURST', ge=1,
+                                       description="Bulk imports a client IP may start at once")
+  rate_limit_max_keys: int = Field(default=10000, env='APP_RATE_LIMIT_MAX_KEYS', ge=1,
+                                   description="Token buckets kept in memory before eviction")
+  rate_limit_trust_forwarded: bool = Field(default=False, env='APP_RATE_LIMIT_TRUST_FORWARDED',
+                                           description="Take the client IP from X-Forwarded-For")
+  rate_limit_proxy_hops: int = Field(default=1, env='APP_RATE_LIMIT_PROXY_HOPS', ge=1,
+                                     description="Trusted proxies that append to X-Forwarded-For")
+  notification_mode: Literal['inline', 'queue', 'digest'] = Field(default='queue', env='APP_NOTIFICATION_MODE',
+                                                                  description="How lead notifications are sent")
+  notification_queue_size: int = Field(default=1000, env='APP_NOTIFICATION_QUEUE_SIZE', ge=1,
+                                       description="Maximum queued notifications")
+  notification_max_attempts: int = Field(default=5, env='APP_NOTIFICATION_MAX_ATTEMPTS', ge=1,
+                                         description="Delivery attempts per notification")
+  notification_retry_delay: float = Field(default=1.0, env='APP_NOTIFICATION_RETRY_DELAY', ge=0,
+                                          description="Initial retry backoff in seconds")
+  notification_digest_window: float = Field(default=60.0, env='APP_NOTIFICATION_DIGEST_WINDOW', gt=0,
+                                            description="Seconds to collect leads into one digest")
+  notification_digest_size: int = Field(default=20, env='APP_NOTIFICATION_DIGEST_SIZE', ge=1,
+                                        description="Leads that trigger an immediate digest")
+  static_compress_min_size: int = Field(default=512, env='APP_STATIC_COMPRESS_MIN_SIZE', ge=0,
+                                        description="Smallest static file worth compressing, in bytes")
+  static_gzip_level: int = Field(default=9, env='APP_STATIC_GZIP_LEVEL', ge=1, le=9,
+                                 description="gzip level for precompressed static files")
+  static_brotli_quality: int = Field(default=11, env='APP_STATIC_BROTLI_QUALITY', ge=0, le=11,
+                                     description="Brotli quality for precompressed static files")
+  static_watch_interval: float = Field(default=1.0, env='APP_STATIC_WATCH_INTERVAL', ge=0,
+                                       description="Seconds between static file change checks, 0 disables")
   log_file: Path = Field(default=BASE_DIR / "data" / "app.log", env='APP_LOG_FILE', description="Path to log file")
 
   model_config = ConfigDict(
@@ -0,0 +1,172 @@
+import codecs
+import csv
+import io
+import re
+import zipfile
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+from .config import config
+from .schemas import Lead
+from .serialization import serializer
+
+EXPORT_COLUMNS: List[str] = [
+  'id', 'timestamp', 'name', 'services', 'description', 'budget', 'contact_method',
+  'phone', 'telegram', 'phone_number', 'call_time', 'email'
+]
+FORMULA_PREFIXES: Tuple[str, ...] = ('=', '+', '-', '@', '\t', '\r')
+CSV_MEDIA_TYPE: str = 'text/csv; charset=utf-8'
+JSON_MEDIA_TYPE: str = 'application/json'
+XLSX_MEDIA_TYPE: str = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+_XML_ILLEGAL: re.Pattern = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XLSX_PARTS: Dict[str, str] = {
+  '[Content_Types].xml': (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+  ),
+  '_rels/.rels': (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+  ),
+  'xl/workbook.xml': (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+    '<sheets><sheet name="Заявки" sheetId="1" r:id="rId1"/></sheets></workbook>'
+  ),
+  'xl/_rels/workbook.xml.rels': (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+  )
+}
+_SHEET_HEADER: bytes = (
+  f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><worksheet xmlns="{_MAIN_NS}"><sheetData>'
+).encode('utf-8')
+_SHEET_FOOTER: bytes = b'</sheetData></worksheet>'
+
+
+def lead_row(lead: Lead) -> List[Any]:
+  row: List[Any] = []
+  for column in EXPORT_COLUMNS:
+    value = getattr(lead, column, None)
+    if value is None:
+      value = ''
+    elif column == 'services':
+      value = '; '.join(value)
+    elif column == 'timestamp':
+      value = value.isoformat()
+    row.append(value)
+  return row
+
+
+def csv_row(lead: Lead) -> List[Any]:
+  return [
+    f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+    for value in lead_row(lead)
+  ]
+
+
+def xlsx_row(values: List[Any]) -> str:
+  cells = []
+  for value in values:
+    if isinstance(value, int):
+      cells.append(f'<c><v>{value}</v></c>')
+    else:
+      text = escape(_XML_ILLEGAL.sub('', str(value)))
+      cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+  return f"<row>{''.join(cells)}</row>"
+
+
+class _ChunkWriter:
+  def __init__(self):
+    self._chunks: List[bytes] = []
+
+  def write(self, data: bytes) -> int:
+    self._chunks.append(bytes(data))
+    return len(data)
+
+  def flush(self) -> None:
+    pass
+
+  def drain(self) -> bytes:
+    data = b''.join(self._chunks)
+    self._chunks.clear()
+    return data
+
+
+async def iter_csv(leads: AsyncIterable[Lead], chunk_rows: int = config.export_chunk_rows) -> AsyncIterator[bytes]:
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(EXPORT_COLUMNS)
+  prefix = codecs.BOM_UTF8
+  rows = 0
+  async for lead in leads:
+    writer.writerow(csv_row(lead))
+    rows += 1
+    if rows % chunk_rows == 0:
+      yield prefix + buffer.getvalue().encode('utf-8')
+      prefix = b''
+      buffer.seek(0)
+      buffer.truncate()
+  yield prefix + buffer.getvalue().encode('utf-8')
+
+
+async def iter_json(leads: AsyncIterable[Lead], pretty: bool = False,
+                    chunk_rows: int = config.export_chunk_rows) -> AsyncIterator[bytes]:
+  parts: List[bytes] = [b'[']
+  rows = 0
+  async for lead in leads:
+    item = serializer.dumps(lead.model_dump(mode='json'), pretty=pretty)
+    if pretty:
+      item = b'\n  ' + item.replace(b'\n', b'\n  ')
+    parts.append(item if not rows else b',' + item)
+    rows += 1
+    if rows % chunk_rows == 0:
+      yield b''.join(parts)
+      parts = []
+  parts.append(b'\n]\n' if pretty and rows else b']')
+  yield b''.join(parts)
+
+
+async def iter_xlsx(leads: AsyncIterable[Lead], chunk_rows: int = config.export_chunk_rows) -> AsyncIterator[bytes]:
+  output = _ChunkWriter()
+  with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+    for name, content in XLSX_PARTS.items():
+      archive.writestr(name, content)
+    with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+      sheet.write(_SHEET_HEADER + xlsx_row(EXPORT_COLUMNS).encode('utf-8'))
+      rows: List[str] = []
+      async for lead in leads:
+        rows.append(xlsx_row(lead_row(lead)))
+        if len(rows) >= chunk_rows:
+          sheet.write(''.join(rows).encode('utf-8'))
+          rows.clear()
+          data = output.drain()
+          if data:
+            yield data
+      sheet.write(''.join(rows).encode('utf-8') + _SHEET_FOOTER)
+  yield output.drain()
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes], level: int = config.export_gzip_level) -> AsyncIterator[bytes]:
+  compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+  async for chunk in chunks:
+    data = compressor.compress(chunk)
+    if data:
+      yield data
+  yield compressor.flush()
@@ -0,0 +1,88 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+from filelock import FileLock
+
+
+class ILeadIdAllocator(ABC):
+  @abstractmethod
+  async def next_id(self) -> int:
+    pass
+
+  async def next_ids(self, count: int) -> List[int]:
+    return [await self.next_id() for _ in range(count)]
+
+
+class BlockLeadIdAllocator(ILeadIdAllocator):
+  def __init__(self, block_size: int = 1):
+    if block_size < 1:
+      raise ValueError("block_size должен быть положительным")
+    self._lock = asyncio.Lock()
+    self._block_size = block_size
+    self._next_id = 0
+    self._block_end = 0
+
+  async def next_id(self) -> int:
+    async with self._lock:
+      if self._next_id >= self._block_end:
+        self._next_id = await self._reserve_block(self._block_size)
+        self._block_end = self._next_id + self._block_size
+      lead_id = self._next_id
+      self._next_id += 1
+      return lead_id
+
+  async def next_ids(self, count: int) -> List[int]:
+    if count <= 0:
+      return []
+    async with self._lock:
+      first_id = await self._reserve_block(count)
+      return list(range(first_id, first_id + count))
+
+  @abstractmethod
+  async def _reserve_block(self, count: int) -> int:
+    pass
+
+
+class FileLeadIdAllocator(BlockLeadIdAllocator):
+  def __init__(self, counter_file: str, seed: Optional[Callable[[], Awaitable[int]]] = None, block_size: int = 1):
+    super().__init__(block_size)
+    self._counter_file = Path(counter_file)
+    self._file_lock = FileLock(f"{counter_file}.lock")
+    self._seed = seed
+
+  async def _reserve_block(self, count: int) -> int:
+    seed_value = 0
+    if self._seed is not None and not self._counter_file.exists():
+      seed_value = await self._seed()
+    return await asyncio.to_thread(self._reserve, count, seed_value)
+
+  def _reserve(self, count: int, seed_value: int) -> int:
+    with self._file_lock:
+      last_id = self._read_counter()
+      if last_id is None:
+        last_id = seed_value
+      self._write_counter(last_id + count)
+      return last_id + 1
+
+  def _read_counter(self) -> Optional[int]:
+    try:
+      content = self._counter_file.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+      return None
+    if not content:
+      return None
+    return int(content)
+
+  def _write_counter(self, value: int) -> None:
+    tmp_path = self._counter_file.with_name(f"{self._counter_file.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+      f.write(str(value))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, self._counter_file)
+
+
+def lead_id_path(leads_file: str | Path) -> Path:
+  return Path(leads_file).with_suffix('.seq')
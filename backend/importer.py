@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List
+
+import aiofiles
+from fastapi import HTTPException, status
+
+from .config import config, logging
+from .export import FORMULA_PREFIXES
+from .schemas import LeadImportResult
+from .serialization import serializer
+from .services import LeadService
+
+IMPORT_FORMATS: frozenset[str] = frozenset({'ndjson', 'csv'})
+LIST_FIELDS: frozenset[str] = frozenset({'services'})
+_LIST_SEPARATORS: re.Pattern = re.compile(r'[;,|]')
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+  decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+  pending = ''
+  async for chunk in chunks:
+    pending += decoder.decode(chunk)
+    lines = pending.split('\n')
+    pending = lines.pop()
+    for line in lines:
+      yield line + '\n'
+  pending += decoder.decode(b'', final=True)
+  if pending:
+    yield pending
+
+
+async def limit_size(chunks: AsyncIterable[bytes], max_size: int) -> AsyncIterator[bytes]:
+  size = 0
+  async for chunk in chunks:
+    size += len(chunk)
+    if size > max_size:
+      raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Слишком большой файл импорта")
+    yield chunk
+
+
+async def iter_file_lines(file_path: str) -> AsyncIterator[str]:
+  async with aiofiles.open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+    async for line in f:
+      yield line
+
+
+async def parse_ndjson(lines: AsyncIterable[str]) -> AsyncIterator[Any]:
+  async for line in lines:
+    line = line.strip()
+    if not line:
+      continue
+    try:
+      yield serializer.loads(line)
+    except json.JSONDecodeError:
+      yield line
+
+
+def csv_record(header: List[str], row: List[str]) -> Dict[str, Any]:
+  record: Dict[str, Any] = {}
+  for field, value in zip(header, row):
+    value = value.strip()
+    if not field or not value:
+      continue
+    if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+      value = value[1:]
+    if field in LIST_FIELDS:
+      record[field] = [item.strip() for item in _LIST_SEPARATORS.split(value) if item.strip()]
+    else:
+      record[field] = value
+  return record
+
+
+async def parse_csv(lines: AsyncIterable[str]) -> AsyncIterator[Dict[str, Any]]:
+  header: List[str] = []
+  pending = ''
+  async for line in lines:
+    pending += line
+    if pending.count('"') % 2:
+      continue
+    text, pending = pending, ''
+    if not text.strip():
+      continue
+    row = next(csv.reader(io.StringIO(text)))
+    if not header:
+      header = [field.strip() for field in row]
+      continue
+    yield csv_record(header, row)
+  if pending.strip() and header:
+    yield csv_record(header, next(csv.reader(io.StringIO(pending))))
+
+
+def parse_records(lines: AsyncIterable[str], source_format: str) -> AsyncIterator[Any]:
+  if source_format == 'csv':
+    return parse_csv(lines)
+  return parse_ndjson(lines)
+
+
+async def import_file(file_path: str, source_format: str, notify: bool) -> LeadImportResult:
+  lead_service = LeadService()
+  await lead_service.start()
+  try:
+    return await lead_service.import_leads(parse_records(iter_file_lines(file_path), source_format), notify=notify)
+  finally:
+    await lead_service.close()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Массовый импорт заявок из NDJSON или CSV")
+  parser.add_argument('file', help="Файл с заявками")
+  parser.add_argument('--format', dest='source_format', choices=sorted(IMPORT_FORMATS), default=None,
+                      help="Формат файла (по умолчанию по расширению)")
+  parser.add_argument('--notify', choices=('none', 'summary'), default='none',
+                      help="Отправить одно сводное уведомление об импортированных заявках")
+  args = parser.parse_args()
+
+  source_format = args.source_format or ('csv' if args.file.lower().endswith('.csv') else 'ndjson')
+  logging.info(f"Импорт заявок из {args.file} ({source_format}) в хранилище {config.leads_storage}")
+  result = asyncio.run(import_file(args.file, source_format, args.notify == 'summary'))
+  print(result.model_dump_json(indent=2))
+
+
+if __name__ == '__main__':
+  main()
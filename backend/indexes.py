@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from datetime import date, datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+CONTACT_FIELDS: Dict[str, str] = {
+  'whatsapp': 'phone',
+  'telegram': 'telegram',
+  'phone': 'phone_number',
+  'email': 'email'
+}
+STATS_DIMENSIONS: Tuple[str, ...] = ('budget', 'services', 'contact_method')
+
+
+def get_contact_value(lead: Any) -> str:
+  if isinstance(lead, Mapping):
+    field = CONTACT_FIELDS.get(lead.get('contact_method', ''))
+    value = lead.get(field) if field else None
+  else:
+    field = CONTACT_FIELDS.get(lead.contact_method)
+    value = getattr(lead, field, None) if field else None
+  return value or ''
+
+
+def normalize_contact(value: str) -> str:
+  return value.lower().strip()
+
+
+class ILeadIndex(ABC):
+  def build(self, leads: Iterable[Dict[str, Any]]) -> None:
+    self.start()
+    self.load(leads)
+    self.complete()
+
+  def start(self) -> None:
+    pass
+
+  @abstractmethod
+  def load(self, leads: Iterable[Dict[str, Any]]) -> None:
+    pass
+
+  def complete(self) -> None:
+    pass
+
+  @abstractmethod
+  def add(self, lead: Dict[str, Any]) -> None:
+    pass
+
+  @abstractmethod
+  def empty(self) -> 'ILeadIndex':
+    pass
+
+  @abstractmethod
+  def replace(self, other: 'ILeadIndex') -> None:
+    pass
+
+  async def flush(self) -> None:
+    pass
+
+  async def refresh(self) -> List[Dict[str, Any]]:
+    return []
+
+
+class RecentContactIndex(ILeadIndex):
+  def __init__(self, window: timedelta = timedelta(minutes=5)):
+    self._window = window
+    self._last_seen: Dict[Tuple[str, str], datetime] = {}
+    self._expiry: Deque[Tuple[datetime, Tuple[str, str]]] = deque()
+    self._cutoff: datetime = datetime.min
+    self._recent: List[Tuple[datetime, Dict[str, Any]]] = []
+
+  def __len__(self) -> int:
+    return len(self._last_seen)
+
+  def start(self) -> None:
+    self._last_seen = {}
+    self._expiry = deque()
+    self._cutoff = datetime.now() - self._window
+    self._recent = []
+
+  def load(self, leads: Iterable[Dict[str, Any]]) -> None:
+    for lead in leads:
+      timestamp = datetime.fromisoformat(lead['timestamp'])
+      if timestamp > self._cutoff:
+        self._recent.append((timestamp, lead))
+
+  def complete(self) -> None:
+    recent, self._recent = self._recent, []
+    recent.sort(key=lambda item: item[0])
+    for timestamp, lead in recent:
+      self._remember(lead, timestamp)
+
+  def add(self, lead: Dict[str, Any]) -> None:
+    self._remember(lead, datetime.fromisoformat(lead['timestamp']))
+
+  def empty(self) -> 'RecentContactIndex':
+    return RecentContactIndex(self._window)
+
+  def replace(self, other: 'RecentContactIndex') -> None:
+    self._last_seen, self._expiry = other._last_seen, other._expiry
+
+  def contains(self, contact_method: str, contact_value: str, now: Optional[datetime] = None) -> bool:
+    now = now or datetime.now()
+    self._expire(now)
+    last_seen = self._last_seen.get((contact_method, normalize_contact(contact_value)))
+    return last_seen is not None and (now - last_seen) < self._window
+
+  def _remember(self, lead: Dict[str, Any], timestamp: datetime) -> None:
+    contact_value = normalize_contact(get_contact_value(lead))
+    if not contact_value:
+      return
+    key = (lead['contact_method'], contact_value)
+    last_seen = self._last_seen.get(key)
+    if last_seen is None or timestamp > last_seen:
+      self._last_seen[key] = timestamp
+    self._expiry.append((timestamp, key))
+
+  def _expire(self, now: datetime) -> None:
+    cutoff = now - self._window
+    while self._expiry and self._expiry[0][0] <= cutoff:
+      timestamp, key = self._expiry.popleft()
+      if self._last_seen.get(key) == timestamp:
+        del self._last_seen[key]
+
+
+class LeadStatsIndex(ILeadIndex):
+  def __init__(self):
+    self._totals: Dict[str, int] = {}
+    self._days: Dict[str, Counter] = {}
+
+  def __len__(self) -> int:
+    return sum(self._totals.values())
+
+  def start(self) -> None:
+    self._totals = {}
+    self._days = {}
+
+  def load(self, leads: Iterable[Dict[str, Any]]) -> None:
+    for lead in leads:
+      self.add(lead)
+
+  def add(self, lead: Dict[str, Any]) -> None:
+    day = str(lead['timestamp'])[:10]
+    self._totals[day] = self._totals.get(day, 0) + 1
+    counters = self._days.get(day)
+    if counters is None:
+      counters = self._days[day] = Counter()
+    for dimension in STATS_DIMENSIONS:
+      values = lead.get(dimension)
+      if isinstance(values, str):
+        values = [values]
+      for value in values or ():
+        counters[(dimension, value)] += 1
+
+  def empty(self) -> 'LeadStatsIndex':
+    return LeadStatsIndex()
+
+  def replace(self, other: 'LeadStatsIndex') -> None:
+    self._totals, self._days = other._totals, other._days
+
+  def summary(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, Any]:
+    first = date_from.isoformat() if date_from else ''
+    last = date_to.isoformat() if date_to else '9999-12-31'
+    by_day = {day: total for day, total in sorted(self._totals.items()) if first <= day <= last}
+    combined: Counter = Counter()
+    for day in by_day:
+      combined.update(self._days[day])
+    summary: Dict[str, Any] = {'total': sum(by_day.values()), 'by_day': by_day}
+    for dimension in STATS_DIMENSIONS:
+      summary[f'by_{dimension}'] = {}
+    for (dimension, value), count in combined.most_common():
+      summary[f'by_{dimension}'][value] = count
+    return summary
@@ -1,26 +1,32 @@
 import os
 from pathlib import Path
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 
 try:
-  from .schemas import LeadCreate, Lead
-  from .services import LeadService
+  from .routers import router
+  from .assets import IndexPage, StaticAssets
+  from .middleware import RateLimitMiddleware, create_rate_limit_store
+  from .serialization import FastJSONResponse
+  from .services import LeadService, create_notifier, create_storage_backend, leads_storage_path, migrate_json_leads
   from .config import config, logging
 except ImportError:
   import sys
   from pathlib import Path
 
   sys.path.append(str(Path(__file__).parent.parent))
-  from backend.schemas import LeadCreate, Lead
-  from backend.services import LeadService
+  from backend.routers import router
+  from backend.assets import IndexPage, StaticAssets
+  from backend.middleware import RateLimitMiddleware, create_rate_limit_store
+  from backend.serialization import FastJSONResponse
+  from backend.services import LeadService, create_notifier, create_storage_backend, leads_storage_path, migrate_json_leads
   from backend.config import config, logging
 import aiofiles
+import asyncio
 import json
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Any
+from typing import AsyncGenerator, Any, Optional
 
 BASE_DIR: Path = Path(__file__).parent
 
@@ -29,50 +35,63 @@ BASE_DIR: Path = Path(__file__).parent
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
   (BASE_DIR / "data").mkdir(exist_ok=True)
   leads_file: Path = Path(config.leads_file)
-  if not leads_file.exists():
+  if config.leads_storage != 'json':
+    backend = create_storage_backend()
+    try:
+      migrated: int = await migrate_json_leads(
+        leads_file, backend, f"{leads_storage_path(leads_file)}.migrate.lock"
+      )
+    finally:
+      await backend.close()
+    if migrated:
+      logging.info(f"Перенесено заявок из {leads_file} в хранилище {config.leads_storage}: {migrated}")
+  elif not leads_file.exists():
     async with aiofiles.open(leads_file, mode='w', encoding='utf-8') as f:
       await f.write(json.dumps([]))
-  yield
-
-
-app: FastAPI = FastAPI(title="Terrasite API", lifespan=lifespan)
+  await asyncio.to_thread(index_page.reload)
+  watcher: Optional[asyncio.Task] = None
+  if config.static_watch_interval:
+    watcher = asyncio.create_task(index_page.watch(config.static_watch_interval))
+  lead_service: LeadService = LeadService(notifier=create_notifier())
+  await lead_service.start()
+  app.state.lead_service = lead_service
+  try:
+    yield
+  finally:
+    if watcher is not None:
+      watcher.cancel()
+      await asyncio.gather(watcher, return_exceptions=True)
+    await lead_service.close()
+    del app.state.lead_service
+
+
+app: FastAPI = FastAPI(title="Terrasite API", lifespan=lifespan, default_response_class=FastJSONResponse)
+rate_limit_store = create_rate_limit_store()
+app.add_middleware(RateLimitMiddleware, store=rate_limit_store)
+app.add_middleware(
+  RateLimitMiddleware, store=rate_limit_store, paths=('/admin/leads/import',), bucket='import',
+  ip_rate=config.rate_limit_import_per_minute / 60, ip_burst=config.rate_limit_import_burst,
+  contact_rate=None, max_body_size=config.import_max_body_size
+)
 
 static_dir: Path = BASE_DIR.parent / "static"
-app.mount(
-  "/static",
-  StaticFiles(directory=static_dir, html=True),
-  name="static"
+static_assets: StaticAssets = StaticAssets(
+  static_dir, min_size=config.static_compress_min_size,
+  gzip_level=config.static_gzip_level, brotli_quality=config.static_brotli_quality
+)
+app.mount("/static", static_assets, name="static")
+index_page: IndexPage = IndexPage(
+  static_dir / "index.html", static_assets, min_size=config.static_compress_min_size,
+  gzip_level=config.static_gzip_level, brotli_quality=config.static_brotli_quality
 )
 
 
-def get_lead_service():
-  return LeadService()
-
-
-@app.post("/submit-form", response_model=Lead)
-async def submit_form(lead_data: LeadCreate, service: LeadService = Depends(get_lead_service)):
-  try:
-    logging.info(f"Получены данные формы: {lead_data.model_dump()}")
-    return await service.process_lead(lead_data)
-  except HTTPException as e:
-    raise e
-  except Exception as e:
-    logging.error(f"Ошибка обработки заявки: {e}")
-    raise HTTPException(status_code=500, detail="Ошибка обработки заявки")
-
-
-@app.get("/admin/leads", response_model=list[Lead])
-async def admin_leads(service: LeadService = Depends(get_lead_service)):
-  try:
-    return await service.get_all_leads()
-  except Exception as e:
-    logging.error(f"Ошибка получения заявок: {e}")
-    raise HTTPException(status_code=500, detail="Ошибка получения данных")
+@app.get("/")
+async def serve_index(request: Request) -> Response:
+  return index_page.response(request.scope)
 
 
-@app.get("/")
-async def serve_index() -> FileResponse:
-  return FileResponse(static_dir / "index.html")
+app.include_router(router)
 
 
 if __name__ == "__main__":
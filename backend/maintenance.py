@@ -0,0 +1,55 @@
+import argparse
+import asyncio
+from datetime import datetime
+from typing import List
+
+from .config import config, logging
+from .services import SegmentedLeadRepository, leads_segments_path
+
+
+def month_before(now: datetime, months: int) -> str:
+  index = now.year * 12 + now.month - 1 - months
+  return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def print_status(repository: SegmentedLeadRepository) -> None:
+  segments = repository.read_manifest()
+  if not segments:
+    print("Сегменты не найдены")
+    return
+  for name in sorted(segments):
+    segment = segments[name]
+    print(f"{name}  заявок={segment['count']:>7}  id={segment['min_id']}..{segment['max_id']}  "
+          f"{'gzip' if segment['compressed'] else 'jsonl'}")
+
+
+async def compact(repository: SegmentedLeadRepository, keep_months: int, compress: bool) -> List[str]:
+  before = month_before(datetime.now(), keep_months - 1)
+  compacted = await repository.compact(before, compress=compress)
+  logging.info(f"Уплотнено сегментов до {before}: {len(compacted)}")
+  return compacted
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Обслуживание сегментированного хранилища заявок")
+  parser.add_argument('--directory', default=None, help="Каталог сегментов (по умолчанию рядом с APP_LEADS_FILE)")
+  commands = parser.add_subparsers(dest='command', required=True)
+  commands.add_parser('status', help="Показать сегменты из манифеста")
+  compact_parser = commands.add_parser('compact', help="Уплотнить старые сегменты")
+  compact_parser.add_argument('--keep-months', type=int, default=1,
+                              help="Сколько последних месяцев не трогать (включая текущий)")
+  compact_parser.add_argument('--gzip', action='store_true', help="Сжать уплотнённые сегменты gzip")
+  args = parser.parse_args()
+
+  repository = SegmentedLeadRepository(args.directory or str(leads_segments_path(config.leads_file)))
+  if args.command == 'status':
+    print_status(repository)
+    return
+  if args.keep_months < 1:
+    parser.error("--keep-months должен быть не меньше 1")
+  compacted = asyncio.run(compact(repository, args.keep_months, args.gzip))
+  print(f"Уплотнено сегментов: {len(compacted)}" + (f" ({', '.join(compacted)})" if compacted else ''))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,186 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+  return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = '') -> str:
+  pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+  if extra:
+    pairs.append(extra)
+  return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+  if value == float('inf'):
+    return '+Inf'
+  return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+  kind = ''
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = tuple(labelnames)
+    self._lock = threading.Lock()
+
+  def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(self.labelnames):
+      raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}")
+    return tuple(str(labels[name]) for name in self.labelnames)
+
+  @abstractmethod
+  def _samples(self) -> List[str]:
+    pass
+
+  def render(self) -> str:
+    lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+    lines.extend(self._samples())
+    return '\n'.join(lines)
+
+
+class Counter(_Metric):
+  kind = 'counter'
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+    super().__init__(name, documentation, labelnames)
+    self._values: Dict[Tuple[str, ...], float] = {}
+
+  def inc(self, amount: float = 1, **labels: str) -> None:
+    if amount < 0:
+      raise ValueError("Счётчик не может уменьшаться")
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0) + amount
+
+  def value(self, **labels: str) -> float:
+    return self._values.get(self._key(labels), 0)
+
+  def _samples(self) -> List[str]:
+    with self._lock:
+      values = sorted(self._values.items())
+    return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+  kind = 'gauge'
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+    super().__init__(name, documentation, labelnames)
+    self._values: Dict[Tuple[str, ...], float] = {}
+
+  def set(self, value: float, **labels: str) -> None:
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = value
+
+  def value(self, **labels: str) -> float:
+    return self._values.get(self._key(labels), 0)
+
+  def _samples(self) -> List[str]:
+    with self._lock:
+      values = sorted(self._values.items())
+    return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+  kind = 'histogram'
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+               buckets: Sequence[float] = DEFAULT_BUCKETS):
+    super().__init__(name, documentation, labelnames)
+    self._buckets = tuple(sorted(buckets)) + (float('inf'),)
+    self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+  def observe(self, value: float, **labels: str) -> None:
+    key = self._key(labels)
+    with self._lock:
+      counts, total = self._series.setdefault(key, ([0] * len(self._buckets), [0.0]))
+      for index, bound in enumerate(self._buckets):
+        if value <= bound:
+          counts[index] += 1
+          break
+      total[0] += value
+
+  @contextmanager
+  def time(self, **labels: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(time.perf_counter() - started, **labels)
+
+  def count(self, **labels: str) -> int:
+    series = self._series.get(self._key(labels))
+    return sum(series[0]) if series else 0
+
+  def _samples(self) -> List[str]:
+    lines: List[str] = []
+    with self._lock:
+      series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+    for key, (counts, total) in series:
+      cumulative = 0
+      for bound, count in zip(self._buckets, counts):
+        cumulative += count
+        labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+        lines.append(f"{self.name}_bucket{labels} {cumulative}")
+      lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+      lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+    return lines
+
+
+class MetricsRegistry:
+  def __init__(self):
+    self._metrics: Dict[str, _Metric] = {}
+
+  def _register(self, metric: _Metric) -> _Metric:
+    existing = self._metrics.get(metric.name)
+    if existing is not None:
+      if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+        raise ValueError(f"Метрика {metric.name} уже зарегистрирована с другим типом или метками")
+      return existing
+    self._metrics[metric.name] = metric
+    return metric
+
+  def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return self._register(Counter(name, documentation, labelnames))
+
+  def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return self._register(Gauge(name, documentation, labelnames))
+
+  def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return self._register(Histogram(name, documentation, labelnames, buckets))
+
+  def render(self) -> str:
+    return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry: MetricsRegistry = MetricsRegistry()
+
+LEAD_STAGE_SECONDS: Histogram = registry.histogram(
+  'terrasite_lead_stage_duration_seconds', 'Duration of lead processing stages', ['stage']
+)
+LEADS_PROCESSED: Counter = registry.counter(
+  'terrasite_leads_processed_total', 'Submitted leads by outcome', ['result']
+)
+LEAD_CACHE_REQUESTS: Counter = registry.counter(
+  'terrasite_lead_cache_requests_total', 'Lead cache lookups by result', ['result']
+)
+NOTIFICATIONS_PENDING: Gauge = registry.gauge(
+  'terrasite_notifications_pending', 'Notifications waiting to be sent', ['mode']
+)
+RATE_LIMITED: Counter = registry.counter(
+  'terrasite_rate_limited_total', 'Requests rejected by the rate limiter', ['limit']
+)
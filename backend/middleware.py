@@ -0,0 +1,202 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import redis.asyncio as redis
+from redis.exceptions import WatchError
+from starlette.responses import JSONResponse
+from .config import config, logging
+from .indexes import get_contact_value, normalize_contact
+from .metrics import RATE_LIMITED
+from .serialization import serializer
+from .services import get_redis_client
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+def refill(tokens: float, updated: float, now: float, rate: float, capacity: int) -> Tuple[bool, float, float]:
+  tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+  if tokens >= 1:
+    return True, tokens - 1, 0.0
+  return False, tokens, (1 - tokens) / rate if rate > 0 else math.inf
+
+
+class IRateLimitStore(ABC):
+  @abstractmethod
+  async def consume(self, key: str, rate: float, capacity: int) -> Tuple[bool, float]:
+    pass
+
+
+class MemoryRateLimitStore(IRateLimitStore):
+  def __init__(self, max_keys: int = 10000):
+    self._max_keys = max_keys
+    self._buckets: OrderedDict[str, Tuple[float, float]] = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self._buckets)
+
+  async def consume(self, key: str, rate: float, capacity: int) -> Tuple[bool, float]:
+    now = time.monotonic()
+    tokens, updated = self._buckets.pop(key, (float(capacity), now))
+    allowed, tokens, retry_after = refill(tokens, updated, now, rate, capacity)
+    self._buckets[key] = (tokens, now)
+    while len(self._buckets) > self._max_keys:
+      self._buckets.popitem(last=False)
+    return allowed, retry_after
+
+
+class RedisRateLimitStore(IRateLimitStore):
+  def __init__(self, client: redis.Redis, key_prefix: str = 'terrasite:ratelimit'):
+    self._client = client
+    self._key_prefix = key_prefix
+
+  async def consume(self, key: str, rate: float, capacity: int) -> Tuple[bool, float]:
+    redis_key = f"{self._key_prefix}:{key}"
+    ttl_ms = max(1000, int(capacity / rate * 1000)) if rate > 0 else None
+    async with self._client.pipeline() as pipe:
+      while True:
+        try:
+          await pipe.watch(redis_key)
+          tokens, updated = await pipe.hmget(redis_key, 'tokens', 'updated')
+          now = time.time()
+          allowed, tokens, retry_after = refill(
+            float(tokens) if tokens is not None else float(capacity),
+            float(updated) if updated is not None else now,
+            now, rate, capacity
+          )
+          pipe.multi()
+          pipe.hset(redis_key, mapping={'tokens': tokens, 'updated': now})
+          if ttl_ms is not None:
+            pipe.pexpire(redis_key, ttl_ms)
+          await pipe.execute()
+          return allowed, retry_after
+        except WatchError:
+          continue
+
+
+class RateLimitMiddleware:
+  def __init__(self, app: ASGIApp, store: Optional[IRateLimitStore] = None,
+               paths: Iterable[str] = ('/submit-form',), bucket: str = 'ip',
+               ip_rate: float = config.rate_limit_ip_per_minute / 60,
+               ip_burst: int = config.rate_limit_ip_burst,
+               contact_rate: Optional[float] = config.rate_limit_contact_per_minute / 60,
+               contact_burst: int = config.rate_limit_contact_burst,
+               max_body_size: int = config.rate_limit_max_body_size,
+               trust_forwarded: bool = config.rate_limit_trust_forwarded,
+               proxy_hops: int = config.rate_limit_proxy_hops):
+    self._app = app
+    self._store = store or MemoryRateLimitStore()
+    self._paths = frozenset(paths)
+    self._bucket = bucket
+    self._ip_rate = ip_rate
+    self._ip_burst = ip_burst
+    self._contact_rate = contact_rate
+    self._contact_burst = contact_burst
+    self._max_body_size = max_body_size
+    self._trust_forwarded = trust_forwarded
+    self._proxy_hops = proxy_hops
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if (scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] not in self._paths
+        or not config.rate_limit_enabled):
+      await self._app(scope, receive, send)
+      return
+
+    allowed, retry_after = await self._store.consume(
+      f"{self._bucket}:{self._client_ip(scope)}", self._ip_rate, self._ip_burst
+    )
+    if not allowed:
+      await self._reject(scope, receive, send, self._bucket, retry_after)
+      return
+
+    content_length = self._header(scope, b'content-length')
+    if content_length is not None and content_length.isdigit() and int(content_length) > self._max_body_size:
+      await self._too_large(scope, receive, send)
+      return
+    if self._contact_rate is None:
+      await self._app(scope, receive, send)
+      return
+    chunks: List[bytes] = []
+    size = 0
+    more_body = True
+    while more_body:
+      message = await receive()
+      if message['type'] == 'http.disconnect':
+        return
+      chunk = message.get('body', b'')
+      size += len(chunk)
+      if size > self._max_body_size:
+        await self._too_large(scope, receive, send)
+        return
+      chunks.append(chunk)
+      more_body = message.get('more_body', False)
+    body = b''.join(chunks)
+
+    contact = self._contact_key(body)
+    if contact is not None:
+      allowed, retry_after = await self._store.consume(contact, self._contact_rate, self._contact_burst)
+      if not allowed:
+        await self._reject(scope, receive, send, 'contact', retry_after)
+        return
+
+    replayed = False
+
+    async def replay() -> Message:
+      nonlocal replayed
+      if not replayed:
+        replayed = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+      return await receive()
+
+    await self._app(scope, replay, send)
+
+  def _header(self, scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get('headers', []):
+      if key == name:
+        return value.decode('latin-1')
+    return None
+
+  def _client_ip(self, scope: Scope) -> str:
+    if self._trust_forwarded:
+      forwarded = self._header(scope, b'x-forwarded-for')
+      if forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[max(0, len(addresses) - self._proxy_hops)]
+    client = scope.get('client')
+    return client[0] if client else 'unknown'
+
+  def _contact_key(self, body: bytes) -> Optional[str]:
+    try:
+      payload = serializer.loads(body)
+    except (ValueError, UnicodeDecodeError):
+      return None
+    if not isinstance(payload, dict) or not isinstance(payload.get('contact_method'), str):
+      return None
+    contact_value = get_contact_value(payload)
+    if not isinstance(contact_value, str) or not normalize_contact(contact_value):
+      return None
+    return f"contact:{payload['contact_method']}:{normalize_contact(contact_value)}"
+
+  async def _reject(self, scope: Scope, receive: Receive, send: Send, limit: str, retry_after: float) -> None:
+    RATE_LIMITED.inc(limit=limit)
+    logging.warning(f"Превышен лимит заявок ({limit}) для {self._client_ip(scope)}")
+    response = JSONResponse(
+      {'detail': "Слишком много заявок, попробуйте позже"}, status_code=429,
+      headers={'Retry-After': str(max(1, math.ceil(min(retry_after, 86400))))}
+    )
+    await response(scope, receive, send)
+
+  async def _too_large(self, scope: Scope, receive: Receive, send: Send) -> None:
+    response = JSONResponse({'detail': "Слишком большой запрос"}, status_code=413)
+    await response(scope, receive, send)
+
+
+def create_rate_limit_store() -> IRateLimitStore:
+  if config.rate_limit_store == 'redis':
+    return RedisRateLimitStore(get_redis_client(config.redis_url))
+  return MemoryRateLimitStore(config.rate_limit_max_keys)
@@ -1,55 +1,178 @@
-from fastapi import APIRouter, HTTPException, Depends
-from .schemas import LeadCreate, Lead
+import secrets
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from .schemas import (
+  LeadCreate, Lead, LeadFilter, LeadQuery, LeadExport, LeadImportResult, LeadStats, LeadStatsQuery,
+  LeadSearchQuery, LEAD_LIST_ADAPTER
+)
 from .services import LeadService
-from typing import List, Dict
+from .importer import iter_lines, limit_size, parse_records
+from .export import CSV_MEDIA_TYPE, JSON_MEDIA_TYPE, XLSX_MEDIA_TYPE, gzip_stream, iter_csv, iter_json, iter_xlsx
+from .assets import choose_encoding
+from .metrics import registry, CONTENT_TYPE
+from typing import List, Dict, Annotated, AsyncIterator, Literal, Optional
 from datetime import datetime
-from .config import logging
+from .config import config, logging
 from fastapi import status
 
 router: APIRouter = APIRouter()
 
 
-async def get_lead_service() -> LeadService:
-  return LeadService()
+async def get_lead_service(request: Request) -> LeadService:
+  return request.app.state.lead_service
 
 
-@router.post("/submit-form", response_model=Dict[str, str | bool])
+async def verify_import_token(authorization: Optional[str] = Header(None)) -> None:
+  if not config.import_token:
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Импорт заявок отключён")
+  if not secrets.compare_digest(authorization or '', f"Bearer {config.import_token}"):
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен импорта")
+
+
+@router.post("/submit-form", response_model=Lead)
 async def submit_form(
     lead_data: LeadCreate,
     lead_service: LeadService = Depends(get_lead_service)
-) -> Dict[str, str | bool]:
+) -> Lead:
   try:
     logging.info(f"Получены данные формы: {lead_data.model_dump()}")
-    lead = await lead_service.process_lead(lead_data)
-
-    contact_info: str = ""
-    if lead_data.contact_method == 'whatsapp':
-      contact_info = f"WhatsApp: {lead_data.phone}"
-    elif lead_data.contact_method == 'telegram':
-      contact_info = f"Telegram: {lead_data.telegram}"
-    elif lead_data.contact_method == 'phone':
-      contact_info = f"Звонок: {lead_data.phone_number} в {lead_data.call_time}"
-    elif lead_data.contact_method == 'email':
-      contact_info = f"Email: {lead_data.email}"
-
-    logging.info(f"Новая заявка обработана: {lead_data.name} ({contact_info})")
-
-    return {"success": True, "message": "Заявка успешно отправлена"}
+    return await lead_service.process_lead(lead_data)
   except HTTPException as e:
     raise e
   except Exception as e:
     logging.error(f"Ошибка обработки заявки: {e}")
-    raise HTTPException(
-      status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-      detail={"success": False, "error": "Внутренняя ошибка сервера"}
-    )
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ошибка обработки заявки")
 
 
 @router.get("/admin/leads", response_model=List[Lead])
 async def admin_leads(
+    query: Annotated[LeadQuery, Query()],
+    lead_service: LeadService = Depends(get_lead_service)
+) -> Response:
+  try:
+    page = await lead_service.list_leads(query)
+  except HTTPException as e:
+    raise e
+  except Exception as e:
+    logging.error(f"Ошибка получения заявок: {e}")
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ошибка получения данных")
+  response = Response(LEAD_LIST_ADAPTER.dump_json(page.items), media_type="application/json")
+  if page.next_cursor:
+    response.headers['X-Next-Cursor'] = page.next_cursor
+  return response
+
+
+@router.get("/admin/leads/stream")
+async def admin_leads_stream(
+    lead_filter: Annotated[LeadFilter, Query()],
+    lead_service: LeadService = Depends(get_lead_service)
+) -> StreamingResponse:
+  async def generate() -> AsyncIterator[str]:
+    try:
+      async for lead in lead_service.iter_leads(lead_filter):
+        yield lead.model_dump_json() + "\n"
+    except Exception as e:
+      logging.error(f"Ошибка выгрузки заявок: {e}")
+      raise
+
+  return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/admin/leads/search", response_model=List[Lead])
+async def admin_leads_search(
+    query: Annotated[LeadSearchQuery, Query()],
+    lead_service: LeadService = Depends(get_lead_service)
+) -> Response:
+  try:
+    leads, total = await lead_service.search_leads(query)
+  except HTTPException as e:
+    raise e
+  except Exception as e:
+    logging.error(f"Ошибка поиска заявок: {e}")
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ошибка поиска заявок")
+  response = Response(LEAD_LIST_ADAPTER.dump_json(leads), media_type="application/json")
+  response.headers['X-Total-Count'] = str(total)
+  return response
+
+
+@router.get("/admin/leads/export")
+async def admin_leads_export(
+    request: Request,
+    export: Annotated[LeadExport, Query()],
     lead_service: LeadService = Depends(get_lead_service)
-) -> List[Lead]:
-  return await lead_service.get_all_leads()
+) -> StreamingResponse:
+  filename = f"leads-{datetime.now():%Y%m%d-%H%M%S}.{export.format}"
+  headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+  leads = lead_service.iter_leads(export)
+  if export.format == 'xlsx':
+    body, media_type = iter_xlsx(leads), XLSX_MEDIA_TYPE
+  elif export.format == 'json':
+    body, media_type = iter_json(leads, pretty=export.pretty), JSON_MEDIA_TYPE
+  else:
+    body, media_type = iter_csv(leads), CSV_MEDIA_TYPE
+  if export.format != 'xlsx':
+    headers['Vary'] = 'Accept-Encoding'
+    if choose_encoding(request.headers.get('accept-encoding', ''), ['gzip', 'identity']) == 'gzip':
+      body = gzip_stream(body)
+      headers['Content-Encoding'] = 'gzip'
+
+  async def generate() -> AsyncIterator[bytes]:
+    try:
+      async for chunk in body:
+        yield chunk
+    except Exception as e:
+      logging.error(f"Ошибка экспорта заявок: {e}")
+      raise
+
+  return StreamingResponse(generate(), media_type=media_type, headers=headers)
+
+
+@router.post("/admin/leads/import", response_model=LeadImportResult, dependencies=[Depends(verify_import_token)])
+async def admin_leads_import(
+    request: Request,
+    source_format: Optional[Literal['ndjson', 'csv']] = Query(None, alias='format'),
+    notify: Literal['none', 'summary'] = Query('none'),
+    lead_service: LeadService = Depends(get_lead_service)
+) -> LeadImportResult:
+  if source_format is None:
+    source_format = 'csv' if 'csv' in request.headers.get('content-type', '') else 'ndjson'
+  try:
+    records = parse_records(iter_lines(limit_size(request.stream(), config.import_max_body_size)), source_format)
+    return await lead_service.import_leads(records, notify=notify == 'summary')
+  except HTTPException as e:
+    raise e
+  except Exception as e:
+    logging.error(f"Ошибка импорта заявок: {e}")
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ошибка импорта заявок")
+
+
+@router.get("/admin/stats", response_model=LeadStats)
+async def admin_stats(
+    query: Annotated[LeadStatsQuery, Query()],
+    lead_service: LeadService = Depends(get_lead_service)
+) -> LeadStats:
+  try:
+    return await lead_service.get_stats(query)
+  except HTTPException as e:
+    raise e
+  except Exception as e:
+    logging.error(f"Ошибка получения статистики: {e}")
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ошибка получения статистики")
+
+
+@router.post("/admin/stats/rebuild", response_model=LeadStats)
+async def admin_stats_rebuild(lead_service: LeadService = Depends(get_lead_service)) -> LeadStats:
+  try:
+    await lead_service.rebuild_stats()
+    return await lead_service.get_stats(LeadStatsQuery())
+  except Exception as e:
+    logging.error(f"Ошибка перестроения статистики: {e}")
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ошибка перестроения статистики")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+  return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
 
 
 @router.get("/health", response_model=Dict[str, str])
@@ -1,12 +1,22 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import List, Optional, Any
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, field_validator
+from typing import List, Dict, Optional, Any, Literal
+from datetime import date, datetime
 import re
 
 
+BUDGETS: frozenset[str] = frozenset({'30-50k', '50-150k', '150-300k', '300-500k', '500k+'})
+CONTACT_METHODS: frozenset[str] = frozenset({'whatsapp', 'telegram', 'phone', 'email'})
+
+_NAME_PATTERN: re.Pattern = re.compile(r'^[а-яёА-ЯЁa-zA-Z\s\-]+$')
+_REPEATED_PATTERN: re.Pattern = re.compile(r'^(.)\1{20,}$')
+_PHONE_SEPARATORS: re.Pattern = re.compile(r'[\s\-()]')
+_PHONE_PATTERN: re.Pattern = re.compile(r'^(\+7|8)\d{10}$')
+_TELEGRAM_PATTERN: re.Pattern = re.compile(r'^@[a-zA-Z0-9_]{5,32}$')
+
+
 class LeadBase(BaseModel):
   name: str = Field(..., min_length=2, max_length=50, description="Имя клиента")
-  services: List[str] = Field(..., min_items=1, description="Список услуг")
+  services: List[str] = Field(..., min_length=1, description="Список услуг")
   description: str = Field(..., min_length=50, max_length=2000, description="Описание проекта")
   budget: str = Field(..., description="Бюджет проекта")
   contact_method: str = Field(..., description="Способ связи")
@@ -18,48 +28,37 @@ class LeadBase(BaseModel):
 
   @field_validator('budget')
   def validate_budget(cls, value: str) -> str:
-    allowed = ['30-50k', '50-150k', '150-300k', '300-500k', '500k+']
-    if value not in allowed:
+    if value not in BUDGETS:
       raise ValueError(f"Недопустимый бюджет: {value}")
     return value
 
   @field_validator('contact_method')
   def validate_contact_method(cls, value: str) -> str:
-    allowed = ['whatsapp', 'telegram', 'phone', 'email']
-    if value not in allowed:
+    if value not in CONTACT_METHODS:
       raise ValueError(f"Недопустимый способ связи: {value}")
     return value
 
   @field_validator('name')
   def validate_name(cls, value: str) -> str:
-    if not re.match(r'^[а-яёА-ЯЁa-zA-Z\s\-]+$', value.strip()):
+    name = value.strip()
+    if not _NAME_PATTERN.match(name):
       raise ValueError('Имя может содержать только буквы, пробелы и дефисы')
-    return value.strip()
+    return name
 
   @field_validator('description')
   def validate_description(cls, value: str) -> str:
     description = value.strip()
-    if len(description.split()) < 8:
+    if len(description.split(maxsplit=8)) < 8:
       raise ValueError('Описание должно содержать минимум 8 слов')
-    if re.match(r'^(.)\1{20,}$', description):
+    if _REPEATED_PATTERN.match(description):
       raise ValueError('Описание содержит слишком много повторяющихся символов')
     return description
 
-  @field_validator('phone')
+  @field_validator('phone', 'phone_number')
   def validate_phone(cls, value: Optional[str]) -> Optional[str]:
     if value is None:
       return value
-    phone_clean = re.sub(r'[\s\-()]', '', value)
-    if not re.match(r'^(\+7|8)\d{10}$', phone_clean):
-      raise ValueError('Некорректный формат номера телефона')
-    return value
-
-  @field_validator('phone_number')
-  def validate_phone_number(cls, value: Optional[str]) -> Optional[str]:
-    if value is None:
-      return value
-    phone_clean = re.sub(r'[\s\-()]', '', value)
-    if not re.match(r'^(\+7|8)\d{10}$', phone_clean):
+    if not _PHONE_PATTERN.match(_PHONE_SEPARATORS.sub('', value)):
       raise ValueError('Некорректный формат номера телефона')
     return value
 
@@ -67,7 +66,7 @@ class LeadBase(BaseModel):
   def validate_telegram(cls, value: Optional[str]) -> Optional[str]:
     if value is None:
       return value
-    if not re.match(r'^@[a-zA-Z0-9_]{5,32}$', value):
+    if not _TELEGRAM_PATTERN.match(value):
       raise ValueError('Некорректный формат Telegram username')
     return value
 
@@ -93,3 +92,87 @@ class Lead(LeadBase):
     if isinstance(v, str):
       return datetime.fromisoformat(v)
     return v
+
+  @classmethod
+  def from_storage(cls, data: Dict[str, Any]) -> 'Lead':
+    timestamp = data['timestamp']
+    if isinstance(timestamp, str):
+      timestamp = datetime.fromisoformat(timestamp)
+    return cls.model_construct(**{**data, 'timestamp': timestamp})
+
+
+class LeadImport(LeadCreate):
+  timestamp: Optional[datetime] = None
+
+  @field_validator('timestamp')
+  def to_local_time(cls, v: Optional[datetime]) -> Optional[datetime]:
+    if v is not None and v.tzinfo is not None:
+      return v.astimezone().replace(tzinfo=None)
+    return v
+
+
+LEAD_LIST_ADAPTER: TypeAdapter[List[Lead]] = TypeAdapter(List[Lead])
+LEAD_IMPORT_LIST_ADAPTER: TypeAdapter[List[LeadImport]] = TypeAdapter(List[LeadImport])
+
+
+class LeadFilter(BaseModel):
+  date_from: Optional[datetime] = Field(None, description="Заявки не раньше этого времени")
+  date_to: Optional[datetime] = Field(None, description="Заявки не позже этого времени")
+  contact_method: Optional[str] = Field(None, description="Способ связи")
+  budget: Optional[str] = Field(None, description="Бюджет проекта")
+  services: List[str] = Field(default_factory=list, description="Хотя бы одна из услуг")
+
+  @field_validator('date_from', 'date_to')
+  def to_local_time(cls, value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+      return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class LeadQuery(LeadFilter):
+  offset: int = Field(0, ge=0, description="Сколько заявок пропустить")
+  limit: int = Field(100, ge=1, le=1000, description="Размер страницы")
+  cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
+  sort: Literal['id', 'timestamp'] = Field('id', description="Поле сортировки")
+  order: Literal['asc', 'desc'] = Field('asc', description="Направление сортировки")
+
+
+class LeadExport(LeadFilter):
+  format: Literal['csv', 'xlsx', 'json'] = Field('csv', description="Формат выгрузки")
+  pretty: bool = Field(False, description="Отформатировать JSON с отступами")
+
+
+class LeadSearchQuery(BaseModel):
+  q: str = Field(..., min_length=1, max_length=200, description="Слова для поиска в описании")
+  offset: int = Field(0, ge=0, description="Сколько заявок пропустить")
+  limit: int = Field(50, ge=1, le=1000, description="Размер страницы")
+
+
+class LeadPage(BaseModel):
+  items: List[Lead]
+  next_cursor: Optional[str] = None
+
+
+class LeadImportError(BaseModel):
+  row: int = Field(..., description="Номер записи во входных данных, начиная с 1")
+  error: str = Field(..., description="Причина отказа")
+
+
+class LeadImportResult(BaseModel):
+  imported: int = 0
+  duplicates: int = 0
+  ids: List[int] = Field(default_factory=list)
+  errors: List[LeadImportError] = Field(default_factory=list)
+
+
+class LeadStatsQuery(BaseModel):
+  date_from: Optional[date] = Field(None, description="Первый день периода")
+  date_to: Optional[date] = Field(None, description="Последний день периода")
+
+
+class LeadStats(BaseModel):
+  total: int = 0
+  by_day: Dict[str, int] = Field(default_factory=dict)
+  by_budget: Dict[str, int] = Field(default_factory=dict)
+  by_services: Dict[str, int] = Field(default_factory=dict)
+  by_contact_method: Dict[str, int] = Field(default_factory=dict)
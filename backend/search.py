@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from filelock import FileLock
+from .config import logging
+from .indexes import STATS_DIMENSIONS, ILeadIndex
+from .serialization import serializer
+
+WORD_PATTERN: re.Pattern = re.compile(r'[0-9a-zа-я]+')
+MIN_STEM_LENGTH: int = 3
+RUSSIAN_SUFFIXES: frozenset[str] = frozenset({
+  'иями', 'ями', 'ами', 'иях', 'иям', 'ием', 'ией', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ться', 'ать',
+  'ять', 'ить', 'еть', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ей', 'ом', 'ем', 'ах', 'ях',
+  'ам', 'ям', 'ов', 'ев', 'ую', 'юю', 'ия', 'ии', 'ию', 'ть', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й'
+})
+ENGLISH_SUFFIXES: frozenset[str] = frozenset({'ing', 'ies', 'es', 'ed', 'ly', 's', 'e'})
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+  suffixes = RUSSIAN_SUFFIXES if 'а' <= word[-1] <= 'я' else ENGLISH_SUFFIXES
+  for length in range(min(4, len(word) - MIN_STEM_LENGTH), 0, -1):
+    if word[-length:] in suffixes:
+      return word[:-length]
+  return word
+
+
+def tokenize(text: str) -> List[str]:
+  return [stem(word) for word in WORD_PATTERN.findall(text.lower().replace('ё', 'е')) if len(word) > 1]
+
+
+def lead_terms(lead: Dict[str, Any]) -> List[str]:
+  return sorted(set(tokenize(lead.get('description') or '')))
+
+
+def search_document(lead: Dict[str, Any], terms: List[str]) -> Dict[str, Any]:
+  document: Dict[str, Any] = {'id': lead['id'], 'terms': terms}
+  for field in ('timestamp',) + STATS_DIMENSIONS:
+    if lead.get(field) is not None:
+      document[field] = lead[field]
+  return document
+
+
+class SearchIndex(ILeadIndex):
+  def __init__(self, file_path: Optional[str] = None):
+    self._file_path = Path(file_path) if file_path else None
+    self._file_lock = FileLock(f"{file_path}.lock") if file_path else None
+    self._postings: Dict[str, Set[int]] = {}
+    self._documents: Set[int] = set()
+    self._unsaved: List[Dict[str, Any]] = []
+    self._position: Tuple[int, int] = (0, 0)
+    self._stored: Dict[int, List[str]] = {}
+    self._built: List[Dict[str, Any]] = []
+    self._missing: List[Dict[str, Any]] = []
+
+  def __len__(self) -> int:
+    return len(self._documents)
+
+  def start(self) -> None:
+    self._stored = self._load()
+    self._postings = {}
+    self._documents = set()
+    self._unsaved = []
+    self._built = []
+    self._missing = []
+
+  def load(self, leads: Iterable[Dict[str, Any]]) -> None:
+    for lead in leads:
+      terms = self._stored.get(lead['id'])
+      document = search_document(lead, lead_terms(lead) if terms is None else terms)
+      if terms is None:
+        self._missing.append(document)
+      self._built.append(document)
+      self._index(lead['id'], document['terms'])
+
+  def complete(self) -> None:
+    documents, missing, stored = self._built, self._missing, self._stored
+    self._built, self._missing, self._stored = [], [], {}
+    if len(documents) - len(missing) != len(stored):
+      self._rewrite(documents)
+    elif missing:
+      self._append(missing)
+
+  def add(self, lead: Dict[str, Any]) -> None:
+    document = search_document(lead, lead_terms(lead))
+    self._index(lead['id'], document['terms'])
+    if self._file_path is not None:
+      self._unsaved.append(document)
+
+  def empty(self) -> 'SearchIndex':
+    return SearchIndex(str(self._file_path) if self._file_path else None)
+
+  def replace(self, other: 'SearchIndex') -> None:
+    self._postings, self._documents = other._postings, other._documents
+    self._position = other._position
+
+  async def flush(self) -> None:
+    if self._unsaved:
+      documents, self._unsaved = self._unsaved, []
+      await asyncio.to_thread(self._append, documents)
+
+  async def refresh(self) -> List[Dict[str, Any]]:
+    if self._file_path is None:
+      return []
+    leads: List[Dict[str, Any]] = []
+    for document in await asyncio.to_thread(self._read_new):
+      if document['id'] not in self._documents:
+        self._index(document['id'], document['terms'])
+        if 'timestamp' in document:
+          leads.append(document)
+    return leads
+
+  def search(self, text: str) -> List[int]:
+    terms = set(tokenize(text))
+    if not terms:
+      return []
+    postings = sorted((self._postings.get(term, set()) for term in terms), key=len)
+    matches = set(postings[0])
+    for posting in postings[1:]:
+      matches &= posting
+      if not matches:
+        break
+    return sorted(matches, reverse=True)
+
+  def _index(self, lead_id: int, terms: List[str]) -> None:
+    self._documents.add(lead_id)
+    for term in terms:
+      posting = self._postings.get(term)
+      if posting is None:
+        posting = self._postings[term] = set()
+      posting.add(lead_id)
+
+  def _load(self) -> Dict[int, List[str]]:
+    self._position = (0, 0)
+    return {document['id']: document['terms'] for document in self._read_new()}
+
+  def _read_new(self) -> List[Dict[str, Any]]:
+    documents: List[Dict[str, Any]] = []
+    for line in self._read_tail().split(b'\n'):
+      if not line:
+        continue
+      try:
+        documents.append(serializer.loads(line))
+      except json.JSONDecodeError:
+        logging.warning(f"Пропущена повреждённая строка поискового индекса {self._file_path}")
+    return documents
+
+  def _read_tail(self) -> bytes:
+    if self._file_path is None:
+      return b''
+    try:
+      f = open(self._file_path, 'rb')
+    except FileNotFoundError:
+      return b''
+    with f:
+      inode = os.fstat(f.fileno()).st_ino
+      offset = self._position[1] if inode == self._position[0] else 0
+      f.seek(offset)
+      content = f.read()
+    end = content.rfind(b'\n') + 1
+    self._position = (inode, offset + end)
+    return content[:end]
+
+  def _encode(self, documents: List[Dict[str, Any]]) -> bytes:
+    return b''.join(serializer.dumps(document) + b'\n' for document in documents)
+
+  def _append(self, documents: List[Dict[str, Any]]) -> None:
+    if self._file_path is None or not documents:
+      return
+    with self._file_lock:
+      with open(self._file_path, 'ab') as f:
+        f.write(self._encode(documents))
+        f.flush()
+        os.fsync(f.fileno())
+
+  def _rewrite(self, documents: List[Dict[str, Any]]) -> None:
+    if self._file_path is None:
+      return
+    tmp_path = self._file_path.with_name(f"{self._file_path.name}.tmp")
+    content = self._encode(documents)
+    with self._file_lock:
+      tail = self._read_tail()
+      with open(tmp_path, 'wb') as f:
+        f.write(content + tail)
+        f.flush()
+        os.fsync(f.fileno())
+        inode = os.fstat(f.fileno()).st_ino
+      os.replace(tmp_path, self._file_path)
+    self._position = (inode, len(content))
+    logging.info(f"Поисковый индекс перезаписан: {len(documents)} заявок")
@@ -0,0 +1,65 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+from starlette.responses import JSONResponse
+from .config import config, logging
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+
+class ISerializer(ABC):
+  name: str = ''
+
+  @abstractmethod
+  def dumps(self, data: Any, pretty: bool = False) -> bytes:
+    pass
+
+  @abstractmethod
+  def loads(self, data: bytes | str) -> Any:
+    pass
+
+
+class StdlibSerializer(ISerializer):
+  name = 'json'
+
+  def dumps(self, data: Any, pretty: bool = False) -> bytes:
+    if pretty:
+      return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+  def loads(self, data: bytes | str) -> Any:
+    return json.loads(data)
+
+
+class OrjsonSerializer(ISerializer):
+  name = 'orjson'
+
+  def dumps(self, data: Any, pretty: bool = False) -> bytes:
+    option = orjson.OPT_NON_STR_KEYS
+    if pretty:
+      option |= orjson.OPT_INDENT_2
+    return orjson.dumps(data, option=option)
+
+  def loads(self, data: bytes | str) -> Any:
+    return orjson.loads(data)
+
+
+def create_serializer(name: str = config.json_serializer) -> ISerializer:
+  if name == 'json':
+    return StdlibSerializer()
+  if orjson is None:
+    if name == 'orjson':
+      logging.warning("orjson не установлен, используется стандартный модуль json")
+    return StdlibSerializer()
+  return OrjsonSerializer()
+
+
+serializer: ISerializer = create_serializer()
+
+
+class FastJSONResponse(JSONResponse):
+  def render(self, content: Any) -> bytes:
+    return serializer.dumps(content)
@@ -1,15 +1,35 @@
 import aiofiles
 import asyncio
+import base64
+import bisect
+import gzip
+import heapq
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 import aiosmtplib
+import redis.asyncio as redis
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple, AsyncIterable, AsyncIterator
 import json
-from .schemas import Lead, LeadCreate
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from filelock import FileLock, Timeout
+from .schemas import (
+  Lead, LeadCreate, LeadFilter, LeadQuery, LeadPage, LeadImportError, LeadImportResult, LeadStats, LeadStatsQuery,
+  LeadSearchQuery, LeadImport, LEAD_IMPORT_LIST_ADAPTER
+)
+from .ids import ILeadIdAllocator, BlockLeadIdAllocator, FileLeadIdAllocator, lead_id_path
+from .smtp import SmtpConnectionPool
+from .indexes import ILeadIndex, LeadStatsIndex, RecentContactIndex, get_contact_value, normalize_contact
+from .search import SearchIndex
+from .serialization import serializer
+from .metrics import LEAD_CACHE_REQUESTS, LEAD_STAGE_SECONDS, LEADS_PROCESSED, NOTIFICATIONS_PENDING
 from .config import config, logging
 from fastapi import HTTPException, status
+from pydantic import ValidationError
 
 
 class ILeadRepository(ABC):
@@ -21,33 +41,820 @@ class ILeadRepository(ABC):
   async def add(self, lead_data: Dict[str, Any]) -> None:
     pass
 
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    for lead_data in leads:
+      await self.add(lead_data)
+
+  async def iter_all(self) -> AsyncIterator[Dict[str, Any]]:
+    for lead_data in await self.get_all():
+      yield lead_data
+
+  async def query(self, query: LeadQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await select_leads(self.iter_all(), query)
+
+  async def has_recent_contact(self, contact_method: str, contact_value: str, since: datetime) -> bool:
+    contact_value = normalize_contact(contact_value)
+    async for lead in self.iter_all():
+      if lead.get('contact_method') != contact_method:
+        continue
+      if datetime.fromisoformat(lead['timestamp']) > since and normalize_contact(get_contact_value(lead)) == contact_value:
+        return True
+    return False
+
+  async def max_id(self) -> int:
+    max_id = 0
+    async for lead in self.iter_all():
+      max_id = max(max_id, lead.get('id', 0))
+    return max_id
+
+  async def get_many(self, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    return await collect_leads(self.iter_all(), lead_ids)
+
+  async def close(self) -> None:
+    pass
+
+
+async def collect_leads(leads: AsyncIterator[Dict[str, Any]], lead_ids: List[int]) -> List[Dict[str, Any]]:
+  wanted = set(lead_ids)
+  found: Dict[int, Dict[str, Any]] = {}
+  if wanted:
+    async for lead_data in leads:
+      if lead_data.get('id') in wanted:
+        found[lead_data['id']] = lead_data
+        if len(found) == len(wanted):
+          break
+  return [found[lead_id] for lead_id in lead_ids if lead_id in found]
+
+
+def lead_matches(lead: Dict[str, Any], lead_filter: LeadFilter) -> bool:
+  if lead_filter.contact_method and lead.get('contact_method') != lead_filter.contact_method:
+    return False
+  if lead_filter.budget and lead.get('budget') != lead_filter.budget:
+    return False
+  if lead_filter.services and not set(lead_filter.services).intersection(lead.get('services', ())):
+    return False
+  if lead_filter.date_from or lead_filter.date_to:
+    timestamp = datetime.fromisoformat(lead['timestamp'])
+    if lead_filter.date_from and timestamp < lead_filter.date_from:
+      return False
+    if lead_filter.date_to and timestamp > lead_filter.date_to:
+      return False
+  return True
+
+
+def lead_sort_key(lead: Dict[str, Any], sort: str) -> Tuple[float, int]:
+  if sort == 'timestamp':
+    return datetime.fromisoformat(lead['timestamp']).timestamp(), lead['id']
+  return lead['id'], lead['id']
+
+
+def encode_cursor(key: Tuple[float, int]) -> str:
+  return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+  try:
+    primary, lead_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    return float(primary), int(lead_id)
+  except (ValueError, TypeError) as e:
+    raise ValueError(f"Некорректный курсор: {cursor}") from e
+
+
+async def select_leads(leads: AsyncIterator[Dict[str, Any]],
+                       query: LeadQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+  descending = query.order == 'desc'
+  sign = 1 if descending else -1
+  after = decode_cursor(query.cursor) if query.cursor else None
+  size = query.offset + query.limit
+  heap: List[Tuple[Tuple[float, float], int, Dict[str, Any]]] = []
+  sequence = 0
+  async for lead in leads:
+    if not lead_matches(lead, query):
+      continue
+    key = lead_sort_key(lead, query.sort)
+    if after is not None and (key >= after if descending else key <= after):
+      continue
+    entry = ((sign * key[0], sign * key[1]), sequence, lead)
+    sequence += 1
+    if len(heap) < size:
+      heapq.heappush(heap, entry)
+    else:
+      heapq.heappushpop(heap, entry)
+  page = [lead for _, _, lead in sorted(heap, reverse=True)][query.offset:]
+  next_cursor = encode_cursor(lead_sort_key(page[-1], query.sort)) if len(page) == query.limit else None
+  return page, next_cursor
+
 
 class JsonLeadRepository(ILeadRepository):
   def __init__(self, file_path: str):
     self._file_path = file_path
+    self._file_lock = FileLock(f"{file_path}.lock")
+    self._lock = asyncio.Lock()
 
   async def _read_leads(self) -> List[Dict[str, Any]]:
     try:
-      async with aiofiles.open(self._file_path, 'r', encoding='utf-8') as f:
+      async with aiofiles.open(self._file_path, 'rb') as f:
         content = await f.read()
-        return json.loads(content) if content.strip() else []
+        return serializer.loads(content) if content.strip() else []
     except FileNotFoundError:
       return []
     except json.JSONDecodeError as e:
       logging.warning(f"Ошибка декодирования JSON: {e}")
       return []
 
-  async def _write_leads(self, leads: List[Dict[str, Any]]) -> None:
-    async with aiofiles.open(self._file_path, 'w', encoding='utf-8') as f:
-      await f.write(json.dumps(leads, ensure_ascii=False, indent=2))
+  def _load(self) -> List[Dict[str, Any]]:
+    try:
+      with open(self._file_path, 'rb') as f:
+        content = f.read()
+    except FileNotFoundError:
+      return []
+    return serializer.loads(content) if content.strip() else []
+
+  def _write_leads(self, leads: List[Dict[str, Any]]) -> None:
+    tmp_path = f"{self._file_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+      f.write(serializer.dumps(leads))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, self._file_path)
+
+  def _append(self, leads: List[Dict[str, Any]]) -> None:
+    with self._file_lock:
+      stored = self._load()
+      stored.extend(leads)
+      self._write_leads(stored)
 
   async def get_all(self) -> List[Dict[str, Any]]:
     return await self._read_leads()
 
   async def add(self, lead_data: Dict[str, Any]) -> None:
-    leads = await self._read_leads()
-    leads.append(lead_data)
-    await self._write_leads(leads)
+    await self.add_many([lead_data])
+
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    if not leads:
+      return
+    async with self._lock:
+      await asyncio.to_thread(self._append, leads)
+
+
+def parse_lead_line(line: str) -> Optional[Dict[str, Any]]:
+  if not line.strip():
+    return None
+  try:
+    return serializer.loads(line)
+  except json.JSONDecodeError as e:
+    logging.warning(f"Пропущена повреждённая строка журнала заявок: {e}")
+    return None
+
+
+def encode_lead_lines(leads: List[Dict[str, Any]]) -> bytes:
+  return b''.join(serializer.dumps(lead) + b'\n' for lead in leads)
+
+
+def append_lines(file_path: str | Path, payload: bytes) -> None:
+  fd = os.open(file_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+  try:
+    size = os.fstat(fd).st_size
+    if size and os.pread(fd, 1, size - 1) != b'\n':
+      payload = b'\n' + payload
+    view = memoryview(payload)
+    while view:
+      written = os.write(fd, view)
+      view = view[written:]
+    os.fsync(fd)
+  finally:
+    os.close(fd)
+
+
+class JsonLinesLeadRepository(ILeadRepository):
+  def __init__(self, file_path: str):
+    self._file_path = file_path
+
+  async def get_all(self) -> List[Dict[str, Any]]:
+    try:
+      async with aiofiles.open(self._file_path, 'r', encoding='utf-8') as f:
+        content = await f.read()
+    except FileNotFoundError:
+      return []
+
+    leads: List[Dict[str, Any]] = []
+    for line in content.splitlines():
+      lead_data = parse_lead_line(line)
+      if lead_data is not None:
+        leads.append(lead_data)
+    return leads
+
+  async def iter_all(self) -> AsyncIterator[Dict[str, Any]]:
+    try:
+      f = await aiofiles.open(self._file_path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+      return
+    try:
+      tail = ''
+      while chunk := await f.read(65536):
+        lines = (tail + chunk).split('\n')
+        tail = lines.pop()
+        for line in lines:
+          lead_data = parse_lead_line(line)
+          if lead_data is not None:
+            yield lead_data
+      lead_data = parse_lead_line(tail)
+      if lead_data is not None:
+        yield lead_data
+    finally:
+      await f.close()
+
+  async def add(self, lead_data: Dict[str, Any]) -> None:
+    await self.add_many([lead_data])
+
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    if not leads:
+      return
+    await asyncio.to_thread(append_lines, self._file_path, encode_lead_lines(leads))
+
+
+def segment_name(lead: Dict[str, Any]) -> str:
+  return lead['timestamp'][:7]
+
+
+def segment_stats(name: str, leads: List[Dict[str, Any]], segment: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+  stats = dict(segment or {'name': name, 'count': 0, 'min_id': None, 'max_id': 0,
+                           'first': None, 'last': None, 'compressed': False})
+  for lead in leads:
+    stats['count'] += 1
+    stats['min_id'] = lead['id'] if stats['min_id'] is None else min(stats['min_id'], lead['id'])
+    stats['max_id'] = max(stats['max_id'], lead['id'])
+    stats['first'] = lead['timestamp'] if stats['first'] is None else min(stats['first'], lead['timestamp'])
+    stats['last'] = lead['timestamp'] if stats['last'] is None else max(stats['last'], lead['timestamp'])
+  return stats
+
+
+class SegmentedLeadRepository(ILeadRepository):
+  def __init__(self, directory: str):
+    self._directory = Path(directory)
+    self._directory.mkdir(parents=True, exist_ok=True)
+    self._manifest_path = self._directory / 'manifest.json'
+    self._file_lock = FileLock(str(self._directory / 'manifest.json.lock'))
+    self._lock = asyncio.Lock()
+
+  @property
+  def manifest_path(self) -> Path:
+    return self._manifest_path
+
+  def _tail_path(self, name: str) -> Path:
+    return self._directory / f"{name}.jsonl"
+
+  def _archive_path(self, name: str) -> Path:
+    return self._directory / f"{name}.jsonl.gz"
+
+  def read_manifest(self) -> Dict[str, Dict[str, Any]]:
+    try:
+      content = self._manifest_path.read_bytes()
+    except FileNotFoundError:
+      return {}
+    return {segment['name']: segment for segment in serializer.loads(content)['segments']}
+
+  def _write_manifest(self, segments: Dict[str, Dict[str, Any]]) -> None:
+    tmp_path = self._manifest_path.with_name(f"{self._manifest_path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+      f.write(serializer.dumps({'version': 1, 'segments': [segments[name] for name in sorted(segments)]}))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, self._manifest_path)
+
+  def _segment_names(self, segments: Dict[str, Dict[str, Any]]) -> List[str]:
+    names = set(segments)
+    for file_path in self._directory.glob('*.jsonl*'):
+      names.add(file_path.name.split('.', 1)[0])
+    return sorted(names)
+
+  def _read_segment(self, name: str) -> List[Dict[str, Any]]:
+    lines: List[str] = []
+    archive_path = self._archive_path(name)
+    if archive_path.exists():
+      with gzip.open(archive_path, 'rt', encoding='utf-8') as f:
+        lines.extend(f.read().splitlines())
+    try:
+      lines.extend(self._tail_path(name).read_text(encoding='utf-8').splitlines())
+    except FileNotFoundError:
+      pass
+    return [lead for lead in map(parse_lead_line, lines) if lead is not None]
+
+  def _append(self, leads: List[Dict[str, Any]]) -> None:
+    by_segment: Dict[str, List[Dict[str, Any]]] = {}
+    for lead in leads:
+      by_segment.setdefault(segment_name(lead), []).append(lead)
+    with self._file_lock:
+      segments = self.read_manifest()
+      for name, segment_leads in sorted(by_segment.items()):
+        append_lines(self._tail_path(name), encode_lead_lines(segment_leads))
+        segments[name] = segment_stats(name, segment_leads, segments.get(name))
+      self._write_manifest(segments)
+
+  async def _iter_segments(self, names: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    for name in names:
+      for lead_data in await asyncio.to_thread(self._read_segment, name):
+        yield lead_data
+
+  async def _select_segments(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[str]:
+    segments = await asyncio.to_thread(self.read_manifest)
+    names = await asyncio.to_thread(self._segment_names, segments)
+    selected = []
+    for name in names:
+      segment = segments.get(name)
+      if segment is not None and segment['count']:
+        if date_from is not None and segment['last'] < date_from:
+          continue
+        if date_to is not None and segment['first'] > date_to:
+          continue
+      selected.append(name)
+    return selected
+
+  async def get_all(self) -> List[Dict[str, Any]]:
+    return [lead_data async for lead_data in self.iter_all()]
+
+  async def iter_all(self) -> AsyncIterator[Dict[str, Any]]:
+    async for lead_data in self._iter_segments(await self._select_segments()):
+      yield lead_data
+
+  async def query(self, query: LeadQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    names = await self._select_segments(
+      query.date_from.isoformat() if query.date_from else None,
+      query.date_to.isoformat() if query.date_to else None
+    )
+    return await select_leads(self._iter_segments(names), query)
+
+  async def has_recent_contact(self, contact_method: str, contact_value: str, since: datetime) -> bool:
+    contact_value = normalize_contact(contact_value)
+    async for lead in self._iter_segments(await self._select_segments(since.isoformat())):
+      if lead.get('contact_method') != contact_method:
+        continue
+      if datetime.fromisoformat(lead['timestamp']) > since and normalize_contact(get_contact_value(lead)) == contact_value:
+        return True
+    return False
+
+  async def max_id(self) -> int:
+    segments = await asyncio.to_thread(self.read_manifest)
+    names = await asyncio.to_thread(self._segment_names, segments)
+    max_id = max((segment['max_id'] for segment in segments.values()), default=0)
+    unindexed = [name for name in names if name not in segments]
+    async for lead in self._iter_segments(unindexed):
+      max_id = max(max_id, lead.get('id', 0))
+    return max_id
+
+  async def get_many(self, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    if not lead_ids:
+      return []
+    segments = await asyncio.to_thread(self.read_manifest)
+    names = []
+    for name in await asyncio.to_thread(self._segment_names, segments):
+      segment = segments.get(name)
+      if segment is None or any(segment['min_id'] <= lead_id <= segment['max_id'] for lead_id in lead_ids):
+        names.append(name)
+    return await collect_leads(self._iter_segments(names), lead_ids)
+
+  async def add(self, lead_data: Dict[str, Any]) -> None:
+    await self.add_many([lead_data])
+
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    if not leads:
+      return
+    async with self._lock:
+      await asyncio.to_thread(self._append, leads)
+
+  def _compact(self, before: str, compress: bool) -> List[str]:
+    compacted: List[str] = []
+    with self._file_lock:
+      segments = self.read_manifest()
+      for name in self._segment_names(segments):
+        if name >= before:
+          continue
+        unique: Dict[int, Dict[str, Any]] = {}
+        for lead in self._read_segment(name):
+          unique.setdefault(lead['id'], lead)
+        leads = [unique[lead_id] for lead_id in sorted(unique)]
+        payload = encode_lead_lines(leads)
+        target = self._archive_path(name) if compress else self._tail_path(name)
+        stale = self._tail_path(name) if compress else self._archive_path(name)
+        tmp_path = target.with_name(f"{target.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+          f.write(gzip.compress(payload, mtime=0) if compress else payload)
+          f.flush()
+          os.fsync(f.fileno())
+        os.replace(tmp_path, target)
+        stale.unlink(missing_ok=True)
+        stats = segment_stats(name, leads)
+        stats['compressed'] = compress
+        segments[name] = stats
+        compacted.append(name)
+      self._write_manifest(segments)
+    return compacted
+
+  async def compact(self, before: str, compress: bool = False) -> List[str]:
+    async with self._lock:
+      return await asyncio.to_thread(self._compact, before, compress)
+
+
+class CachedLeadRepository(ILeadRepository):
+  def __init__(self, repository: ILeadRepository, file_path: str):
+    self._repository = repository
+    self._file_path = file_path
+    self._leads: Optional[List[Dict[str, Any]]] = None
+    self._signature: Optional[Tuple[int, int, int]] = None
+    self._lock = asyncio.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def _stat(self) -> Optional[Tuple[int, int, int]]:
+    try:
+      stat = os.stat(self._file_path)
+    except FileNotFoundError:
+      return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+  def _is_fresh(self) -> bool:
+    return self._leads is not None and self._stat() == self._signature
+
+  def invalidate(self) -> None:
+    self._leads = None
+    self._signature = None
+
+  async def get_all(self) -> List[Dict[str, Any]]:
+    async with self._lock:
+      if self._is_fresh():
+        self.hits += 1
+        LEAD_CACHE_REQUESTS.inc(result='hit')
+      else:
+        self.misses += 1
+        LEAD_CACHE_REQUESTS.inc(result='miss')
+        self._signature = self._stat()
+        self._leads = await self._repository.get_all()
+      return list(self._leads)
+
+  async def add(self, lead_data: Dict[str, Any]) -> None:
+    await self.add_many([lead_data])
+
+  async def get_many(self, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    async def cached() -> AsyncIterator[Dict[str, Any]]:
+      for lead_data in await self.get_all():
+        yield lead_data
+
+    return await collect_leads(cached(), lead_ids)
+
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    async with self._lock:
+      try:
+        await self._repository.add_many(leads)
+      finally:
+        self.invalidate()
+
+  def stats(self) -> Dict[str, float]:
+    total = self.hits + self.misses
+    return {
+      'hits': self.hits,
+      'misses': self.misses,
+      'hit_rate': self.hits / total if total else 0.0
+    }
+
+  async def close(self) -> None:
+    self.invalidate()
+    await self._repository.close()
+
+
+class BatchingLeadRepository(ILeadRepository):
+  def __init__(self, repository: ILeadRepository, max_delay: float = 0.002, max_batch: int = 100):
+    self._repository = repository
+    self._max_delay = max_delay
+    self._max_batch = max_batch
+    self._pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]] = []
+    self._pending_count = 0
+    self._timer: Optional[asyncio.Task] = None
+    self._flushes: set[asyncio.Task] = set()
+    self._write_lock = asyncio.Lock()
+    self.commits = 0
+
+  async def get_all(self) -> List[Dict[str, Any]]:
+    return await self._repository.get_all()
+
+  async def iter_all(self) -> AsyncIterator[Dict[str, Any]]:
+    async for lead_data in self._repository.iter_all():
+      yield lead_data
+
+  async def query(self, query: LeadQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await self._repository.query(query)
+
+  async def has_recent_contact(self, contact_method: str, contact_value: str, since: datetime) -> bool:
+    return await self._repository.has_recent_contact(contact_method, contact_value, since)
+
+  async def max_id(self) -> int:
+    return await self._repository.max_id()
+
+  async def get_many(self, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    return await self._repository.get_many(lead_ids)
+
+  async def add(self, lead_data: Dict[str, Any]) -> None:
+    await self.add_many([lead_data])
+
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    if not leads:
+      return
+    future = asyncio.get_running_loop().create_future()
+    self._pending.append((leads, future))
+    self._pending_count += len(leads)
+    if self._pending_count >= self._max_batch:
+      if self._timer is not None:
+        self._timer.cancel()
+        self._timer = None
+      task = asyncio.create_task(self.flush())
+      self._flushes.add(task)
+      task.add_done_callback(self._flushes.discard)
+    elif self._timer is None:
+      self._timer = asyncio.create_task(self._flush_later())
+    await asyncio.shield(future)
+
+  async def _flush_later(self) -> None:
+    await asyncio.sleep(self._max_delay)
+    self._timer = None
+    await self.flush()
+
+  async def flush(self) -> None:
+    async with self._write_lock:
+      batch, self._pending = self._pending, []
+      self._pending_count = 0
+      if not batch:
+        return
+      try:
+        await self._repository.add_many([lead_data for leads, _ in batch for lead_data in leads])
+      except Exception as e:
+        logging.error(f"Ошибка групповой записи ({len(batch)} операций): {e}")
+        for _, future in batch:
+          if not future.done():
+            future.set_exception(e)
+        return
+      self.commits += 1
+      for _, future in batch:
+        if not future.done():
+          future.set_result(None)
+
+  async def close(self) -> None:
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+    if self._flushes:
+      await asyncio.gather(*self._flushes, return_exceptions=True)
+    await self.flush()
+    await self._repository.close()
+
+
+class SqliteLeadRepository(ILeadRepository):
+  _SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS leads (
+      id INTEGER PRIMARY KEY,
+      timestamp REAL NOT NULL,
+      contact_method TEXT NOT NULL,
+      contact TEXT NOT NULL,
+      budget TEXT,
+      services TEXT NOT NULL,
+      data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_leads_timestamp ON leads (timestamp);
+    CREATE INDEX IF NOT EXISTS idx_leads_contact ON leads (contact_method, contact);
+    CREATE TABLE IF NOT EXISTS lead_sequence (
+      name TEXT PRIMARY KEY,
+      value INTEGER NOT NULL
+    );
+  '''
+  _BATCH_SIZE = 500
+
+  def __init__(self, db_path: str):
+    self._db_path = db_path
+    self._local = threading.local()
+    self._connections: List[sqlite3.Connection] = []
+    self._connections_lock = threading.Lock()
+
+  def _connection(self) -> sqlite3.Connection:
+    connection = getattr(self._local, 'connection', None)
+    if connection is None:
+      connection = sqlite3.connect(self._db_path, timeout=30, isolation_level=None, check_same_thread=False)
+      connection.execute('PRAGMA journal_mode=WAL')
+      connection.execute('PRAGMA synchronous=FULL')
+      connection.executescript(self._SCHEMA)
+      self._local.connection = connection
+      with self._connections_lock:
+        self._connections.append(connection)
+    return connection
+
+  def _close_connections(self) -> None:
+    with self._connections_lock:
+      connections, self._connections = self._connections, []
+    for connection in connections:
+      connection.close()
+    self._local = threading.local()
+
+  def _fetch(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+    return self._connection().execute(sql, params).fetchall()
+
+  def _insert(self, leads: List[Dict[str, Any]]) -> None:
+    rows = [
+      (
+        lead['id'], datetime.fromisoformat(lead['timestamp']).timestamp(), lead['contact_method'],
+        normalize_contact(get_contact_value(lead)), lead.get('budget'),
+        serializer.dumps(lead.get('services', [])).decode('utf-8'), serializer.dumps(lead).decode('utf-8')
+      )
+      for lead in leads
+    ]
+    connection = self._connection()
+    with connection:
+      connection.execute('BEGIN IMMEDIATE')
+      connection.executemany(
+        'INSERT INTO leads (id, timestamp, contact_method, contact, budget, services, data) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+      )
+
+  def _next_id(self, count: int = 1) -> int:
+    connection = self._connection()
+    with connection:
+      connection.execute('BEGIN IMMEDIATE')
+      connection.execute(
+        "INSERT OR IGNORE INTO lead_sequence (name, value) SELECT 'leads', COALESCE(MAX(id), 0) FROM leads"
+      )
+      return connection.execute(
+        "UPDATE lead_sequence SET value = value + ? WHERE name = 'leads' RETURNING value", (count,)
+      ).fetchone()[0]
+
+  async def get_all(self) -> List[Dict[str, Any]]:
+    rows = await asyncio.to_thread(self._fetch, 'SELECT data FROM leads ORDER BY id')
+    return [serializer.loads(data) for data, in rows]
+
+  async def iter_all(self) -> AsyncIterator[Dict[str, Any]]:
+    last_id = -1
+    while True:
+      rows = await asyncio.to_thread(
+        self._fetch, 'SELECT id, data FROM leads WHERE id > ? ORDER BY id LIMIT ?', (last_id, self._BATCH_SIZE)
+      )
+      for last_id, data in rows:
+        yield serializer.loads(data)
+      if len(rows) < self._BATCH_SIZE:
+        return
+
+  async def add(self, lead_data: Dict[str, Any]) -> None:
+    await self.add_many([lead_data])
+
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    if leads:
+      await asyncio.to_thread(self._insert, leads)
+
+  async def get_many(self, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    found: Dict[int, Dict[str, Any]] = {}
+    for start in range(0, len(lead_ids), self._BATCH_SIZE):
+      chunk = tuple(lead_ids[start:start + self._BATCH_SIZE])
+      rows = await asyncio.to_thread(
+        self._fetch, f"SELECT id, data FROM leads WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+      )
+      found.update((lead_id, serializer.loads(data)) for lead_id, data in rows)
+    return [found[lead_id] for lead_id in lead_ids if lead_id in found]
+
+  async def next_id(self) -> int:
+    return await asyncio.to_thread(self._next_id)
+
+  async def next_ids(self, count: int) -> List[int]:
+    if count <= 0:
+      return []
+    last_id = await asyncio.to_thread(self._next_id, count)
+    return list(range(last_id - count + 1, last_id + 1))
+
+  async def max_id(self) -> int:
+    rows = await asyncio.to_thread(self._fetch, 'SELECT COALESCE(MAX(id), 0) FROM leads')
+    return rows[0][0]
+
+  async def close(self) -> None:
+    await asyncio.to_thread(self._close_connections)
+
+  async def has_recent_contact(self, contact_method: str, contact_value: str, since: datetime) -> bool:
+    rows = await asyncio.to_thread(
+      self._fetch,
+      'SELECT 1 FROM leads WHERE contact_method = ? AND contact = ? AND timestamp > ? LIMIT 1',
+      (contact_method, normalize_contact(contact_value), since.timestamp())
+    )
+    return bool(rows)
+
+  async def query(self, query: LeadQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    conditions: List[str] = []
+    params: List[Any] = []
+    if query.contact_method:
+      conditions.append('contact_method = ?')
+      params.append(query.contact_method)
+    if query.budget:
+      conditions.append('budget = ?')
+      params.append(query.budget)
+    if query.date_from:
+      conditions.append('timestamp >= ?')
+      params.append(query.date_from.timestamp())
+    if query.date_to:
+      conditions.append('timestamp <= ?')
+      params.append(query.date_to.timestamp())
+    if query.services:
+      placeholders = ', '.join('?' * len(query.services))
+      conditions.append(f'EXISTS (SELECT 1 FROM json_each(leads.services) WHERE json_each.value IN ({placeholders}))')
+      params.extend(query.services)
+
+    sort_column = 'timestamp' if query.sort == 'timestamp' else 'id'
+    direction = 'DESC' if query.order == 'desc' else 'ASC'
+    if query.cursor:
+      primary, lead_id = decode_cursor(query.cursor)
+      conditions.append(f"({sort_column}, id) {'<' if query.order == 'desc' else '>'} (?, ?)")
+      params.extend([int(primary) if sort_column == 'id' else primary, lead_id])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = f'SELECT data FROM leads {where} ORDER BY {sort_column} {direction}, id {direction} LIMIT ? OFFSET ?'
+    rows = await asyncio.to_thread(self._fetch, sql, (*params, query.limit, query.offset))
+    page = [serializer.loads(data) for data, in rows]
+    next_cursor = encode_cursor(lead_sort_key(page[-1], query.sort)) if len(page) == query.limit else None
+    return page, next_cursor
+
+
+class SqliteLeadIdAllocator(BlockLeadIdAllocator):
+  def __init__(self, repository: SqliteLeadRepository, block_size: int = 1):
+    super().__init__(block_size)
+    self._repository = repository
+
+  async def _reserve_block(self, count: int) -> int:
+    return (await self._repository.next_ids(count))[0]
+
+
+def leads_log_path(leads_file: str | Path) -> Path:
+  return Path(leads_file).with_suffix('.jsonl')
+
+
+def leads_db_path(leads_file: str | Path) -> Path:
+  return Path(leads_file).with_suffix('.sqlite3')
+
+
+def leads_segments_path(leads_file: str | Path) -> Path:
+  return Path(leads_file).with_suffix('.segments')
+
+
+def leads_search_path(leads_file: str | Path) -> Path:
+  return Path(leads_file).with_suffix('.search.jsonl')
+
+
+def leads_storage_path(leads_file: str | Path) -> Path:
+  if config.leads_storage == 'sqlite':
+    return leads_db_path(leads_file)
+  if config.leads_storage == 'jsonl':
+    return leads_log_path(leads_file)
+  if config.leads_storage == 'segmented':
+    return leads_segments_path(leads_file)
+  return Path(leads_file)
+
+
+def renumber_duplicate_ids(leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+  next_id = max((lead.get('id', 0) for lead in leads), default=0) + 1
+  seen: Set[int] = set()
+  renumbered: List[Dict[str, Any]] = []
+  for lead in leads:
+    if lead['id'] in seen:
+      logging.warning(f"Повторный ID заявки #{lead['id']} при переносе, заявке присвоен #{next_id}")
+      lead = {**lead, 'id': next_id}
+      next_id += 1
+    seen.add(lead['id'])
+    renumbered.append(lead)
+  return renumbered
+
+
+async def migrate_json_leads(source: str | Path, target: ILeadRepository, lock_file: str | Path) -> int:
+  if not Path(source).exists():
+    return 0
+  migration_lock = FileLock(str(lock_file), thread_local=False)
+  await asyncio.to_thread(migration_lock.acquire)
+  try:
+    if await target.max_id():
+      return 0
+    leads = renumber_duplicate_ids(await JsonLeadRepository(str(source)).get_all())
+    await target.add_many(leads)
+    return len(leads)
+  finally:
+    migration_lock.release()
+
+
+def create_storage_backend() -> ILeadRepository:
+  storage_path = str(leads_storage_path(config.leads_file))
+  if config.leads_storage == 'sqlite':
+    return SqliteLeadRepository(storage_path)
+  if config.leads_storage == 'jsonl':
+    return JsonLinesLeadRepository(storage_path)
+  if config.leads_storage == 'segmented':
+    return SegmentedLeadRepository(storage_path)
+  return JsonLeadRepository(storage_path)
+
+
+def create_lead_repository(backend: Optional[ILeadRepository] = None) -> ILeadRepository:
+  repository = backend or create_storage_backend()
+  if config.leads_cache and config.leads_storage in ('json', 'jsonl'):
+    repository = CachedLeadRepository(repository, str(leads_storage_path(config.leads_file)))
+  if config.write_batch_size > 1:
+    repository = BatchingLeadRepository(repository, config.write_batch_delay, config.write_batch_size)
+  return repository
 
 
 class ILeadValidator(ABC):
@@ -73,6 +880,9 @@ class IDuplicateChecker(ABC):
   async def is_duplicate(self, lead_data: LeadCreate) -> bool:
     pass
 
+  async def release(self, lead_data: LeadCreate) -> None:
+    pass
+
 
 class TimeBasedDuplicateChecker(IDuplicateChecker):
   def __init__(self, repository: ILeadRepository, duplicate_window: timedelta = timedelta(minutes=5)):
@@ -80,30 +890,180 @@ class TimeBasedDuplicateChecker(IDuplicateChecker):
     self._duplicate_window = duplicate_window
 
   def _get_contact_value(self, lead_data: LeadCreate | Dict[str, Any]) -> str:
-    if lead_data.contact_method == 'whatsapp':
-      return lead_data.phone or '' if isinstance(lead_data, LeadCreate) else lead_data.get('phone', '')
-    elif lead_data.contact_method == 'telegram':
-      return lead_data.telegram or '' if isinstance(lead_data, LeadCreate) else lead_data.get('telegram', '')
-    elif lead_data.contact_method == 'phone':
-      return lead_data.phone_number or '' if isinstance(lead_data, LeadCreate) else lead_data.get('phone_number', '')
-    elif lead_data.contact_method == 'email':
-      return lead_data.email or '' if isinstance(lead_data, LeadCreate) else lead_data.get('email', '')
-    return ''
+    return get_contact_value(lead_data)
 
   async def is_duplicate(self, lead_data: LeadCreate) -> bool:
-    leads = await self._repository.get_all()
     contact_value = self._get_contact_value(lead_data).lower().strip()
     if not contact_value:
       return False
+    since = datetime.now() - self._duplicate_window
+    return await self._repository.has_recent_contact(lead_data.contact_method, contact_value, since)
 
-    for lead in leads:
-      lead_time = datetime.fromisoformat(lead["timestamp"])
-      if (datetime.now() - lead_time) < self._duplicate_window:
-        if lead["contact_method"] == lead_data.contact_method:
-          lead_contact_value = self._get_contact_value(lead).lower().strip()
-          if lead_contact_value == contact_value:
-            return True
-    return False
+
+class IndexedLeadRepository(ILeadRepository):
+  _CHUNK_SIZE = 1000
+
+  def __init__(self, repository: ILeadRepository, indexes: List[ILeadIndex]):
+    self._repository = repository
+    self._indexes = indexes
+    self._built = False
+    self._lock = asyncio.Lock()
+    self._replay: Optional[List[Dict[str, Any]]] = None
+    self._writes: Set[asyncio.Event] = set()
+
+  async def ensure_built(self) -> None:
+    if self._built:
+      return
+    async with self._lock:
+      if not self._built:
+        await self._rebuild()
+
+  async def rebuild(self) -> None:
+    async with self._lock:
+      await self._rebuild()
+
+  async def _rebuild(self) -> None:
+    self._replay = []
+    try:
+      fresh = [index.empty() for index in self._indexes]
+      await asyncio.to_thread(self._start, fresh)
+      snapshot: Set[int] = set()
+      chunk: List[Dict[str, Any]] = []
+      async for lead_data in self._repository.iter_all():
+        chunk.append(lead_data)
+        if len(chunk) >= self._CHUNK_SIZE:
+          snapshot.update(lead['id'] for lead in chunk)
+          await asyncio.to_thread(self._load, fresh, chunk)
+          chunk = []
+      snapshot.update(lead['id'] for lead in chunk)
+      pending = list(self._writes)
+      await asyncio.to_thread(self._load, fresh, chunk)
+      await asyncio.to_thread(self._complete, fresh)
+      await asyncio.gather(*(written.wait() for written in pending))
+      for lead_data in self._replay:
+        if lead_data['id'] not in snapshot:
+          for built in fresh:
+            built.add(lead_data)
+      for index, built in zip(self._indexes, fresh):
+        index.replace(built)
+      self._built = True
+    finally:
+      self._replay = None
+
+  async def refresh(self) -> None:
+    await self.ensure_built()
+    if self._lock.locked():
+      return
+    async with self._lock:
+      for index in self._indexes:
+        leads = await index.refresh()
+        for other in self._indexes:
+          if other is not index:
+            for lead_data in leads:
+              other.add(lead_data)
+
+  def _start(self, indexes: List[ILeadIndex]) -> None:
+    for index in indexes:
+      index.start()
+
+  def _load(self, indexes: List[ILeadIndex], leads: List[Dict[str, Any]]) -> None:
+    for index in indexes:
+      index.load(leads)
+
+  def _complete(self, indexes: List[ILeadIndex]) -> None:
+    for index in indexes:
+      index.complete()
+
+  async def get_all(self) -> List[Dict[str, Any]]:
+    return await self._repository.get_all()
+
+  async def iter_all(self) -> AsyncIterator[Dict[str, Any]]:
+    async for lead_data in self._repository.iter_all():
+      yield lead_data
+
+  async def query(self, query: LeadQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await self._repository.query(query)
+
+  async def has_recent_contact(self, contact_method: str, contact_value: str, since: datetime) -> bool:
+    return await self._repository.has_recent_contact(contact_method, contact_value, since)
+
+  async def max_id(self) -> int:
+    return await self._repository.max_id()
+
+  async def get_many(self, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    return await self._repository.get_many(lead_ids)
+
+  async def close(self) -> None:
+    await self._repository.close()
+
+  async def add(self, lead_data: Dict[str, Any]) -> None:
+    await self.add_many([lead_data])
+
+  async def add_many(self, leads: List[Dict[str, Any]]) -> None:
+    await self.ensure_built()
+    written = asyncio.Event()
+    self._writes.add(written)
+    try:
+      await self._repository.add_many(leads)
+      for lead_data in leads:
+        for index in self._indexes:
+          index.add(lead_data)
+      if self._replay is not None:
+        self._replay.extend(leads)
+    finally:
+      self._writes.discard(written)
+      written.set()
+    for index in self._indexes:
+      await index.flush()
+
+
+class IndexedDuplicateChecker(IDuplicateChecker):
+  def __init__(self, repository: IndexedLeadRepository, index: RecentContactIndex):
+    self._repository = repository
+    self._index = index
+
+  async def is_duplicate(self, lead_data: LeadCreate) -> bool:
+    contact_value = get_contact_value(lead_data)
+    if not contact_value.strip():
+      return False
+    await self._repository.ensure_built()
+    return self._index.contains(lead_data.contact_method, contact_value)
+
+
+class RedisDuplicateChecker(IDuplicateChecker):
+  def __init__(self, client: redis.Redis, duplicate_window: timedelta = timedelta(minutes=5),
+               key_prefix: str = 'terrasite:duplicate'):
+    self._client = client
+    self._duplicate_window = duplicate_window
+    self._key_prefix = key_prefix
+
+  def _key(self, lead_data: LeadCreate) -> Optional[str]:
+    contact_value = normalize_contact(get_contact_value(lead_data))
+    if not contact_value:
+      return None
+    return f"{self._key_prefix}:{lead_data.contact_method}:{contact_value}"
+
+  async def is_duplicate(self, lead_data: LeadCreate) -> bool:
+    key = self._key(lead_data)
+    if key is None:
+      return False
+    window_ms = max(1, int(self._duplicate_window.total_seconds() * 1000))
+    reserved = await self._client.set(key, datetime.now().isoformat(), nx=True, px=window_ms)
+    return not reserved
+
+  async def release(self, lead_data: LeadCreate) -> None:
+    key = self._key(lead_data)
+    if key is not None:
+      await self._client.delete(key)
+
+
+_redis_clients: Dict[str, redis.Redis] = {}
+
+
+def get_redis_client(url: str) -> redis.Redis:
+  if url not in _redis_clients:
+    _redis_clients[url] = redis.Redis.from_url(url)
+  return _redis_clients[url]
 
 
 class INotifier(ABC):
@@ -111,19 +1071,35 @@ class INotifier(ABC):
   async def notify(self, lead: Lead) -> None:
     pass
 
+  async def notify_many(self, leads: List[Lead]) -> None:
+    for lead in leads:
+      await self.notify(lead)
+
+  async def notify_import(self, result: LeadImportResult) -> None:
+    pass
+
+  async def start(self) -> None:
+    pass
+
+  async def close(self) -> None:
+    pass
+
 
 class EmailNotifier(INotifier):
   def __init__(self, smtp_host: str = config.smtp_host, smtp_port: int = config.smtp_port,
                smtp_user: str = config.smtp_user, smtp_password: str = config.smtp_password,
-               from_email: str = config.from_email, to_email: str = config.to_email):
+               from_email: str = config.from_email, to_email: str = config.to_email,
+               use_tls: bool = config.smtp_use_tls, pool: Optional[SmtpConnectionPool] = None):
     self._smtp_host = smtp_host
     self._smtp_port = smtp_port
     self._smtp_user = smtp_user
     self._smtp_password = smtp_password
     self._from_email = from_email
     self._to_email = to_email
+    self._use_tls = use_tls
+    self._pool = pool
 
-  async def notify(self, lead: Lead) -> None:
+  def _build_section(self, lead: Lead) -> str:
     services_text = ", ".join(lead.services)
     budget_map: Dict[str, str] = {
       '30-50k': '30-50 тыс',
@@ -151,11 +1127,7 @@ class EmailNotifier(INotifier):
     elif lead.contact_method == 'email':
       contact_value = lead.email or ''
 
-    subject = f"Новая заявка с сайта Terrasite от {lead.name}"
-
-    body = f"""
-Новая заявка с сайта Terrasite!
-
+    return f"""
 Контактная информация:
 Имя: {lead.name}
 Способ связи: {contact_method_text}
@@ -169,63 +1141,550 @@ class EmailNotifier(INotifier):
 {lead.description}
 
 Время подачи заявки: {lead.timestamp.strftime('%d.%m.%Y %H:%M')}
-
----
-Отправлено автоматически с сайта Terrasite
         """.strip()
 
+  def _build_message(self, subject: str, header: str, sections: List[str]) -> MIMEMultipart:
+    body = f"{header}\n\n" + "\n\n======\n\n".join(sections) + "\n\n---\nОтправлено автоматически с сайта Terrasite"
+
     msg = MIMEMultipart()
     msg['From'] = self._from_email
     msg['To'] = self._to_email
     msg['Subject'] = subject
     msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    return msg
 
-    async with aiosmtplib.SMTP(hostname=self._smtp_host, port=self._smtp_port, use_tls=True) as server:
-      await server.login(self._smtp_user, self._smtp_password)
-      await server.send_message(msg)
+  async def _send(self, msg: MIMEMultipart) -> None:
+    if self._pool is not None:
+      await self._pool.send_message(msg)
+    else:
+      async with aiosmtplib.SMTP(hostname=self._smtp_host, port=self._smtp_port, use_tls=self._use_tls) as server:
+        await server.login(self._smtp_user, self._smtp_password)
+        await server.send_message(msg)
 
+  async def notify(self, lead: Lead) -> None:
+    msg = self._build_message(
+      f"Новая заявка с сайта Terrasite от {lead.name}", "Новая заявка с сайта Terrasite!", [self._build_section(lead)]
+    )
+    await self._send(msg)
     logging.info(f"Уведомление о заявке #{lead.id} отправлено")
 
+  async def notify_many(self, leads: List[Lead]) -> None:
+    if not leads:
+      return
+    if len(leads) == 1:
+      await self.notify(leads[0])
+      return
+    msg = self._build_message(
+      f"Новые заявки с сайта Terrasite: {len(leads)}",
+      f"Новые заявки с сайта Terrasite: {len(leads)}",
+      [f"Заявка #{lead.id}\n\n{self._build_section(lead)}" for lead in leads]
+    )
+    await self._send(msg)
+    logging.info(f"Сводное уведомление о заявках #{leads[0].id}-#{leads[-1].id} отправлено")
+
+  async def notify_import(self, result: LeadImportResult) -> None:
+    if not result.ids:
+      return
+    first_id, last_id = min(result.ids), max(result.ids)
+    msg = self._build_message(
+      f"Импорт заявок на сайт Terrasite: {result.imported}",
+      f"Импортировано заявок: {result.imported}",
+      [f"Номера заявок: #{first_id}-#{last_id}\nПропущено дублей: {result.duplicates}\nОшибок: {len(result.errors)}"]
+    )
+    await self._send(msg)
+    logging.info(f"Уведомление об импорте заявок #{first_id}-#{last_id} отправлено")
+
+  async def close(self) -> None:
+    if self._pool is not None:
+      await self._pool.close()
+
+
+class OutboxNotifier(INotifier):
+  def __init__(self, notifier: INotifier, outbox_file: str, max_size: int = 1000,
+               max_attempts: int = 5, retry_delay: float = 1.0, drain_timeout: float = 5.0,
+               worker_id: Optional[str] = None):
+    self._notifier = notifier
+    self._outbox_file = Path(outbox_file)
+    self._claim_lock = FileLock(f"{outbox_file}.lock")
+    self._worker_file = worker_outbox_path(outbox_file, worker_id or str(os.getpid()))
+    self._lease = FileLock(f"{self._worker_file}.lock", thread_local=False)
+    self._queue: asyncio.Queue[List[int]] = asyncio.Queue(maxsize=max_size)
+    self._max_attempts = max_attempts
+    self._retry_delay = retry_delay
+    self._drain_timeout = drain_timeout
+    self._pending: Dict[int, Dict[str, Any]] = {}
+    self._worker: Optional[asyncio.Task] = None
+    self._save_lock = asyncio.Lock()
+
+  def qsize(self) -> int:
+    return self._queue.qsize()
+
+  @property
+  def pending(self) -> int:
+    return len(self._pending)
+
+  def _report_pending(self) -> None:
+    NOTIFICATIONS_PENDING.set(len(self._pending), mode='queue')
+
+  async def start(self) -> None:
+    self._pending = await asyncio.to_thread(self._claim)
+    self._report_pending()
+    if self._pending:
+      logging.info(f"Восстановлено неотправленных уведомлений: {len(self._pending)}")
+    for lead_id in self._pending:
+      self._enqueue([lead_id])
+    await self._notifier.start()
+    self._worker = asyncio.create_task(self._run())
+
+  async def notify(self, lead: Lead) -> None:
+    await self.notify_many([lead])
+
+  async def notify_many(self, leads: List[Lead]) -> None:
+    if not leads:
+      return
+    for lead in leads:
+      self._pending[lead.id] = lead.model_dump(mode='json')
+    self._report_pending()
+    await self._save()
+    self._enqueue([lead.id for lead in leads])
+
+  async def notify_import(self, result: LeadImportResult) -> None:
+    await self._notifier.notify_import(result)
+
+  async def join(self) -> None:
+    await self._queue.join()
+
+  async def close(self) -> None:
+    if self._worker is not None:
+      try:
+        await asyncio.wait_for(self._queue.join(), timeout=self._drain_timeout)
+      except asyncio.TimeoutError:
+        logging.warning(f"Уведомления остались в outbox до следующего запуска: {len(self._pending)}")
+      self._worker.cancel()
+      await asyncio.gather(self._worker, return_exceptions=True)
+      self._worker = None
+    if self._lease.is_locked:
+      await asyncio.to_thread(self._release)
+    await self._notifier.close()
+
+  def _enqueue(self, lead_ids: List[int]) -> None:
+    try:
+      self._queue.put_nowait(lead_ids)
+    except asyncio.QueueFull:
+      logging.warning(f"Очередь уведомлений переполнена, заявки {self._label(lead_ids)} будут отправлены после перезапуска")
+
+  def _label(self, lead_ids: List[int]) -> str:
+    return ', '.join(f"#{lead_id}" for lead_id in lead_ids)
+
+  async def _run(self) -> None:
+    while True:
+      lead_ids = await self._queue.get()
+      try:
+        await self._deliver(lead_ids)
+      except Exception as e:
+        logging.error(f"Ошибка обработки очереди уведомлений: {e}")
+      finally:
+        self._queue.task_done()
+
+  async def _deliver(self, lead_ids: List[int]) -> None:
+    leads = [Lead.from_storage(self._pending[lead_id]) for lead_id in lead_ids if lead_id in self._pending]
+    if not leads:
+      return
+    label = self._label([lead.id for lead in leads])
+    for attempt in range(1, self._max_attempts + 1):
+      try:
+        if len(leads) == 1:
+          await self._notifier.notify(leads[0])
+        else:
+          await self._notifier.notify_many(leads)
+        break
+      except Exception as e:
+        logging.warning(f"Не удалось отправить уведомление о заявке {label} (попытка {attempt}): {e}")
+        if attempt == self._max_attempts:
+          logging.error(f"Уведомление о заявке {label} отложено до перезапуска")
+          return
+        await asyncio.sleep(self._retry_delay * 2 ** (attempt - 1))
+    for lead in leads:
+      self._pending.pop(lead.id, None)
+    self._report_pending()
+    await self._save()
+
+  async def _save(self) -> None:
+    async with self._save_lock:
+      await asyncio.to_thread(self._write, list(self._pending.values()))
+
+  def _claim(self) -> Dict[int, Dict[str, Any]]:
+    with self._claim_lock:
+      self._lease.acquire()
+      pending = self._load(self._worker_file)
+      orphans: List[Tuple[Path, Optional[FileLock]]] = []
+      if self._outbox_file.exists():
+        orphans.append((self._outbox_file, None))
+      for path in self._outbox_file.parent.glob(f"{self._outbox_file.stem}.*{self._outbox_file.suffix}"):
+        if path == self._worker_file:
+          continue
+        lease = FileLock(f"{path}.lock")
+        try:
+          lease.acquire(timeout=0)
+        except Timeout:
+          continue
+        orphans.append((path, lease))
+      for path, _ in orphans:
+        pending.update(self._load(path))
+      if orphans:
+        self._write(list(pending.values()))
+      for path, lease in orphans:
+        path.unlink(missing_ok=True)
+        if lease is not None:
+          lease.release()
+          Path(lease.lock_file).unlink(missing_ok=True)
+        logging.info(f"Забраны уведомления из outbox {path.name}")
+    return pending
+
+  def _release(self) -> None:
+    if not self._pending:
+      self._worker_file.unlink(missing_ok=True)
+    self._lease.release()
+
+  def _load(self, path: Path) -> Dict[int, Dict[str, Any]]:
+    try:
+      content = path.read_bytes()
+    except FileNotFoundError:
+      return {}
+    try:
+      leads = serializer.loads(content) if content.strip() else []
+    except json.JSONDecodeError as e:
+      logging.warning(f"Ошибка декодирования outbox {path.name}: {e}")
+      return {}
+    return {lead['id']: lead for lead in leads}
+
+  def _write(self, leads: List[Dict[str, Any]]) -> None:
+    tmp_path = self._worker_file.with_name(f"{self._worker_file.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+      f.write(serializer.dumps(leads))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, self._worker_file)
+
+
+class DigestNotifier(INotifier):
+  def __init__(self, notifier: INotifier, window: float = 60.0, max_size: int = 20):
+    self._notifier = notifier
+    self._window = window
+    self._max_size = max_size
+    self._buffer: List[Lead] = []
+    self._timer: Optional[asyncio.Task] = None
+    self._flushes: set[asyncio.Task] = set()
+    self._lock = asyncio.Lock()
+
+  @property
+  def pending(self) -> int:
+    return len(self._buffer)
+
+  def _report_pending(self) -> None:
+    NOTIFICATIONS_PENDING.set(len(self._buffer), mode='digest')
+
+  async def notify(self, lead: Lead) -> None:
+    self._buffer.append(lead)
+    self._report_pending()
+    if len(self._buffer) >= self._max_size:
+      task = asyncio.create_task(self._send(self._take()))
+      self._flushes.add(task)
+      task.add_done_callback(self._flushes.discard)
+    elif self._timer is None:
+      self._timer = asyncio.create_task(self._flush_later())
+
+  async def _flush_later(self) -> None:
+    await asyncio.sleep(self._window)
+    await self.flush()
+
+  def _take(self) -> List[Lead]:
+    timer, self._timer = self._timer, None
+    if timer is not None and timer is not asyncio.current_task():
+      timer.cancel()
+    leads, self._buffer = self._buffer, []
+    self._report_pending()
+    return leads
+
+  async def _send(self, leads: List[Lead]) -> None:
+    if not leads:
+      return
+    async with self._lock:
+      try:
+        await self._notifier.notify_many(leads)
+      except Exception as e:
+        logging.error(f"Ошибка отправки сводного уведомления ({len(leads)} заявок): {e}")
+        self._buffer[:0] = leads
+        self._report_pending()
+        if self._timer is None:
+          self._timer = asyncio.create_task(self._flush_later())
+
+  async def flush(self) -> None:
+    await self._send(self._take())
+
+  async def notify_import(self, result: LeadImportResult) -> None:
+    await self._notifier.notify_import(result)
+
+  async def start(self) -> None:
+    await self._notifier.start()
+
+  async def close(self) -> None:
+    if self._flushes:
+      await asyncio.gather(*self._flushes, return_exceptions=True)
+    await self.flush()
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+    await self._notifier.close()
+
+
+def outbox_path(leads_file: str | Path) -> Path:
+  return Path(leads_file).with_suffix('.outbox.json')
+
+
+def worker_outbox_path(outbox_file: str | Path, worker_id: str) -> Path:
+  outbox_file = Path(outbox_file)
+  return outbox_file.with_name(f"{outbox_file.stem}.{worker_id}{outbox_file.suffix}")
+
+
+def create_email_notifier(pooled: bool = False) -> EmailNotifier:
+  pool: Optional[SmtpConnectionPool] = None
+  if pooled and config.smtp_pool_size:
+    pool = SmtpConnectionPool(
+      config.smtp_host, config.smtp_port, config.smtp_user, config.smtp_password,
+      use_tls=config.smtp_use_tls, max_size=config.smtp_pool_size, idle_timeout=config.smtp_idle_timeout
+    )
+  return EmailNotifier(
+    config.smtp_host, config.smtp_port, config.smtp_user,
+    config.smtp_password, config.from_email, config.to_email,
+    use_tls=config.smtp_use_tls, pool=pool
+  )
+
+
+def create_notifier() -> INotifier:
+  if config.notification_mode == 'queue':
+    return OutboxNotifier(
+      create_email_notifier(pooled=True), str(outbox_path(config.leads_file)),
+      max_size=config.notification_queue_size,
+      max_attempts=config.notification_max_attempts,
+      retry_delay=config.notification_retry_delay
+    )
+  if config.notification_mode == 'digest':
+    return DigestNotifier(
+      create_email_notifier(pooled=True),
+      window=config.notification_digest_window, max_size=config.notification_digest_size
+    )
+  return create_email_notifier(pooled=True)
+
 
 class LeadService:
-  def __init__(self):
-    self._repository: ILeadRepository = JsonLeadRepository(str(config.leads_file))
+  def __init__(self, notifier: Optional[INotifier] = None):
+    backend = create_storage_backend()
+    repository = create_lead_repository(backend)
+    duplicate_window = timedelta(seconds=config.duplicate_window_seconds)
     self._validator: ILeadValidator = ContactMethodValidator()
-    self._duplicate_checker: IDuplicateChecker = TimeBasedDuplicateChecker(self._repository)
-    self._notifier: INotifier = EmailNotifier(
-      config.smtp_host, config.smtp_port, config.smtp_user,
-      config.smtp_password, config.from_email, config.to_email
-    )
+    self._stats_index = LeadStatsIndex()
+    self._search_index = SearchIndex(str(leads_search_path(config.leads_file)))
+    indexes: List[ILeadIndex] = [self._stats_index, self._search_index]
+    if config.duplicate_checker == 'index':
+      contact_index = RecentContactIndex(duplicate_window)
+      indexes.append(contact_index)
+    self._repository: IndexedLeadRepository = IndexedLeadRepository(repository, indexes)
+    if config.duplicate_checker == 'index':
+      self._duplicate_checker: IDuplicateChecker = IndexedDuplicateChecker(self._repository, contact_index)
+    elif config.duplicate_checker == 'redis':
+      self._duplicate_checker = RedisDuplicateChecker(get_redis_client(config.redis_url), duplicate_window)
+    else:
+      self._duplicate_checker = TimeBasedDuplicateChecker(self._repository, duplicate_window)
+    self._rebuild_task: Optional[asyncio.Task] = None
+    self._notifier: INotifier = notifier or create_email_notifier()
+    if isinstance(backend, SqliteLeadRepository):
+      self._id_allocator: ILeadIdAllocator = SqliteLeadIdAllocator(backend, block_size=config.lead_id_block_size)
+    else:
+      self._id_allocator = FileLeadIdAllocator(
+        str(lead_id_path(config.leads_file)), seed=self._repository.max_id, block_size=config.lead_id_block_size
+      )
+
+  async def start(self) -> None:
+    await self._repository.ensure_built()
+    await self._notifier.start()
+    if config.stats_rebuild_interval:
+      self._rebuild_task = asyncio.create_task(self._rebuild_periodically(config.stats_rebuild_interval))
+
+  async def close(self) -> None:
+    if self._rebuild_task is not None:
+      self._rebuild_task.cancel()
+      await asyncio.gather(self._rebuild_task, return_exceptions=True)
+      self._rebuild_task = None
+    try:
+      await self._notifier.close()
+    finally:
+      await self._repository.close()
 
   async def process_lead(self, lead_data: LeadCreate) -> Lead:
     try:
-      await self._validator.validate(lead_data)
+      try:
+        with LEAD_STAGE_SECONDS.time(stage='validate'):
+          await self._validator.validate(lead_data)
+      except HTTPException:
+        LEADS_PROCESSED.inc(result='invalid')
+        raise
 
-      if await self._duplicate_checker.is_duplicate(lead_data):
+      with LEAD_STAGE_SECONDS.time(stage='duplicate_check'):
+        is_duplicate = await self._duplicate_checker.is_duplicate(lead_data)
+      if is_duplicate:
+        LEADS_PROCESSED.inc(result='duplicate')
         raise HTTPException(status_code=400, detail="Заявка с такими контактными данными уже была отправлена недавно")
 
       new_lead_data = lead_data.model_dump(exclude_none=True)
       new_lead_data['timestamp'] = datetime.now().isoformat()
-      leads = await self._repository.get_all()
-      new_lead_data['id'] = len(leads) + 1
+      try:
+        with LEAD_STAGE_SECONDS.time(stage='allocate_id'):
+          new_lead_data['id'] = await self._id_allocator.next_id()
+        with LEAD_STAGE_SECONDS.time(stage='repository_add'):
+          await self._repository.add(new_lead_data)
+      except Exception:
+        await self._duplicate_checker.release(lead_data)
+        raise
 
-      await self._repository.add(new_lead_data)
-
-      lead = Lead(**new_lead_data)
-      await self._notifier.notify(lead)
+      lead = Lead.from_storage(new_lead_data)
+      try:
+        with LEAD_STAGE_SECONDS.time(stage='notify'):
+          await self._notifier.notify(lead)
+      except Exception as e:
+        logging.error(f"Ошибка отправки уведомления о заявке #{lead.id}: {e}")
 
+      LEADS_PROCESSED.inc(result='accepted')
       logging.info(f"Заявка #{lead.id} сохранена и обработана успешно")
       return lead
     except HTTPException as e:
       raise e
     except Exception as e:
+      LEADS_PROCESSED.inc(result='error')
       logging.error(f"Ошибка обработки заявки: {e}")
       raise HTTPException(status_code=500, detail="Ошибка обработки заявки")
 
-  async def get_all_leads(self) -> List[Lead]:
+  async def import_leads(self, records: AsyncIterable[Any], notify: bool = False,
+                         batch_size: int = config.import_batch_size) -> LeadImportResult:
+    result = LeadImportResult()
+    seen: Dict[Tuple[str, str], List[float]] = {}
+    async for lead_data in self._repository.iter_all():
+      key = (lead_data.get('contact_method', ''), normalize_contact(get_contact_value(lead_data)))
+      bisect.insort(seen.setdefault(key, []), datetime.fromisoformat(lead_data['timestamp']).timestamp())
+    batch: List[Any] = []
+    offset = 0
+    async for record in records:
+      batch.append(record)
+      if len(batch) >= batch_size:
+        await self._import_batch(batch, offset, seen, result)
+        offset += len(batch)
+        batch = []
+    if batch:
+      await self._import_batch(batch, offset, seen, result)
+    result.errors.sort(key=lambda error: error.row)
+
+    if notify and result.imported:
+      try:
+        await self._notifier.notify_import(result)
+      except Exception as e:
+        logging.error(f"Ошибка отправки уведомления об импорте: {e}")
+    logging.info(
+      f"Импорт заявок: добавлено {result.imported}, дублей {result.duplicates}, ошибок {len(result.errors)}"
+    )
+    return result
+
+  def _is_import_duplicate(self, seen: Dict[Tuple[str, str], List[float]], key: Tuple[str, str],
+                           timestamp: float) -> bool:
+    timestamps = seen.setdefault(key, [])
+    position = bisect.bisect_left(timestamps, timestamp - config.duplicate_window_seconds)
+    if position < len(timestamps) and timestamps[position] < timestamp + config.duplicate_window_seconds:
+      return True
+    bisect.insort(timestamps, timestamp)
+    return False
+
+  async def _import_batch(self, records: List[Any], offset: int, seen: Dict[Tuple[str, str], List[float]],
+                          result: LeadImportResult) -> None:
+    indices = list(range(len(records)))
     try:
-      leads_data = await self._repository.get_all()
-      return [Lead(**lead) for lead in leads_data]
+      leads = LEAD_IMPORT_LIST_ADAPTER.validate_python(records)
+    except ValidationError as e:
+      failed: Dict[int, str] = {}
+      for error in e.errors():
+        field = '.'.join(str(part) for part in error['loc'][1:])
+        failed.setdefault(error['loc'][0], f"{field}: {error['msg']}" if field else error['msg'])
+      result.errors.extend(LeadImportError(row=offset + index + 1, error=message) for index, message in failed.items())
+      indices = [index for index in indices if index not in failed]
+      leads = LEAD_IMPORT_LIST_ADAPTER.validate_python([records[index] for index in indices])
+
+    now = datetime.now()
+    accepted: List[LeadImport] = []
+    for index, lead in zip(indices, leads):
+      try:
+        await self._validator.validate(lead)
+      except HTTPException as e:
+        result.errors.append(LeadImportError(row=offset + index + 1, error=str(e.detail)))
+        continue
+      if lead.timestamp is None:
+        lead.timestamp = now
+      key = (lead.contact_method, normalize_contact(get_contact_value(lead)))
+      if self._is_import_duplicate(seen, key, lead.timestamp.timestamp()):
+        result.duplicates += 1
+        continue
+      accepted.append(lead)
+    if not accepted:
+      return
+
+    lead_ids = await self._id_allocator.next_ids(len(accepted))
+    stored = [
+      {**lead.model_dump(exclude_none=True, exclude={'timestamp'}), 'id': lead_id, 'timestamp': lead.timestamp.isoformat()}
+      for lead_id, lead in zip(lead_ids, accepted)
+    ]
+    with LEAD_STAGE_SECONDS.time(stage='import_write'):
+      await self._repository.add_many(stored)
+    result.imported += len(stored)
+    result.ids.extend(lead_ids)
+    LEADS_PROCESSED.inc(len(stored), result='imported')
+
+  async def get_stats(self, query: LeadStatsQuery) -> LeadStats:
+    await self._repository.refresh()
+    with LEAD_STAGE_SECONDS.time(stage='stats'):
+      return LeadStats(**self._stats_index.summary(query.date_from, query.date_to))
+
+  async def search_leads(self, query: LeadSearchQuery) -> Tuple[List[Lead], int]:
+    await self._repository.refresh()
+    with LEAD_STAGE_SECONDS.time(stage='search'):
+      lead_ids = self._search_index.search(query.q)
+      leads_data = await self._repository.get_many(lead_ids[query.offset:query.offset + query.limit])
+    return [Lead.from_storage(lead_data) for lead_data in leads_data], len(lead_ids)
+
+  async def rebuild_stats(self) -> None:
+    with LEAD_STAGE_SECONDS.time(stage='stats_rebuild'):
+      await self._repository.rebuild()
+    logging.info(f"Индексы и статистика заявок перестроены: {len(self._stats_index)} заявок")
+
+  async def _rebuild_periodically(self, interval: float) -> None:
+    while True:
+      await asyncio.sleep(interval)
+      try:
+        await self.rebuild_stats()
+      except Exception as e:
+        logging.error(f"Ошибка перестроения статистики заявок: {e}")
+
+  async def list_leads(self, query: LeadQuery) -> LeadPage:
+    try:
+      if query.cursor:
+        decode_cursor(query.cursor)
+    except ValueError as e:
+      raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+      with LEAD_STAGE_SECONDS.time(stage='repository_query'):
+        leads_data, next_cursor = await self._repository.query(query)
+      return LeadPage(items=[Lead.from_storage(lead) for lead in leads_data], next_cursor=next_cursor)
     except Exception as e:
       logging.error(f"Ошибка получения заявок: {e}")
       raise HTTPException(status_code=500, detail="Ошибка получения данных")
+
+  async def iter_leads(self, lead_filter: LeadFilter) -> AsyncIterator[Lead]:
+    async for lead_data in self._repository.iter_all():
+      if lead_matches(lead_data, lead_filter):
+        yield Lead.from_storage(lead_data)
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import AsyncIterator, List, Optional, Tuple
+import aiosmtplib
+from .config import logging
+
+
+class SmtpConnectionPool:
+  def __init__(self, hostname: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+               use_tls: bool = True, max_size: int = 2, idle_timeout: float = 60.0,
+               health_check_after: float = 5.0):
+    if max_size < 1:
+      raise ValueError("max_size должен быть положительным")
+    self._hostname = hostname
+    self._port = port
+    self._username = username
+    self._password = password
+    self._use_tls = use_tls
+    self._idle_timeout = idle_timeout
+    self._health_check_after = health_check_after
+    self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+    self._slots = asyncio.Semaphore(max_size)
+    self._reaper: Optional[asyncio.Task] = None
+    self.connects = 0
+
+  @property
+  def idle(self) -> int:
+    return len(self._idle)
+
+  async def _connect(self) -> aiosmtplib.SMTP:
+    client = aiosmtplib.SMTP(hostname=self._hostname, port=self._port, use_tls=self._use_tls)
+    await client.connect()
+    if self._username:
+      try:
+        await client.login(self._username, self._password or '')
+      except BaseException:
+        client.close()
+        raise
+    self.connects += 1
+    return client
+
+  async def _discard(self, client: aiosmtplib.SMTP) -> None:
+    try:
+      await client.quit()
+    except Exception:
+      client.close()
+
+  async def _is_healthy(self, client: aiosmtplib.SMTP) -> bool:
+    if not client.is_connected:
+      return False
+    try:
+      await client.noop()
+      return True
+    except aiosmtplib.SMTPException:
+      return False
+
+  async def _checkout(self) -> aiosmtplib.SMTP:
+    while self._idle:
+      client, released_at = self._idle.pop()
+      idle_for = time.monotonic() - released_at
+      if idle_for >= self._idle_timeout:
+        await self._discard(client)
+        continue
+      if idle_for < self._health_check_after or await self._is_healthy(client):
+        return client
+      await self._discard(client)
+    return await self._connect()
+
+  @asynccontextmanager
+  async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+    async with self._slots:
+      client = await self._checkout()
+      try:
+        yield client
+      except BaseException:
+        await self._discard(client)
+        raise
+      self._idle.append((client, time.monotonic()))
+      if self._reaper is None or self._reaper.done():
+        self._reaper = asyncio.create_task(self._reap())
+
+  async def _reap(self) -> None:
+    while self._idle:
+      delay = self._idle[0][1] + self._idle_timeout - time.monotonic()
+      if delay > 0:
+        await asyncio.sleep(delay)
+        continue
+      client, _ = self._idle.pop(0)
+      await self._discard(client)
+
+  async def send_message(self, message: Message) -> None:
+    try:
+      async with self.connection() as client:
+        await client.send_message(message)
+    except aiosmtplib.SMTPServerDisconnected:
+      logging.info("SMTP-соединение разорвано сервером, переподключение")
+      await self.close()
+      async with self.connection() as client:
+        await client.send_message(message)
+
+  async def close(self) -> None:
+    if self._reaper is not None:
+      self._reaper.cancel()
+      await asyncio.gather(self._reaper, return_exceptions=True)
+      self._reaper = None
+    idle, self._idle = self._idle, []
+    for client, _ in idle:
+      await self._discard(client)
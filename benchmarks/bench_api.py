@@ -0,0 +1,268 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import httpx
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from backend.config import config
+from backend.main import app
+from backend.services import create_storage_backend
+
+BACKENDS: List[str] = ['json', 'jsonl', 'sqlite', 'segmented']
+NOTIFIER_MODES: List[str] = ['inline', 'queue', 'digest']
+SIZES: List[int] = [1_000, 10_000, 100_000]
+
+
+class SinkHandler:
+  def __init__(self):
+    self.messages = 0
+
+  async def handle_DATA(self, server, session, envelope) -> str:
+    self.messages += 1
+    return '250 OK'
+
+
+def free_port() -> int:
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+
+def percentile(values: List[float], percent: float) -> float:
+  if not values:
+    return 0.0
+  ordered = sorted(values)
+  return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+  return {
+    'requests': len(latencies),
+    'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+    'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+    'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0
+  }
+
+
+def seed_leads(count: int) -> List[Dict[str, Any]]:
+  start = datetime.now() - timedelta(days=365)
+  budgets = ['30-50k', '50-150k', '150-300k', '300-500k', '500k+']
+  methods = ['whatsapp', 'telegram', 'phone', 'email']
+  leads = []
+  for lead_id in range(1, count + 1):
+    method = methods[lead_id % 4]
+    lead = {
+      'id': lead_id,
+      'timestamp': (start + timedelta(seconds=lead_id * 30)).isoformat(),
+      'name': 'Иван Петров',
+      'services': ['site', 'telegram-bot'][:1 + lead_id % 2],
+      'description': 'Нужен сайт для небольшой студии дизайна интерьеров с формой заявки и портфолио работ',
+      'budget': budgets[lead_id % 5],
+      'contact_method': method
+    }
+    if method == 'whatsapp':
+      lead['phone'] = f"+7999{lead_id:07d}"
+    elif method == 'telegram':
+      lead['telegram'] = f"@seed_user_{lead_id}"
+    elif method == 'phone':
+      lead['phone_number'] = f"+7998{lead_id:07d}"
+      lead['call_time'] = '10:00-18:00'
+    else:
+      lead['email'] = f"seed{lead_id}@example.com"
+    leads.append(lead)
+  return leads
+
+
+def submit_payload(index: int) -> Dict[str, Any]:
+  return {
+    'name': 'Бенчмарк',
+    'services': ['site'],
+    'description': 'Нужен лендинг для продвижения нового продукта с формой обратной связи и аналитикой',
+    'budget': '50-150k',
+    'contact_method': 'email',
+    'email': f"bench{index}@example.com"
+  }
+
+
+def use_storage(data_dir: str, backend: str) -> None:
+  config.leads_file = Path(data_dir) / 'leads.json'
+  config.leads_storage = backend
+
+
+async def seed_store(data_dir: str, backend: str, size: int) -> float:
+  use_storage(data_dir, backend)
+  seeded = seed_leads(size)
+  started = time.perf_counter()
+  repository = create_storage_backend()
+  await repository.add_many(seeded)
+  await repository.close()
+  return time.perf_counter() - started
+
+
+def seed_isolated(data_dir: str, backend: str, size: int) -> float:
+  command = [
+    sys.executable, '-m', 'benchmarks.bench_api', '--seed', data_dir,
+    '--backends', backend, '--sizes', str(size)
+  ]
+  completed = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+  return json.loads(completed.stdout.strip().splitlines()[-1])['seed_seconds']
+
+
+def peak_rss_mb() -> float:
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def drive(client: httpx.AsyncClient, requests: int, concurrency: int, send) -> Dict[str, float]:
+  latencies: List[float] = []
+  errors = 0
+  semaphore = asyncio.Semaphore(concurrency)
+
+  async def one(index: int) -> None:
+    nonlocal errors
+    async with semaphore:
+      started = time.perf_counter()
+      response = await send(client, index)
+      latencies.append(time.perf_counter() - started)
+      if response.status_code >= 400:
+        errors += 1
+
+  started = time.perf_counter()
+  await asyncio.gather(*(one(index) for index in range(requests)))
+  result = summarize(latencies, time.perf_counter() - started)
+  result['errors'] = errors
+  return result
+
+
+async def run_scenario(backend: str, size: int, notifier: str, requests: int, concurrency: int) -> Dict[str, Any]:
+  handler = SinkHandler()
+  port = free_port()
+  controller = Controller(handler, hostname='127.0.0.1', port=port, auth_require_tls=False,
+                          authenticator=lambda *args: AuthResult(success=True))
+  controller.start()
+  try:
+    with tempfile.TemporaryDirectory() as data_dir:
+      seed_seconds = seed_isolated(data_dir, backend, size)
+      rss_before = peak_rss_mb()
+      use_storage(data_dir, backend)
+      config.notification_mode = notifier
+      config.notification_digest_window = 0.5
+      config.smtp_host = '127.0.0.1'
+      config.smtp_port = port
+      config.smtp_use_tls = False
+      config.rate_limit_enabled = False
+
+      transport = httpx.ASGITransport(app=app)
+      async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+          submit = await drive(
+            client, requests, concurrency,
+            lambda c, index: c.post('/submit-form', json=submit_payload(index))
+          )
+          admin = await drive(
+            client, requests, concurrency,
+            lambda c, index: c.get('/admin/leads', params={'limit': 50, 'offset': index % 10 * 50})
+          )
+  finally:
+    controller.stop()
+
+  return {
+    'backend': backend,
+    'notifier': notifier,
+    'size': size,
+    'seed_seconds': seed_seconds,
+    'submit': submit,
+    'admin_leads': admin,
+    'emails_received': handler.messages,
+    'peak_rss_mb': round(peak_rss_mb(), 1),
+    'rss_growth_mb': round(peak_rss_mb() - rss_before, 1)
+  }
+
+
+def run_isolated(args: argparse.Namespace, backend: str, size: int, notifier: str) -> Dict[str, Any]:
+  command = [
+    sys.executable, '-m', 'benchmarks.bench_api', '--scenario',
+    '--backends', backend, '--sizes', str(size), '--notifiers', notifier,
+    '--requests', str(args.requests), '--concurrency', str(args.concurrency)
+  ]
+  completed = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+  return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_revision() -> str:
+  try:
+    return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                          text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return 'unknown'
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк POST /submit-form и GET /admin/leads")
+  parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+  parser.add_argument('--notifiers', nargs='+', choices=NOTIFIER_MODES, default=['queue'])
+  parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+  parser.add_argument('--requests', type=int, default=200)
+  parser.add_argument('--concurrency', type=int, default=10)
+  parser.add_argument('--output', type=Path, default=Path('benchmark_results.json'))
+  parser.add_argument('--scenario', action='store_true', help=argparse.SUPPRESS)
+  parser.add_argument('--seed', default=None, help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  logging.getLogger().setLevel(logging.WARNING)
+
+  if args.seed:
+    seed_seconds = asyncio.run(seed_store(args.seed, args.backends[0], args.sizes[0]))
+    print(json.dumps({'seed_seconds': round(seed_seconds, 3)}))
+    return
+
+  if args.scenario:
+    result = asyncio.run(run_scenario(args.backends[0], args.sizes[0], args.notifiers[0],
+                                      args.requests, args.concurrency))
+    print(json.dumps(result))
+    return
+
+  results = []
+  for backend in args.backends:
+    for notifier in args.notifiers:
+      for size in args.sizes:
+        result = run_isolated(args, backend, size, notifier)
+        results.append(result)
+        print(f"{backend:9} {notifier:7} {size:>8}  "
+              f"submit p50={result['submit']['p50_ms']}ms p99={result['submit']['p99_ms']}ms "
+              f"{result['submit']['throughput_rps']} rps | "
+              f"admin p50={result['admin_leads']['p50_ms']}ms p99={result['admin_leads']['p99_ms']}ms | "
+              f"rss={result['peak_rss_mb']}MB (+{result['rss_growth_mb']}MB)")
+
+  report = {
+    'revision': git_revision(),
+    'created_at': datetime.now().isoformat(),
+    'python': platform.python_version(),
+    'platform': platform.platform(),
+    'requests': args.requests,
+    'concurrency': args.concurrency,
+    'results': results
+  }
+  args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+  print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == '__main__':
+  main()
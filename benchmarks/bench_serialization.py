@@ -0,0 +1,62 @@
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+ROOT_DIR: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from backend.serialization import ISerializer, OrjsonSerializer, StdlibSerializer, orjson
+from benchmarks.bench_api import git_revision, seed_leads
+from benchmarks.bench_validation import measure
+
+
+def bench_serializer(serializer: ISerializer, leads: list, repeat: int) -> Dict[str, Dict[str, float]]:
+  count = len(leads)
+  store = serializer.dumps(leads)
+  lines = [serializer.dumps(lead) for lead in leads]
+  return {
+    'store_encode': measure(lambda: serializer.dumps(leads), count, repeat),
+    'store_decode': measure(lambda: serializer.loads(store), count, repeat),
+    'lines_encode': measure(lambda: [serializer.dumps(lead) for lead in leads], count, repeat),
+    'lines_decode': measure(lambda: [serializer.loads(line) for line in lines], count, repeat),
+    'export_pretty': measure(lambda: serializer.dumps(leads, pretty=True), count, repeat)
+  }
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Бенчмарк JSON-сериализации хранилища заявок")
+  parser.add_argument('--leads', type=int, default=100_000)
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--output', type=Path, default=Path('serialization_results.json'))
+  args = parser.parse_args()
+
+  leads = seed_leads(args.leads)
+  serializers = [StdlibSerializer()] + ([OrjsonSerializer()] if orjson is not None else [])
+  results = {serializer.name: bench_serializer(serializer, leads, args.repeat) for serializer in serializers}
+  for operation in results['json']:
+    line = f"{operation:14} json {results['json'][operation]['per_lead_us']:>8} мкс/заявка"
+    if 'orjson' in results:
+      orjson_result = results['orjson'][operation]
+      speedup = results['json'][operation]['best_ms'] / orjson_result['best_ms']
+      line += f"  orjson {orjson_result['per_lead_us']:>8} мкс/заявка  (x{speedup:.1f})"
+    print(line)
+
+  report = {
+    'revision': git_revision(),
+    'created_at': datetime.now().isoformat(),
+    'python': platform.python_version(),
+    'platform': platform.platform(),
+    'leads': args.leads,
+    'store_bytes': len(serializers[-1].dumps(leads)),
+    'results': results
+  }
+  args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+  print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == '__main__':
+  main()
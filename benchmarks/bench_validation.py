@@ -0,0 +1,63 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from backend.schemas import Lead, LeadCreate, LEAD_LIST_ADAPTER
+from benchmarks.bench_api import git_revision, seed_leads, submit_payload
+
+
+def measure(operation: Callable[[], Any], count: int, repeat: int) -> Dict[str, float]:
+  timings: List[float] = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    operation()
+    timings.append(time.perf_counter() - started)
+  best = min(timings)
+  return {
+    'best_ms': round(best * 1000, 3),
+    'per_lead_us': round(best / count * 1_000_000, 3)
+  }
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Бенчмарк валидации и сериализации заявок")
+  parser.add_argument('--leads', type=int, default=10_000)
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--output', type=Path, default=Path('validation_results.json'))
+  args = parser.parse_args()
+
+  payloads = [submit_payload(index) for index in range(args.leads)]
+  stored = seed_leads(args.leads)
+  leads = [Lead.from_storage(lead) for lead in stored]
+
+  results = {
+    'ingest_validate': measure(lambda: [LeadCreate(**payload) for payload in payloads], args.leads, args.repeat),
+    'listing_validate': measure(lambda: [Lead(**lead) for lead in stored], args.leads, args.repeat),
+    'listing_trusted': measure(lambda: [Lead.from_storage(lead) for lead in stored], args.leads, args.repeat),
+    'listing_serialize': measure(lambda: LEAD_LIST_ADAPTER.dump_json(leads), args.leads, args.repeat)
+  }
+  for name, result in results.items():
+    print(f"{name:18} {result['per_lead_us']:>9} мкс/заявка  ({result['best_ms']} мс всего)")
+
+  report = {
+    'revision': git_revision(),
+    'created_at': datetime.now().isoformat(),
+    'python': platform.python_version(),
+    'platform': platform.platform(),
+    'leads': args.leads,
+    'results': results
+  }
+  args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+  print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == '__main__':
+  main()
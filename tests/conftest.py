@@ -2,6 +2,7 @@ import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from backend.main import app
+from backend.routers import get_lead_service
 from backend.config import config
 from backend.services import LeadService
 import os
@@ -15,7 +16,8 @@ def test_app():
 
 @pytest.fixture
 def client(test_app):
-  return TestClient(test_app)
+  with TestClient(test_app) as client:
+    yield client
 
 
 @pytest_asyncio.fixture(autouse=True)
@@ -27,6 +29,11 @@ async def mock_leads_file(tmp_path):
     os.remove(leads_file)
 
 
+@pytest.fixture(autouse=True)
+def disable_rate_limit(monkeypatch):
+  monkeypatch.setattr(config, "rate_limit_enabled", False)
+
+
 @pytest_asyncio.fixture
 async def mock_aiofiles_open(monkeypatch):
   mock_open = AsyncMock()
@@ -51,5 +58,8 @@ async def mock_aiosmtplib(monkeypatch):
 
 
 @pytest.fixture
-def mock_lead_service(mocker):
-  return mocker.Mock(spec=LeadService)
+def mock_lead_service(mocker, test_app):
+  service = mocker.Mock(spec=LeadService)
+  test_app.dependency_overrides[get_lead_service] = lambda: service
+  yield service
+  test_app.dependency_overrides.pop(get_lead_service, None)
@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from backend.assets import IndexPage, StaticAssets, choose_encoding
+
+
+def make_assets(tmp_path, monkeypatch, brotli=None):
+  monkeypatch.setattr("backend.assets.brotli", brotli)
+  (tmp_path / "images").mkdir()
+  (tmp_path / "styles.css").write_text("body { color: red; }\n" * 200, encoding="utf-8")
+  (tmp_path / "tiny.js").write_text("console.log(1)", encoding="utf-8")
+  (tmp_path / "images" / "logo.png").write_bytes(b"\x89PNG" + bytes(2048))
+  assets = StaticAssets(tmp_path, min_size=64)
+  assets.load()
+  app = FastAPI()
+  app.mount("/static", assets)
+  return assets, TestClient(app)
+
+
+def test_choose_encoding():
+  assert choose_encoding("gzip, br", ["identity", "gzip", "br"]) == "br"
+  assert choose_encoding("br;q=0.5, gzip", ["identity", "gzip", "br"]) == "gzip"
+  assert choose_encoding("br;q=0, *;q=0.1", ["identity", "gzip", "br"]) == "gzip"
+  assert choose_encoding("gzip", ["identity"]) == "identity"
+  assert choose_encoding("", ["identity", "gzip"]) == "identity"
+
+
+def test_hashed_asset_is_immutable_and_compressed(tmp_path, monkeypatch):
+  assets, client = make_assets(tmp_path, monkeypatch)
+  url = assets.url_for("styles.css")
+  assert url.startswith("/static/styles.") and url.endswith(".css") and url != "/static/styles.css"
+  response = client.get(url, headers={"Accept-Encoding": "gzip"})
+  assert response.status_code == 200
+  assert response.headers["content-encoding"] == "gzip"
+  assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+  assert response.headers["vary"] == "Accept-Encoding"
+  assert int(response.headers["content-length"]) < len(response.content)
+  assert response.text == (tmp_path / "styles.css").read_text(encoding="utf-8")
+
+  plain = client.get("/static/styles.css", headers={"Accept-Encoding": "identity"})
+  assert "content-encoding" not in plain.headers
+  assert plain.headers["cache-control"] == "no-cache"
+  assert plain.headers["etag"] != response.headers["etag"]
+
+
+def test_conditional_get_and_uncompressed_types(tmp_path, monkeypatch):
+  assets, client = make_assets(tmp_path, monkeypatch)
+  first = client.get("/static/images/logo.png", headers={"Accept-Encoding": "gzip"})
+  assert "content-encoding" not in first.headers
+  assert "vary" not in first.headers
+  repeat = client.get("/static/images/logo.png", headers={"If-None-Match": first.headers["etag"]})
+  assert repeat.status_code == 304
+  assert repeat.content == b""
+  assert "content-encoding" not in client.get("/static/tiny.js").headers
+  assert client.get("/static/missing.css").status_code == 404
+  assert client.post("/static/styles.css").status_code == 405
+
+
+def test_brotli_variant_and_reload(tmp_path, monkeypatch):
+  fake_brotli = SimpleNamespace(compress=lambda content, quality: b"br:" + gzip.compress(content)[:10])
+  assets, client = make_assets(tmp_path, monkeypatch, brotli=fake_brotli)
+  response = client.get("/static/styles.css", headers={"Accept-Encoding": "gzip, br"})
+  assert response.headers["content-encoding"] == "br"
+  old_url = assets.url_for("styles.css")
+  (tmp_path / "styles.css").write_text("body { color: blue; }\n" * 200, encoding="utf-8")
+  assets.load()
+  assert assets.url_for("styles.css") != old_url
+  assert client.get(old_url).status_code == 404
+
+
+def make_index(tmp_path, monkeypatch):
+  monkeypatch.setattr("backend.assets.brotli", None)
+  (tmp_path / "styles.css").write_text("body { color: red; }\n" * 200, encoding="utf-8")
+  (tmp_path / "index.html").write_text(
+    '<link rel="stylesheet" href="/static/styles.css">\n'
+    '<a href="https://example.com/static/styles.css">x</a>\n'
+    '<script src="/static/missing.js"></script>\n' * 20,
+    encoding="utf-8"
+  )
+  assets = StaticAssets(tmp_path, min_size=64)
+  page = IndexPage(tmp_path / "index.html", assets, min_size=64)
+  app = FastAPI()
+
+  @app.get("/")
+  async def index(request: Request):
+    return page.response(request.scope)
+
+  return assets, page, TestClient(app)
+
+
+def test_index_page_rewrites_asset_urls(tmp_path, monkeypatch):
+  assets, page, client = make_index(tmp_path, monkeypatch)
+  response = client.get("/", headers={"Accept-Encoding": "gzip"})
+  assert response.status_code == 200
+  assert response.headers["content-encoding"] == "gzip"
+  assert response.headers["cache-control"] == "no-cache"
+  assert f'href="{assets.url_for("styles.css")}"' in response.text
+  assert 'href="/static/styles.css"' not in response.text
+  assert "https://example.com/static/styles.css" in response.text
+  assert 'src="/static/missing.js"' in response.text
+
+  repeat = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+  assert repeat.status_code == 304
+  assert repeat.content == b""
+
+
+@pytest.mark.asyncio
+async def test_index_page_watch_reloads_on_change(tmp_path, monkeypatch):
+  assets, page, client = make_index(tmp_path, monkeypatch)
+  page.reload()
+  old_url = assets.url_for("styles.css")
+  watcher = asyncio.create_task(page.watch(0.01))
+  await asyncio.sleep(0.05)
+  (tmp_path / "styles.css").write_text("body { color: blue; }\n" * 200, encoding="utf-8")
+  for _ in range(100):
+    await asyncio.sleep(0.01)
+    if assets.url_for("styles.css") != old_url:
+      break
+  watcher.cancel()
+  await asyncio.gather(watcher, return_exceptions=True)
+  new_url = assets.url_for("styles.css")
+  assert new_url != old_url
+  assert new_url in page.response({"type": "http", "method": "GET", "headers": []}).body.decode()
@@ -0,0 +1,88 @@
+import gzip
+import io
+import json
+import zipfile
+import pytest
+from datetime import datetime
+from xml.etree import ElementTree
+from backend.export import csv_row, gzip_stream, iter_csv, iter_json, iter_xlsx, lead_row
+from backend.schemas import Lead
+
+
+def make_lead(lead_id, **fields):
+  return Lead.from_storage({
+    "id": lead_id,
+    "timestamp": datetime(2024, 1, lead_id, 12).isoformat(),
+    "name": "Test",
+    "services": ["site", "telegram-bot"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "telegram",
+    "telegram": "@export_user",
+    **fields
+  })
+
+
+async def aiter_leads(count):
+  for lead_id in range(1, count + 1):
+    yield make_lead(lead_id)
+
+
+def test_lead_row_formats_values():
+  row = lead_row(make_lead(1, call_time="=1+1 вечером", phone="+79261234567"))
+  assert row[:4] == [1, "2024-01-01T12:00:00", "Test", "site; telegram-bot"]
+  assert row[7] == "+79261234567"
+  assert row[10] == "=1+1 вечером"
+  assert row[11] == ""
+
+
+def test_csv_row_guards_formula_prefixes():
+  row = csv_row(make_lead(1, call_time="=1+1 вечером", phone="+79261234567", name="\tTest"))
+  assert row[2] == "'\tTest"
+  assert row[7] == "'+79261234567"
+  assert row[8] == "'@export_user"
+  assert row[10] == "'=1+1 вечером"
+
+
+@pytest.mark.asyncio
+async def test_iter_xlsx_keeps_cell_values_verbatim():
+  async def leads():
+    yield make_lead(1, phone="+79261234567", call_time="=1+1")
+
+  body = b"".join([chunk async for chunk in iter_xlsx(leads(), chunk_rows=1)])
+  with zipfile.ZipFile(io.BytesIO(body)) as archive:
+    sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+  namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+  rows = sheet.findall("main:sheetData/main:row", namespace)
+  cells = [cell.findtext("main:is/main:t", namespaces=namespace) for cell in rows[1]]
+  assert cells[7] == "+79261234567"
+  assert cells[8] == "@export_user"
+  assert cells[10] == "=1+1"
+
+
+@pytest.mark.asyncio
+async def test_iter_csv_streams_in_chunks():
+  chunks = [chunk async for chunk in iter_csv(aiter_leads(5), chunk_rows=2)]
+  assert len(chunks) == 3
+  assert chunks[0].startswith(b"\xef\xbb\xbfid,timestamp")
+  assert not chunks[1].startswith(b"\xef\xbb\xbf")
+  assert b"".join(chunks).decode("utf-8-sig").count("\r\n") == 6
+
+
+@pytest.mark.asyncio
+async def test_gzip_stream_round_trip():
+  plain = b"".join([chunk async for chunk in iter_csv(aiter_leads(3))])
+  compressed = b"".join([chunk async for chunk in gzip_stream(iter_csv(aiter_leads(3)))])
+  assert gzip.decompress(compressed) == plain
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("pretty", [False, True])
+async def test_iter_json_streams_valid_array(pretty):
+  chunks = [chunk async for chunk in iter_json(aiter_leads(3), pretty=pretty, chunk_rows=2)]
+  assert len(chunks) == 2
+  body = b"".join(chunks)
+  assert [lead["id"] for lead in json.loads(body)] == [1, 2, 3]
+  assert (b'\n    "name": "Test"' in body) is pretty
+  empty = b"".join([chunk async for chunk in iter_json(aiter_leads(0), pretty=pretty)])
+  assert json.loads(empty) == []
@@ -0,0 +1,60 @@
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import AsyncMock
+from backend.ids import FileLeadIdAllocator, lead_id_path
+
+
+def _allocate_ids(counter_file, count):
+  import asyncio
+
+  async def allocate():
+    allocator = FileLeadIdAllocator(counter_file)
+    return [await allocator.next_id() for _ in range(count)]
+
+  return asyncio.run(allocate())
+
+
+@pytest.mark.asyncio
+async def test_file_lead_id_allocator_sequential(tmp_path):
+  counter_file = tmp_path / "leads.seq"
+  allocator = FileLeadIdAllocator(str(counter_file))
+  assert [await allocator.next_id() for _ in range(3)] == [1, 2, 3]
+  assert counter_file.read_text() == "3"
+  assert await FileLeadIdAllocator(str(counter_file)).next_id() == 4
+
+
+@pytest.mark.asyncio
+async def test_file_lead_id_allocator_seed(tmp_path):
+  seed = AsyncMock(return_value=41)
+  allocator = FileLeadIdAllocator(str(tmp_path / "leads.seq"), seed=seed)
+  assert await allocator.next_id() == 42
+  assert await allocator.next_id() == 43
+  seed.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_file_lead_id_allocator_blocks(tmp_path):
+  counter_file = str(tmp_path / "leads.seq")
+  first = FileLeadIdAllocator(counter_file, block_size=10)
+  second = FileLeadIdAllocator(counter_file, block_size=10)
+  assert await first.next_id() == 1
+  assert await second.next_id() == 11
+  assert await first.next_id() == 2
+  assert (tmp_path / "leads.seq").read_text() == "20"
+
+
+def test_file_lead_id_allocator_processes(tmp_path):
+  counter_file = str(tmp_path / "leads.seq")
+  with ProcessPoolExecutor(max_workers=4) as pool:
+    results = list(pool.map(_allocate_ids, [counter_file] * 4, [25] * 4))
+  ids = [lead_id for chunk in results for lead_id in chunk]
+  assert sorted(ids) == list(range(1, 101))
+
+
+def test_file_lead_id_allocator_invalid_block(tmp_path):
+  with pytest.raises(ValueError):
+    FileLeadIdAllocator(str(tmp_path / "leads.seq"), block_size=0)
+
+
+def test_lead_id_path():
+  assert lead_id_path("data/leads.json").name == "leads.seq"
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+from backend.importer import iter_lines, limit_size, parse_csv, parse_ndjson
+
+
+async def chunks(*parts):
+  for part in parts:
+    yield part
+
+
+async def collect(records):
+  return [record async for record in records]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_joins_split_chunks():
+  lines = await collect(iter_lines(chunks("﻿{\"a\": 1}\n{\"b\"".encode("utf-8"), ": \"ё\"}".encode("utf-8")[:-3],
+                                          ": \"ё\"}".encode("utf-8")[-3:])))
+  assert lines == ['{"a": 1}\n', '{"b": "ё"}']
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_keeps_unicode_line_separators():
+  lines = await collect(iter_lines(chunks('{"description": "a\u2028b"}\r\n{"x": 1}\n'.encode("utf-8"))))
+  assert lines == ['{"description": "a\u2028b"}\r\n', '{"x": 1}\n']
+  assert await collect(parse_ndjson(chunks(*lines))) == [{"description": "a\u2028b"}, {"x": 1}]
+
+
+@pytest.mark.asyncio
+async def test_limit_size_rejects_oversized_upload():
+  with pytest.raises(HTTPException) as error:
+    await collect(limit_size(chunks(b"x" * 6, b"x" * 6), 10))
+  assert error.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_parse_ndjson_passes_invalid_lines_through():
+  records = await collect(parse_ndjson(chunks('{"name": "Test"}\n', '\n', 'oops\n')))
+  assert records == [{"name": "Test"}, "oops"]
+
+
+@pytest.mark.asyncio
+async def test_parse_csv_lists_and_quoted_newlines():
+  lines = [
+    "name,services,description,email,telegram\n",
+    'Test,site; telegram-bot,"first line\n',
+    'second, ""quoted"" line",test@example.com,\n'
+  ]
+  records = await collect(parse_csv(chunks(*lines)))
+  assert records == [{
+    "name": "Test",
+    "services": ["site", "telegram-bot"],
+    "description": 'first line\nsecond, "quoted" line',
+    "email": "test@example.com"
+  }]
+
+
+@pytest.mark.asyncio
+async def test_parse_csv_unescapes_exported_formula_guard():
+  records = await collect(parse_csv(chunks("telegram,phone,name\n", "'@user_name,'+79261234567,'Test\n")))
+  assert records == [{"telegram": "@user_name", "phone": "+79261234567", "name": "'Test"}]
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+from backend.indexes import LeadStatsIndex, RecentContactIndex, get_contact_value
+from backend.schemas import LeadCreate
+
+
+def make_lead(lead_id, contact_method="email", timestamp=None, **contact):
+  return {
+    "id": lead_id,
+    "timestamp": (timestamp or datetime.now()).isoformat(),
+    "contact_method": contact_method,
+    **contact
+  }
+
+
+def test_get_contact_value():
+  assert get_contact_value(make_lead(1, "phone", phone_number="+79261234567")) == "+79261234567"
+  assert get_contact_value({"contact_method": "unknown"}) == ""
+  lead = LeadCreate(
+    name="Test",
+    services=["site"],
+    description="long description with enough words to pass validation for the test case",
+    budget="30-50k",
+    contact_method="telegram",
+    telegram="@test_user"
+  )
+  assert get_contact_value(lead) == "@test_user"
+
+
+def test_recent_contact_index_build():
+  index = RecentContactIndex(timedelta(minutes=5))
+  index.build([
+    make_lead(1, email="old@example.com", timestamp=datetime.now() - timedelta(minutes=10)),
+    make_lead(2, email=" New@Example.com ")
+  ])
+  assert len(index) == 1
+  assert index.contains("email", "new@example.com")
+  assert not index.contains("email", "old@example.com")
+  assert not index.contains("telegram", "new@example.com")
+
+
+def test_recent_contact_index_expiry():
+  index = RecentContactIndex(timedelta(minutes=5))
+  now = datetime.now()
+  index.add(make_lead(1, email="test@example.com", timestamp=now))
+  assert index.contains("email", "test@example.com", now=now + timedelta(minutes=4))
+  assert not index.contains("email", "test@example.com", now=now + timedelta(minutes=5))
+  assert len(index) == 0
+
+
+def test_recent_contact_index_skips_empty_contact():
+  index = RecentContactIndex()
+  index.add(make_lead(1, "whatsapp"))
+  assert len(index) == 0
+
+
+def test_lead_stats_index_counts_by_dimension_and_day():
+  index = LeadStatsIndex()
+  index.build([
+    dict(make_lead(1, timestamp=datetime(2024, 1, 1, 9)), budget="30-50k", services=["site"]),
+    dict(make_lead(2, "telegram", timestamp=datetime(2024, 1, 1, 18)), budget="500k+", services=["site", "telegram-bot"])
+  ])
+  index.add(dict(make_lead(3, timestamp=datetime(2024, 1, 3, 12)), budget="30-50k", services=["telegram-bot"]))
+  summary = index.summary()
+  assert summary["total"] == len(index) == 3
+  assert summary["by_day"] == {"2024-01-01": 2, "2024-01-03": 1}
+  assert summary["by_budget"] == {"30-50k": 2, "500k+": 1}
+  assert summary["by_services"] == {"site": 2, "telegram-bot": 2}
+  assert summary["by_contact_method"] == {"email": 2, "telegram": 1}
+  assert index.summary(date_from=date(2024, 1, 2))["by_services"] == {"telegram-bot": 1}
+  assert index.summary(date_to=date(2024, 1, 1))["total"] == 2
+
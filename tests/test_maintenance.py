@@ -0,0 +1,9 @@
+from datetime import datetime
+from backend.maintenance import month_before
+
+
+def test_month_before_crosses_year_boundary():
+  assert month_before(datetime(2025, 3, 15), 0) == "2025-03"
+  assert month_before(datetime(2025, 3, 15), 2) == "2025-01"
+  assert month_before(datetime(2025, 3, 15), 3) == "2024-12"
+  assert month_before(datetime(2025, 1, 1), 13) == "2023-12"
@@ -0,0 +1,45 @@
+import pytest
+from backend.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render():
+  registry = MetricsRegistry()
+  counter = registry.counter("test_total", "Test counter", ["result"])
+  gauge = registry.gauge("test_pending", "Test gauge")
+  counter.inc(result="ok")
+  counter.inc(2, result='say "hi"')
+  gauge.set(3)
+  text = registry.render()
+  assert "# TYPE test_total counter" in text
+  assert 'test_total{result="ok"} 1' in text
+  assert 'test_total{result="say \\"hi\\""} 2' in text
+  assert "test_pending 3" in text
+  with pytest.raises(ValueError):
+    counter.inc(-1, result="ok")
+  with pytest.raises(ValueError):
+    counter.inc(stage="ok")
+
+
+def test_histogram_buckets_are_cumulative():
+  registry = MetricsRegistry()
+  histogram = registry.histogram("test_seconds", "Test histogram", ["stage"], buckets=(0.1, 1.0))
+  histogram.observe(0.05, stage="a")
+  histogram.observe(0.5, stage="a")
+  histogram.observe(5, stage="a")
+  with histogram.time(stage="b"):
+    pass
+  text = registry.render()
+  assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in text
+  assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in text
+  assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in text
+  assert 'test_seconds_sum{stage="a"} 5.55' in text
+  assert 'test_seconds_count{stage="a"} 3' in text
+  assert histogram.count(stage="b") == 1
+
+
+def test_registry_reuses_and_rejects_conflicting_metrics():
+  registry = MetricsRegistry()
+  counter = registry.counter("test_total", "Test counter", ["result"])
+  assert registry.counter("test_total", "Test counter", ["result"]) is counter
+  with pytest.raises(ValueError):
+    registry.gauge("test_total", "Test gauge", ["result"])
@@ -0,0 +1,122 @@
+import json
+import pytest
+import fakeredis
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from backend.config import config
+from backend.middleware import MemoryRateLimitStore, RedisRateLimitStore, RateLimitMiddleware
+
+
+def make_client(monkeypatch, **limits):
+  monkeypatch.setattr(config, "rate_limit_enabled", True)
+  app = FastAPI()
+  calls = []
+
+  @app.post("/submit-form")
+  async def submit(request: Request):
+    calls.append(await request.json())
+    return {"ok": True}
+
+  @app.get("/health")
+  async def health():
+    return {"ok": True}
+
+  options = {"ip_rate": 0.001, "ip_burst": 100, "contact_rate": 0.001, "contact_burst": 100, **limits}
+  return TestClient(RateLimitMiddleware(app, store=MemoryRateLimitStore(), **options)), calls
+
+
+def test_ip_limit_rejects_before_reaching_app(monkeypatch):
+  client, calls = make_client(monkeypatch, ip_burst=2)
+  payloads = [{"contact_method": "email", "email": f"user{i}@example.com"} for i in range(3)]
+  responses = [client.post("/submit-form", json=payload) for payload in payloads]
+  assert [response.status_code for response in responses] == [200, 200, 429]
+  assert int(responses[-1].headers["retry-after"]) >= 1
+  assert len(calls) == 2
+  assert client.get("/health").status_code == 200
+
+
+def test_contact_limit_normalizes_contact(monkeypatch):
+  client, calls = make_client(monkeypatch, contact_burst=1)
+  assert client.post("/submit-form", json={"contact_method": "email", "email": "User@Example.com"}).status_code == 200
+  response = client.post("/submit-form", json={"contact_method": "email", "email": " user@example.com"})
+  assert response.status_code == 429
+  assert client.post("/submit-form", json={"contact_method": "telegram", "telegram": "@other"}).status_code == 200
+  assert calls == [
+    {"contact_method": "email", "email": "User@Example.com"},
+    {"contact_method": "telegram", "telegram": "@other"}
+  ]
+
+
+def test_oversized_and_malformed_bodies(monkeypatch):
+  client, calls = make_client(monkeypatch, max_body_size=64)
+  assert client.post("/submit-form", content=b"x" * 65).status_code == 413
+  response = client.post("/submit-form", content=json.dumps({"contact_method": "email"}))
+  assert response.status_code == 200
+  assert calls == [{"contact_method": "email"}]
+
+
+def test_forwarded_ip_uses_proxy_appended_address(monkeypatch):
+  client, calls = make_client(monkeypatch, ip_burst=1, trust_forwarded=True)
+  first = client.post("/submit-form", json={}, headers={"X-Forwarded-For": "1.1.1.1, 203.0.113.7"})
+  spoofed = client.post("/submit-form", json={}, headers={"X-Forwarded-For": "2.2.2.2, 203.0.113.7"})
+  assert [first.status_code, spoofed.status_code] == [200, 429]
+  client, calls = make_client(monkeypatch, ip_burst=1, trust_forwarded=True, proxy_hops=2)
+  assert client.post("/submit-form", json={}, headers={"X-Forwarded-For": "3.3.3.3, 198.51.100.1, 10.0.0.1"}).status_code == 200
+  assert client.post("/submit-form", json={}, headers={"X-Forwarded-For": "4.4.4.4, 198.51.100.1, 10.0.0.1"}).status_code == 429
+  assert client.post("/submit-form", json={}, headers={"X-Forwarded-For": "198.51.100.2, 10.0.0.1"}).status_code == 200
+
+
+def test_disabled_limiter_passes_through(monkeypatch):
+  client, calls = make_client(monkeypatch, ip_burst=1)
+  monkeypatch.setattr(config, "rate_limit_enabled", False)
+  for _ in range(3):
+    assert client.post("/submit-form", json={}).status_code == 200
+  assert len(calls) == 3
+
+
+def test_import_bucket_streams_body_without_contact_limit(monkeypatch):
+  monkeypatch.setattr(config, "rate_limit_enabled", True)
+  app = FastAPI()
+  sizes = []
+
+  @app.post("/admin/leads/import")
+  async def import_leads(request: Request):
+    sizes.append(len(await request.body()))
+    return {"ok": True}
+
+  client = TestClient(RateLimitMiddleware(
+    app, store=MemoryRateLimitStore(), paths=("/admin/leads/import",), bucket="import",
+    ip_rate=0.001, ip_burst=2, contact_rate=None, max_body_size=1000
+  ))
+  assert client.post("/admin/leads/import", content=b"x" * 1001).status_code == 413
+  assert client.post("/admin/leads/import", content=b'{"contact_method": "email"}\n' * 20).status_code == 200
+  assert client.post("/admin/leads/import", content=b"{}").status_code == 429
+  assert sizes == [560]
+
+
+@pytest.mark.asyncio
+async def test_memory_store_refills_and_evicts(monkeypatch):
+  now = [100.0]
+  monkeypatch.setattr("backend.middleware.time.monotonic", lambda: now[0])
+  store = MemoryRateLimitStore(max_keys=2)
+  assert await store.consume("a", 1.0, 1) == (True, 0.0)
+  allowed, retry_after = await store.consume("a", 1.0, 1)
+  assert not allowed and retry_after == pytest.approx(1.0)
+  now[0] += 1
+  assert (await store.consume("a", 1.0, 1))[0]
+  await store.consume("b", 1.0, 1)
+  await store.consume("c", 1.0, 1)
+  assert len(store) == 2
+  assert (await store.consume("a", 1.0, 1))[0]
+
+
+@pytest.mark.asyncio
+async def test_redis_store_shares_buckets():
+  client = fakeredis.FakeAsyncRedis()
+  first = RedisRateLimitStore(client)
+  second = RedisRateLimitStore(client)
+  assert (await first.consume("ip:1.2.3.4", 0.01, 2))[0]
+  assert (await second.consume("ip:1.2.3.4", 0.01, 2))[0]
+  allowed, retry_after = await first.consume("ip:1.2.3.4", 0.01, 2)
+  assert not allowed and retry_after > 0
+  assert 0 < await client.pttl("terrasite:ratelimit:ip:1.2.3.4") <= 200000
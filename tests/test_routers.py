@@ -1,8 +1,15 @@
 import pytest
 from datetime import datetime
 from fastapi import HTTPException
-from backend.schemas import LeadCreate, Lead
-from backend.services import LeadService
+import json
+import csv
+import io
+import zipfile
+from backend.schemas import LeadCreate, Lead, LeadPage
+from backend.services import LeadService, EmailNotifier
+from backend.config import config
+from backend.metrics import LEADS_PROCESSED
+from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock
 
 
@@ -90,9 +97,221 @@ async def test_admin_leads(client, mock_lead_service):
       email="test@example.com"
     )
   ]
-  mock_lead_service.get_all_leads = AsyncMock(return_value=mock_leads)
+  mock_lead_service.list_leads = AsyncMock(return_value=LeadPage(items=mock_leads, next_cursor="abc"))
 
-  response = client.get("/admin/leads")
+  response = client.get("/admin/leads", params={"limit": 1, "services": ["site", "bot"], "order": "desc"})
   assert response.status_code == 200
   assert len(response.json()) == 1
   assert response.json()[0]["id"] == 1
+  assert response.headers["X-Next-Cursor"] == "abc"
+  query = mock_lead_service.list_leads.await_args.args[0]
+  assert query.limit == 1
+  assert query.services == ["site", "bot"]
+  assert query.order == "desc"
+
+
+def stored_lead(lead_id, **overrides):
+  lead = {
+    "id": lead_id,
+    "timestamp": f"2024-01-0{lead_id}T12:00:00",
+    "name": "Test",
+    "services": ["site"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "email",
+    "email": f"test{lead_id}@example.com"
+  }
+  lead.update(overrides)
+  return lead
+
+
+def test_admin_leads_pagination(client, mock_leads_file):
+  mock_leads_file.write_text(json.dumps([
+    stored_lead(1), stored_lead(2, budget="500k+"), stored_lead(3), stored_lead(4)
+  ]), encoding="utf-8")
+  response = client.get("/admin/leads", params={"limit": 2, "budget": "30-50k"})
+  assert [lead["id"] for lead in response.json()] == [1, 3]
+  response = client.get("/admin/leads", params={"limit": 2, "budget": "30-50k",
+                                                "cursor": response.headers["X-Next-Cursor"]})
+  assert [lead["id"] for lead in response.json()] == [4]
+  assert "X-Next-Cursor" not in response.headers
+  response = client.get("/admin/leads", params={"cursor": "invalid"})
+  assert response.status_code == 400
+
+
+def test_admin_leads_stream(client, mock_leads_file):
+  mock_leads_file.write_text(json.dumps([
+    stored_lead(1), stored_lead(2, services=["telegram-bot"]), stored_lead(3)
+  ]), encoding="utf-8")
+  response = client.get("/admin/leads/stream", params={"date_from": "2024-01-02T00:00:00"})
+  assert response.status_code == 200
+  assert response.headers["content-type"] == "application/x-ndjson"
+  assert [json.loads(line)["id"] for line in response.text.splitlines()] == [2, 3]
+
+
+def test_submit_form_notifies_in_background(test_app, monkeypatch):
+  notify = AsyncMock()
+  monkeypatch.setattr(EmailNotifier, "notify", notify)
+  data = {
+    "name": "Test",
+    "services": ["site"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "email",
+    "email": "background@example.com"
+  }
+  with TestClient(test_app) as client:
+    response = client.post("/submit-form", json=data)
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+  notify.assert_awaited_once()
+  assert notify.await_args.args[0].email == "background@example.com"
+
+
+def test_sqlite_storage_end_to_end(test_app, mock_leads_file, monkeypatch):
+  monkeypatch.setattr(config, "leads_storage", "sqlite")
+  monkeypatch.setattr(EmailNotifier, "notify", AsyncMock())
+  mock_leads_file.write_text(json.dumps([stored_lead(1)]), encoding="utf-8")
+  data = {
+    "name": "Test",
+    "services": ["site"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "telegram",
+    "telegram": "@sqlite_user"
+  }
+  with TestClient(test_app) as client:
+    assert client.post("/submit-form", json=data).json()["id"] == 2
+    assert client.post("/submit-form", json=data).status_code == 400
+    response = client.get("/admin/leads", params={"contact_method": "telegram"})
+  assert [lead["id"] for lead in response.json()] == [2]
+  assert mock_leads_file.with_suffix(".sqlite3").exists()
+
+
+def test_metrics_endpoint_reports_lead_stages(test_app, monkeypatch):
+  monkeypatch.setattr(EmailNotifier, "notify", AsyncMock())
+  accepted = LEADS_PROCESSED.value(result="accepted")
+  duplicates = LEADS_PROCESSED.value(result="duplicate")
+  data = {
+    "name": "Test",
+    "services": ["site"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "email",
+    "email": "metrics@example.com"
+  }
+  with TestClient(test_app) as client:
+    client.post("/submit-form", json=data)
+    client.post("/submit-form", json=data)
+    client.get("/admin/leads")
+    response = client.get("/metrics")
+  assert response.status_code == 200
+  assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+  assert LEADS_PROCESSED.value(result="accepted") == accepted + 1
+  assert LEADS_PROCESSED.value(result="duplicate") == duplicates + 1
+  for stage in ("validate", "duplicate_check", "allocate_id", "repository_add", "notify", "repository_query"):
+    assert f'terrasite_lead_stage_duration_seconds_count{{stage="{stage}"}}' in response.text
+  assert 'terrasite_notifications_pending{mode="queue"} ' in response.text
+
+
+def test_lead_service_is_shared_for_app_lifetime(test_app, monkeypatch):
+  close = AsyncMock()
+  monkeypatch.setattr(LeadService, "close", close)
+  with TestClient(test_app) as client:
+    service = test_app.state.lead_service
+    client.get("/admin/leads")
+    client.get("/admin/leads")
+    assert test_app.state.lead_service is service
+  close.assert_awaited_once()
+  assert not hasattr(test_app.state, "lead_service")
+
+
+def test_admin_leads_import_requires_token(test_app, monkeypatch):
+  with TestClient(test_app) as client:
+    assert client.post("/admin/leads/import", content=b"").status_code == 403
+    monkeypatch.setattr(config, "import_token", "secret")
+    assert client.post("/admin/leads/import", content=b"").status_code == 401
+    response = client.post("/admin/leads/import", content=b"", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+
+def test_admin_leads_import(test_app, mock_leads_file, monkeypatch):
+  monkeypatch.setattr(config, "import_token", "secret")
+  rows = [
+    "name,services,description,budget,contact_method,email",
+    "Test,site|telegram-bot,long description with enough words to pass validation for the test case,30-50k,email,a@example.com",
+    "Test,site,short,30-50k,email,b@example.com",
+    "Test,site,long description with enough words to pass validation for the test case,30-50k,email,A@example.com"
+  ]
+  with TestClient(test_app) as client:
+    response = client.post("/admin/leads/import", params={"format": "csv"}, content="\n".join(rows).encode("utf-8"),
+                           headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert response.json()["imported"] == 1
+    assert response.json()["duplicates"] == 1
+    assert [error["row"] for error in response.json()["errors"]] == [2]
+    leads = client.get("/admin/leads").json()
+  assert leads[0]["services"] == ["site", "telegram-bot"]
+
+
+def test_admin_leads_export_csv_gzip(test_app, mock_leads_file):
+  leads = [stored_lead(1), dict(stored_lead(2), contact_method="telegram", telegram="@export_user",
+                                description="=HYPERLINK long description with enough words to pass validation")]
+  mock_leads_file.write_text(json.dumps(leads), encoding="utf-8")
+  with TestClient(test_app) as client:
+    response = client.get("/admin/leads/export", params={"contact_method": "telegram"},
+                          headers={"Accept-Encoding": "gzip"})
+  assert response.status_code == 200
+  assert response.headers["content-encoding"] == "gzip"
+  assert response.headers["content-type"] == "text/csv; charset=utf-8"
+  assert response.headers["content-disposition"].startswith('attachment; filename="leads-')
+  rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+  assert rows[0][:3] == ["id", "timestamp", "name"]
+  assert [row[0] for row in rows[1:]] == ["2"]
+  assert rows[1][4].startswith("'=HYPERLINK")
+
+
+def test_admin_leads_export_xlsx(test_app, mock_leads_file):
+  mock_leads_file.write_text(json.dumps([stored_lead(1), stored_lead(2)]), encoding="utf-8")
+  with TestClient(test_app) as client:
+    response = client.get("/admin/leads/export", params={"format": "xlsx"})
+  assert response.status_code == 200
+  assert "content-encoding" not in response.headers
+  with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+    assert archive.testzip() is None
+    sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+  assert sheet.count("<row>") == 3
+  assert "<c><v>2</v></c>" in sheet
+
+
+def test_admin_stats(test_app, mock_leads_file):
+  leads = [stored_lead(1), stored_lead(2, budget="500k+"), stored_lead(3, contact_method="telegram", telegram="@stats_user")]
+  mock_leads_file.write_text(json.dumps(leads), encoding="utf-8")
+  with TestClient(test_app) as client:
+    response = client.get("/admin/stats", params={"date_from": "2024-01-02"})
+    rebuilt = client.post("/admin/stats/rebuild")
+  assert response.status_code == 200
+  assert response.json() == {
+    "total": 2,
+    "by_day": {"2024-01-02": 1, "2024-01-03": 1},
+    "by_budget": {"500k+": 1, "30-50k": 1},
+    "by_services": {"site": 2},
+    "by_contact_method": {"email": 1, "telegram": 1}
+  }
+  assert rebuilt.json()["total"] == 3
+
+
+def test_admin_leads_search(test_app, mock_leads_file):
+  leads = [
+    stored_lead(1, description="Нужен телеграм бот для записи клиентов в салон красоты"),
+    stored_lead(2, description="Интернет магазин одежды с доставкой по всей России"),
+    stored_lead(3, description="Telegram bot для поддержки клиентов интернет магазина")
+  ]
+  mock_leads_file.write_text(json.dumps(leads), encoding="utf-8")
+  with TestClient(test_app) as client:
+    response = client.get("/admin/leads/search", params={"q": "интернет магазины"})
+    empty = client.get("/admin/leads/search", params={"q": ""})
+  assert response.status_code == 200
+  assert [lead["id"] for lead in response.json()] == [3, 2]
+  assert response.headers["x-total-count"] == "2"
+  assert empty.status_code == 422
@@ -144,3 +144,35 @@ def test_lead():
   assert lead.budget == "30-50k"
   assert lead.contact_method == "email"
   assert lead.email == "test@example.com"
+
+
+def test_lead_from_storage_matches_validated_lead():
+  data = {
+    "id": 7,
+    "timestamp": "2024-01-02T12:30:00",
+    "name": "Test",
+    "services": ["site"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "phone",
+    "phone_number": "+7 (926) 123-45-67"
+  }
+  lead = Lead.from_storage(data)
+  assert lead.timestamp == datetime(2024, 1, 2, 12, 30)
+  assert lead == Lead(**data)
+  assert lead.model_dump() == Lead(**data).model_dump()
+  assert data["timestamp"] == "2024-01-02T12:30:00"
+
+
+@pytest.mark.parametrize("field, value", [("phone", "+7926123456"), ("phone_number", "9261234567")])
+def test_phone_fields_share_validation(field, value):
+  data = {
+    "name": "Test",
+    "services": ["site"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "phone",
+    field: value
+  }
+  with pytest.raises(ValidationError, match="Некорректный формат номера телефона"):
+    LeadCreate(**data)
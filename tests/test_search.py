@@ -0,0 +1,69 @@
+import json
+import pytest
+from backend.search import SearchIndex, stem, tokenize
+
+
+def make_lead(lead_id, description):
+  return {"id": lead_id, "timestamp": "2024-01-01T12:00:00", "description": description}
+
+
+def test_tokenize_handles_cyrillic_and_latin():
+  assert tokenize("Нужен Telegram-бот для магазина, ботов несколько!") == [
+    "нужен", "telegram", "бот", "для", "магазин", "бот", "нескольк"
+  ]
+  assert stem("bots") == stem("bot") == "bot"
+  assert stem("сайтов") == stem("сайта") == stem("сайт") == "сайт"
+  assert tokenize("Ёлка и елка") == ["елк", "елк"]
+
+
+def test_search_index_intersects_terms_newest_first():
+  index = SearchIndex()
+  index.build([
+    make_lead(1, "Нужен телеграм бот для записи клиентов"),
+    make_lead(2, "Интернет-магазин одежды с доставкой"),
+    make_lead(3, "Telegram bot и сайт для магазина")
+  ])
+  index.add(make_lead(4, "Два телеграм бота для поддержки"))
+  assert len(index) == 4
+  assert index.search("телеграм боты") == [4, 1]
+  assert index.search("магазин") == [3, 2]
+  assert index.search("telegram bots") == [3]
+  assert index.search("!!!") == []
+  assert index.search("бот доставка") == []
+
+
+@pytest.mark.asyncio
+async def test_search_index_persists_terms(tmp_path):
+  file_path = tmp_path / "leads.search.jsonl"
+  index = SearchIndex(str(file_path))
+  index.build([make_lead(1, "Сайт для пекарни")])
+  index.add(make_lead(2, "Бот для пекарни"))
+  await index.flush()
+  documents = [json.loads(line) for line in file_path.read_text(encoding="utf-8").splitlines()]
+  assert documents == [
+    {"id": 1, "terms": ["для", "пекарн", "сайт"], "timestamp": "2024-01-01T12:00:00"},
+    {"id": 2, "terms": ["бот", "для", "пекарн"], "timestamp": "2024-01-01T12:00:00"}
+  ]
+
+  restored = SearchIndex(str(file_path))
+  restored.build([make_lead(1, "ignored"), make_lead(2, "ignored")])
+  assert restored.search("пекарня") == [2, 1]
+  restored.build([make_lead(2, "ignored")])
+  assert [json.loads(line)["id"] for line in file_path.read_text(encoding="utf-8").splitlines()] == [2]
+
+
+@pytest.mark.asyncio
+async def test_search_index_rewrite_keeps_terms_of_other_workers(tmp_path):
+  file_path = tmp_path / "leads.search.jsonl"
+  index = SearchIndex(str(file_path))
+  index.build([make_lead(1, "Сайт для пекарни"), make_lead(2, "Сайт для кофейни")])
+  other = SearchIndex(str(file_path))
+  index.start()
+  index.load([make_lead(2, "ignored")])
+  other.add(make_lead(3, "Бот для пекарни"))
+  await other.flush()
+  index.complete()
+  assert [json.loads(line)["id"] for line in file_path.read_text(encoding="utf-8").splitlines()] == [2, 3]
+  assert [document["id"] for document in await index.refresh()] == [3]
+  assert index.search("пекарня") == [3]
+  assert await index.refresh() == []
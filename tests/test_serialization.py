@@ -0,0 +1,31 @@
+import json
+import pytest
+from backend import serialization
+from backend.serialization import FastJSONResponse, OrjsonSerializer, StdlibSerializer, create_serializer
+
+LEADS = [{"id": 1, "name": "Ёжик", "services": ["site"], "budget": None, "score": 1.5}]
+
+
+@pytest.mark.parametrize("serializer", [StdlibSerializer(), OrjsonSerializer()])
+def test_serializers_round_trip_compact_and_pretty(serializer):
+  compact = serializer.dumps(LEADS)
+  assert compact == json.dumps(LEADS, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+  assert serializer.loads(compact) == serializer.loads(compact.decode("utf-8")) == LEADS
+  pretty = serializer.dumps(LEADS, pretty=True)
+  assert pretty == json.dumps(LEADS, ensure_ascii=False, indent=2).encode("utf-8")
+  with pytest.raises(json.JSONDecodeError):
+    serializer.loads(b"{")
+
+
+def test_create_serializer_falls_back_without_orjson(monkeypatch):
+  assert create_serializer("json").name == "json"
+  assert create_serializer("auto").name == "orjson"
+  monkeypatch.setattr(serialization, "orjson", None)
+  assert create_serializer("auto").name == "json"
+  assert create_serializer("orjson").name == "json"
+
+
+def test_fast_json_response_renders_with_serializer():
+  response = FastJSONResponse({"detail": "Ошибка", "ids": [1, 2]})
+  assert response.body == '{"detail":"Ошибка","ids":[1,2]}'.encode("utf-8")
+  assert response.media_type == "application/json"
@@ -1,17 +1,37 @@
 import pytest
 import pytest_asyncio
+import asyncio
 import json
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException
 from backend.services import (
   JsonLeadRepository,
+  JsonLinesLeadRepository,
+  CachedLeadRepository,
+  BatchingLeadRepository,
+  SqliteLeadRepository,
+  SegmentedLeadRepository,
+  SqliteLeadIdAllocator,
+  create_lead_repository,
+  migrate_json_leads,
+  select_leads,
   ContactMethodValidator,
   TimeBasedDuplicateChecker,
+  IndexedLeadRepository,
+  IndexedDuplicateChecker,
+  RedisDuplicateChecker,
+  OutboxNotifier,
+  DigestNotifier,
   EmailNotifier,
   LeadService
 )
-from backend.schemas import LeadCreate, Lead
-from unittest.mock import AsyncMock
+from backend.schemas import (
+  LeadCreate, Lead, LeadFilter, LeadImportResult, LeadQuery, LeadSearchQuery, LeadStatsQuery
+)
+from backend.config import config
+from backend.indexes import LeadStatsIndex, RecentContactIndex
+from unittest.mock import AsyncMock, MagicMock
 
 
 @pytest.mark.asyncio
@@ -42,8 +62,9 @@ async def test_json_lead_repository_existing(mock_aiofiles_open):
 
 
 @pytest.mark.asyncio
-async def test_json_lead_repository_add(mock_aiofiles_open):
-  repo = JsonLeadRepository("leads.json")
+async def test_json_lead_repository_add(tmp_path):
+  leads_file = tmp_path / "leads.json"
+  repo = JsonLeadRepository(str(leads_file))
   lead_data = {
     "name": "Test",
     "services": ["site"],
@@ -52,9 +73,272 @@ async def test_json_lead_repository_add(mock_aiofiles_open):
     "contact_method": "email",
     "email": "test@example.com"
   }
-  mock_aiofiles_open.side_effect = [FileNotFoundError, None]
   await repo.add(lead_data)
-  mock_aiofiles_open.return_value.__aenter__.return_value.write.assert_called_once()
+  assert json.loads(leads_file.read_text(encoding="utf-8")) == [lead_data]
+  assert "\n" not in leads_file.read_text(encoding="utf-8")
+  assert not (tmp_path / "leads.json.tmp").exists()
+
+
+@pytest.mark.asyncio
+async def test_json_lead_repository_concurrent_writers(tmp_path):
+  leads_file = tmp_path / "leads.json"
+  writers = [JsonLeadRepository(str(leads_file)) for _ in range(4)]
+  await asyncio.gather(*[
+    writers[i % len(writers)].add(lead) for i, lead in enumerate(sample_leads(40))
+  ])
+  stored = json.loads(leads_file.read_text(encoding="utf-8"))
+  assert sorted(lead["id"] for lead in stored) == list(range(1, 41))
+
+
+@pytest.mark.asyncio
+async def test_json_lead_repository_refuses_to_overwrite_corrupt_file(tmp_path):
+  leads_file = tmp_path / "leads.json"
+  leads_file.write_text('[{"id": 1', encoding="utf-8")
+  repo = JsonLeadRepository(str(leads_file))
+  with pytest.raises(json.JSONDecodeError):
+    await repo.add({"id": 2})
+  assert leads_file.read_text(encoding="utf-8") == '[{"id": 1'
+
+
+@pytest.mark.asyncio
+async def test_json_lines_lead_repository_add(tmp_path):
+  repo = JsonLinesLeadRepository(str(tmp_path / "leads.jsonl"))
+  await repo.add({"id": 1, "name": "Тест"})
+  await repo.add_many([{"id": 2, "name": "Test"}, {"id": 3, "name": "Test"}])
+  leads = await repo.get_all()
+  assert [lead["id"] for lead in leads] == [1, 2, 3]
+  assert leads[0]["name"] == "Тест"
+  assert len((tmp_path / "leads.jsonl").read_text(encoding="utf-8").splitlines()) == 3
+
+
+@pytest.mark.asyncio
+async def test_json_lines_lead_repository_truncated_line(tmp_path):
+  log_file = tmp_path / "leads.jsonl"
+  log_file.write_text('{"id": 1}\n{"id": 2, "na', encoding="utf-8")
+  repo = JsonLinesLeadRepository(str(log_file))
+  await repo.add({"id": 3})
+  leads = await repo.get_all()
+  assert [lead["id"] for lead in leads] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_migrate_json_leads(tmp_path):
+  source = tmp_path / "leads.json"
+  source.write_text(json.dumps([{"id": 1}, {"id": 2}]), encoding="utf-8")
+  target = JsonLinesLeadRepository(str(tmp_path / "leads.jsonl"))
+  lock_file = tmp_path / "leads.jsonl.migrate.lock"
+  assert await migrate_json_leads(source, target, lock_file) == 2
+  assert await migrate_json_leads(source, target, lock_file) == 0
+  assert [lead["id"] for lead in await target.get_all()] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_migrate_json_leads_renumbers_duplicate_ids(tmp_path):
+  source = tmp_path / "leads.json"
+  leads = sample_leads(3)
+  leads[1]["id"] = 1
+  source.write_text(json.dumps(leads), encoding="utf-8")
+  db_path = str(tmp_path / "leads.sqlite3")
+  target = SqliteLeadRepository(db_path)
+  assert await migrate_json_leads(source, target, f"{db_path}.migrate.lock") == 3
+  stored = await target.get_all()
+  assert [(lead["id"], lead["email"]) for lead in stored] == [
+    (1, "user1@example.com"), (3, "user3@example.com"), (4, "user2@example.com")
+  ]
+  await target.close()
+
+
+@pytest.mark.asyncio
+async def test_migrate_json_leads_concurrent(tmp_path):
+  source = tmp_path / "leads.json"
+  source.write_text(json.dumps(sample_leads(20)), encoding="utf-8")
+  db_path = str(tmp_path / "leads.sqlite3")
+  lock_file = f"{db_path}.migrate.lock"
+  migrated = await asyncio.gather(
+    *(migrate_json_leads(source, SqliteLeadRepository(db_path), lock_file) for _ in range(4))
+  )
+  assert sorted(migrated) == [0, 0, 0, 20]
+  assert await SqliteLeadRepository(db_path).max_id() == 20
+
+
+@pytest.mark.asyncio
+async def test_json_lines_lead_repository_iter_all(tmp_path):
+  log_file = tmp_path / "leads.jsonl"
+  log_file.write_text("".join(json.dumps({"id": i, "note": "x" * 5000}) + "\n" for i in range(1, 51)) + '{"id": 51}',
+                      encoding="utf-8")
+  repo = JsonLinesLeadRepository(str(log_file))
+  assert [lead["id"] async for lead in repo.iter_all()] == list(range(1, 52))
+  assert [lead async for lead in JsonLinesLeadRepository(str(tmp_path / "missing.jsonl")).iter_all()] == []
+
+
+async def iterate(leads):
+  for lead in leads:
+    yield lead
+
+
+@pytest.mark.asyncio
+async def test_select_leads():
+  leads = [
+    {"id": i, "timestamp": f"2024-01-{i:02d}T12:00:00", "contact_method": "email" if i % 2 else "telegram",
+     "budget": "30-50k", "services": ["site"] if i < 8 else ["telegram-bot"]}
+    for i in range(1, 11)
+  ]
+  page, cursor = await select_leads(iterate(leads), LeadQuery(limit=3, contact_method="email"))
+  assert [lead["id"] for lead in page] == [1, 3, 5]
+  page, cursor = await select_leads(iterate(leads), LeadQuery(limit=3, contact_method="email", cursor=cursor))
+  assert [lead["id"] for lead in page] == [7, 9]
+  assert cursor is None
+  page, _ = await select_leads(iterate(leads), LeadQuery(sort="timestamp", order="desc", limit=2, offset=1))
+  assert [lead["id"] for lead in page] == [9, 8]
+  page, _ = await select_leads(iterate(leads), LeadQuery(services=["telegram-bot"], date_to="2024-01-09T00:00:00"))
+  assert [lead["id"] for lead in page] == [8]
+
+
+def sample_leads(count):
+  return [
+    {"id": i, "timestamp": f"2024-01-{i:02d}T12:00:00", "name": "Test",
+     "contact_method": "email" if i % 2 else "telegram", "email": f"user{i}@example.com", "telegram": f"@user_{i:05d}",
+     "budget": "30-50k" if i % 3 else "500k+", "services": ["site"] if i < 8 else ["telegram-bot", "site"]}
+    for i in range(1, count + 1)
+  ]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lead_repository_add(tmp_path):
+  repo = SqliteLeadRepository(str(tmp_path / "leads.sqlite3"))
+  assert await repo.get_all() == []
+  assert await repo.max_id() == 0
+  await repo.add_many(sample_leads(3))
+  await repo.add({"id": 4, "timestamp": "2024-01-04T12:00:00", "contact_method": "email", "email": "Ёж@example.com",
+                  "services": ["site"]})
+  leads = await repo.get_all()
+  assert [lead["id"] for lead in leads] == [1, 2, 3, 4]
+  assert leads[3]["email"] == "Ёж@example.com"
+  assert [lead["id"] async for lead in repo.iter_all()] == [1, 2, 3, 4]
+  assert await repo.max_id() == 4
+  with pytest.raises(Exception):
+    await repo.add(sample_leads(1)[0])
+  mode = await asyncio.to_thread(repo._fetch, "PRAGMA journal_mode")
+  assert mode[0][0] == "wal"
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lead_repository_iter_all_batches(tmp_path, monkeypatch):
+  monkeypatch.setattr(SqliteLeadRepository, "_BATCH_SIZE", 3)
+  repo = SqliteLeadRepository(str(tmp_path / "leads.sqlite3"))
+  await repo.add_many(sample_leads(7))
+  assert [lead["id"] async for lead in repo.iter_all()] == list(range(1, 8))
+
+
+@pytest.mark.parametrize("query", [
+  LeadQuery(limit=3),
+  LeadQuery(limit=2, offset=1, contact_method="email"),
+  LeadQuery(budget="500k+", order="desc"),
+  LeadQuery(services=["telegram-bot"], sort="timestamp", order="desc", limit=2),
+  LeadQuery(date_from="2024-01-03T00:00:00", date_to="2024-01-06T12:00:00"),
+])
+@pytest.mark.asyncio
+async def test_sqlite_lead_repository_query_matches_scan(tmp_path, query):
+  repo = SqliteLeadRepository(str(tmp_path / "leads.sqlite3"))
+  leads = sample_leads(10)
+  await repo.add_many(leads)
+  expected_page, expected_cursor = await select_leads(iterate(leads), query)
+  page, cursor = await repo.query(query)
+  assert page == expected_page
+  assert cursor == expected_cursor
+  if cursor:
+    next_query = query.model_copy(update={"cursor": cursor, "offset": 0})
+    assert await repo.query(next_query) == await select_leads(iterate(leads), next_query)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lead_repository_recent_contact(tmp_path):
+  repo = SqliteLeadRepository(str(tmp_path / "leads.sqlite3"))
+  await repo.add({"id": 1, "timestamp": datetime.now().isoformat(), "contact_method": "email",
+                  "email": "Test@Example.com", "services": ["site"]})
+  checker = TimeBasedDuplicateChecker(repo)
+  lead_data = LeadCreate(
+    name="Test",
+    services=["site"],
+    description="long description with enough words to pass validation for the test case",
+    budget="30-50k",
+    contact_method="email",
+    email="test@example.com"
+  )
+  assert await checker.is_duplicate(lead_data) == True
+  assert await repo.has_recent_contact("email", "test@example.com", datetime.now()) == False
+  assert await repo.has_recent_contact("telegram", "test@example.com", datetime.now() - timedelta(minutes=5)) == False
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lead_id_allocator(tmp_path):
+  db_path = str(tmp_path / "leads.sqlite3")
+  repo = SqliteLeadRepository(db_path)
+  await repo.add_many(sample_leads(5))
+  first = SqliteLeadIdAllocator(repo)
+  second = SqliteLeadIdAllocator(SqliteLeadRepository(db_path))
+  ids = await asyncio.gather(*(allocator.next_id() for allocator in [first, second] * 5))
+  assert sorted(ids) == list(range(6, 16))
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lead_id_allocator_reserves_blocks(tmp_path, monkeypatch):
+  db_path = str(tmp_path / "leads.sqlite3")
+  repo = SqliteLeadRepository(db_path)
+  await repo.add_many(sample_leads(5))
+  first = SqliteLeadIdAllocator(repo, block_size=10)
+  second = SqliteLeadIdAllocator(SqliteLeadRepository(db_path), block_size=10)
+  reserve = AsyncMock(wraps=repo.next_ids)
+  monkeypatch.setattr(repo, "next_ids", reserve)
+  assert [await first.next_id() for _ in range(3)] == [6, 7, 8]
+  assert await second.next_id() == 16
+  assert await first.next_id() == 9
+  assert await first.next_ids(2) == [26, 27]
+  assert reserve.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_lead_repository_hits(tmp_path):
+  log_file = tmp_path / "leads.jsonl"
+  inner = JsonLinesLeadRepository(str(log_file))
+  inner.get_all = AsyncMock(wraps=inner.get_all)
+  repo = CachedLeadRepository(inner, str(log_file))
+  assert await repo.get_all() == []
+  await repo.add({"id": 1})
+  await repo.add({"id": 2})
+  assert [lead["id"] for lead in await repo.get_all()] == [1, 2]
+  assert [lead["id"] for lead in await repo.get_all()] == [1, 2]
+  assert inner.get_all.await_count == 2
+  assert repo.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+
+@pytest.mark.asyncio
+async def test_cached_lead_repository_external_change(tmp_path):
+  log_file = tmp_path / "leads.jsonl"
+  repo = CachedLeadRepository(JsonLinesLeadRepository(str(log_file)), str(log_file))
+  await repo.add({"id": 1})
+  assert len(await repo.get_all()) == 1
+  await JsonLinesLeadRepository(str(log_file)).add({"id": 2})
+  assert [lead["id"] for lead in await repo.get_all()] == [1, 2]
+  assert repo.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_lead_repository_concurrent_writer(tmp_path):
+  log_file = tmp_path / "leads.jsonl"
+  inner = JsonLinesLeadRepository(str(log_file))
+  other = JsonLinesLeadRepository(str(log_file))
+  repo = CachedLeadRepository(inner, str(log_file))
+  assert await repo.get_all() == []
+  add_many = inner.add_many
+
+  async def add_after_other_worker(leads):
+    await other.add({"id": 1})
+    await add_many(leads)
+
+  inner.add_many = add_after_other_worker
+  await repo.add({"id": 2})
+  assert [lead["id"] for lead in await repo.get_all()] == [1, 2]
 
 
 @pytest.mark.asyncio
@@ -201,6 +485,124 @@ async def test_time_based_duplicate_checker_no_contact_value():
   assert result == False
 
 
+@pytest.mark.asyncio
+async def test_indexed_duplicate_checker(tmp_path):
+  log_file = tmp_path / "leads.jsonl"
+  await JsonLinesLeadRepository(str(log_file)).add({
+    "id": 1,
+    "timestamp": (datetime.now() - timedelta(seconds=1)).isoformat(),
+    "contact_method": "email",
+    "email": "test@example.com"
+  })
+  inner = JsonLinesLeadRepository(str(log_file))
+  inner.iter_all = MagicMock(wraps=inner.iter_all)
+  index = RecentContactIndex(timedelta(minutes=5))
+  repo = IndexedLeadRepository(inner, [index])
+  checker = IndexedDuplicateChecker(repo, index)
+  lead_data = LeadCreate(
+    name="Test",
+    services=["site"],
+    description="long description with enough words to pass validation for the test case",
+    budget="30-50k",
+    contact_method="telegram",
+    telegram="@test_user"
+  )
+  assert await checker.is_duplicate(lead_data) == False
+  await repo.add({
+    "id": 2,
+    "timestamp": datetime.now().isoformat(),
+    "contact_method": "telegram",
+    "telegram": "@Test_User"
+  })
+  assert await checker.is_duplicate(lead_data) == True
+  assert inner.iter_all.call_count == 1
+  assert len(await repo.get_all()) == 2
+
+
+@pytest.mark.asyncio
+async def test_indexed_repository_builds_off_event_loop(tmp_path, monkeypatch):
+  inner = JsonLinesLeadRepository(str(tmp_path / "leads.jsonl"))
+  await inner.add_many(sample_leads(3))
+  threads = []
+  load = LeadStatsIndex.load
+  monkeypatch.setattr(LeadStatsIndex, "load", lambda self, leads: threads.append(threading.get_ident()) or load(self, leads))
+  monkeypatch.setattr(IndexedLeadRepository, "_CHUNK_SIZE", 2)
+  index = LeadStatsIndex()
+  await IndexedLeadRepository(inner, [index]).ensure_built()
+  assert len(threads) == 2 and threading.get_ident() not in threads
+  assert len(index) == 3
+
+
+@pytest.mark.asyncio
+async def test_indexed_repository_rebuild_during_write(tmp_path):
+  inner = JsonLinesLeadRepository(str(tmp_path / "leads.jsonl"))
+  await inner.add_many(sample_leads(2))
+  index = LeadStatsIndex()
+  repo = IndexedLeadRepository(inner, [index])
+  await repo.ensure_built()
+  written = asyncio.Event()
+  release = asyncio.Event()
+  add_many = inner.add_many
+
+  async def slow_add_many(leads):
+    await add_many(leads)
+    written.set()
+    await release.wait()
+
+  inner.add_many = slow_add_many
+  first = asyncio.create_task(repo.add_many(sample_leads(3)[2:]))
+  await written.wait()
+  rebuild = asyncio.create_task(repo.rebuild())
+  await asyncio.sleep(0.1)
+  assert not rebuild.done()
+  release.set()
+  await first
+  await rebuild
+  assert len(index) == 3
+  inner.add_many = add_many
+  rebuild = asyncio.create_task(repo.rebuild())
+  await asyncio.sleep(0)
+  await repo.add_many(sample_leads(4)[3:])
+  await rebuild
+  assert len(index) == 4
+
+
+@pytest.mark.asyncio
+async def test_redis_duplicate_checker():
+  fakeredis = pytest.importorskip("fakeredis")
+  client = fakeredis.FakeAsyncRedis()
+  checker = RedisDuplicateChecker(client, timedelta(minutes=5))
+  lead_data = LeadCreate(
+    name="Test",
+    services=["site"],
+    description="long description with enough words to pass validation for the test case",
+    budget="30-50k",
+    contact_method="email",
+    email="Test@Example.com"
+  )
+  assert await checker.is_duplicate(lead_data) == False
+  assert await checker.is_duplicate(lead_data) == True
+  assert 0 < await client.pttl("terrasite:duplicate:email:test@example.com") <= 300000
+  await checker.release(lead_data)
+  assert await checker.is_duplicate(lead_data) == False
+
+
+@pytest.mark.asyncio
+async def test_redis_duplicate_checker_no_contact_value():
+  fakeredis = pytest.importorskip("fakeredis")
+  client = fakeredis.FakeAsyncRedis()
+  checker = RedisDuplicateChecker(client)
+  lead_data = LeadCreate(
+    name="Test",
+    services=["site"],
+    description="long description with enough words to pass validation for the test case",
+    budget="30-50k",
+    contact_method="email"
+  )
+  assert await checker.is_duplicate(lead_data) == False
+  assert await client.dbsize() == 0
+
+
 @pytest.mark.asyncio
 async def test_email_notifier(mock_aiosmtplib):
   notifier = EmailNotifier(
@@ -254,6 +656,193 @@ async def test_email_notifier_content(mock_aiosmtplib):
   assert "email" in body.lower()
 
 
+@pytest.mark.asyncio
+async def test_email_notifier_pooled(mock_aiosmtplib):
+  pool = AsyncMock()
+  notifier = EmailNotifier(
+    smtp_host="smtp.test.com",
+    smtp_port=587,
+    smtp_user="user",
+    smtp_password="pass",
+    from_email="from@test.com",
+    to_email="to@test.com",
+    pool=pool
+  )
+  await notifier.notify(make_lead())
+  await notifier.close()
+  assert "Новая заявка" in pool.send_message.await_args.args[0]["Subject"]
+  pool.close.assert_awaited_once()
+  mock_aiosmtplib.login.assert_not_called()
+
+
+def make_lead(lead_id=1):
+  return Lead(
+    id=lead_id,
+    timestamp=datetime.now(),
+    name="Test",
+    services=["site"],
+    description="long description with enough words to pass validation for the test case",
+    budget="30-50k",
+    contact_method="email",
+    email="test@example.com"
+  )
+
+
+@pytest.mark.asyncio
+async def test_outbox_notifier_delivers(tmp_path):
+  inner = AsyncMock()
+  outbox_file = tmp_path / "leads.outbox.json"
+  notifier = OutboxNotifier(inner, str(outbox_file))
+  await notifier.start()
+  await notifier.notify(make_lead(1))
+  await notifier.notify(make_lead(2))
+  await notifier.join()
+  await notifier.close()
+  assert [call.args[0].id for call in inner.notify.await_args_list] == [1, 2]
+  assert list(tmp_path.glob("leads.outbox*.json")) == []
+  inner.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_outbox_notifier_retries(tmp_path):
+  inner = AsyncMock()
+  inner.notify.side_effect = [ConnectionError("smtp down"), None]
+  notifier = OutboxNotifier(inner, str(tmp_path / "leads.outbox.json"), retry_delay=0)
+  await notifier.start()
+  await notifier.notify(make_lead(1))
+  await notifier.join()
+  await notifier.close()
+  assert inner.notify.await_count == 2
+  assert notifier.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_notifier_restores_pending(tmp_path):
+  outbox_file = tmp_path / "leads.outbox.json"
+  failing = AsyncMock()
+  failing.notify.side_effect = ConnectionError("smtp down")
+  notifier = OutboxNotifier(failing, str(outbox_file), max_attempts=1)
+  await notifier.start()
+  await notifier.notify(make_lead(7))
+  await notifier.join()
+  await notifier.close()
+  assert notifier.pending == 1
+
+  inner = AsyncMock()
+  notifier = OutboxNotifier(inner, str(outbox_file))
+  await notifier.start()
+  await notifier.join()
+  await notifier.close()
+  assert inner.notify.await_args.args[0].id == 7
+  assert notifier.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_notifier_workers_keep_separate_files(tmp_path):
+  outbox_file = tmp_path / "leads.outbox.json"
+  failing = AsyncMock()
+  failing.notify.side_effect = ConnectionError("smtp down")
+  first = OutboxNotifier(failing, str(outbox_file), max_attempts=1, worker_id="1")
+  second = OutboxNotifier(AsyncMock(), str(outbox_file), worker_id="2")
+  await first.start()
+  await second.start()
+  await first.notify(make_lead(1))
+  await first.join()
+  await second.notify(make_lead(2))
+  await second.join()
+  assert [lead["id"] for lead in json.loads((tmp_path / "leads.outbox.1.json").read_text(encoding="utf-8"))] == [1]
+
+  third = OutboxNotifier(AsyncMock(), str(outbox_file), worker_id="3")
+  await third.start()
+  assert third.pending == 0
+  await third.close()
+  await first.close()
+  await second.close()
+
+
+@pytest.mark.asyncio
+async def test_outbox_notifier_claims_orphans_once(tmp_path):
+  outbox_file = tmp_path / "leads.outbox.json"
+  (tmp_path / "leads.outbox.99.json").write_text(json.dumps([make_lead(5).model_dump(mode="json")]), encoding="utf-8")
+  outbox_file.write_text(json.dumps([make_lead(6).model_dump(mode="json")]), encoding="utf-8")
+  senders = [AsyncMock(), AsyncMock()]
+  notifiers = [OutboxNotifier(inner, str(outbox_file), worker_id=str(i)) for i, inner in enumerate(senders)]
+  await asyncio.gather(*(notifier.start() for notifier in notifiers))
+  for notifier in notifiers:
+    await notifier.join()
+    await notifier.close()
+  sent = sorted(call.args[0].id for inner in senders for call in inner.notify.await_args_list)
+  assert sent == [5, 6]
+  assert list(tmp_path.glob("leads.outbox*.json")) == []
+
+
+@pytest.mark.asyncio
+async def test_email_notifier_notify_many(mock_aiosmtplib):
+  notifier = EmailNotifier(
+    smtp_host="smtp.test.com",
+    smtp_port=587,
+    smtp_user="user",
+    smtp_password="pass",
+    from_email="from@test.com",
+    to_email="to@test.com",
+    pool=AsyncMock()
+  )
+  await notifier.notify_many([make_lead(1), make_lead(2)])
+  sent_msg = notifier._pool.send_message.await_args.args[0]
+  assert sent_msg["Subject"] == "Новые заявки с сайта Terrasite: 2"
+  body = sent_msg.get_payload()[0].get_payload(decode=True).decode('utf-8')
+  assert "Заявка #1" in body and "Заявка #2" in body
+  assert body.count("Описание проекта:") == 2
+
+
+@pytest.mark.asyncio
+async def test_email_notifier_notify_import():
+  notifier = EmailNotifier(from_email="from@test.com", to_email="to@test.com", pool=AsyncMock())
+  await notifier.notify_import(LeadImportResult(imported=3, duplicates=1, ids=[7, 8, 9]))
+  sent_msg = notifier._pool.send_message.await_args.args[0]
+  assert sent_msg["Subject"] == "Импорт заявок на сайт Terrasite: 3"
+  body = sent_msg.get_payload()[0].get_payload(decode=True).decode('utf-8')
+  assert "#7-#9" in body and "Пропущено дублей: 1" in body
+  assert "Описание проекта:" not in body
+
+
+@pytest.mark.asyncio
+async def test_digest_notifier_window():
+  inner = AsyncMock()
+  notifier = DigestNotifier(inner, window=0.01, max_size=10)
+  await notifier.notify(make_lead(1))
+  await notifier.notify(make_lead(2))
+  inner.notify_many.assert_not_awaited()
+  await asyncio.sleep(0.05)
+  assert [lead.id for lead in inner.notify_many.await_args.args[0]] == [1, 2]
+  assert notifier.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_digest_notifier_max_size_and_close():
+  inner = AsyncMock()
+  notifier = DigestNotifier(inner, window=60, max_size=2)
+  for lead_id in range(1, 4):
+    await notifier.notify(make_lead(lead_id))
+  await notifier.close()
+  batches = [[lead.id for lead in call.args[0]] for call in inner.notify_many.await_args_list]
+  assert batches == [[1, 2], [3]]
+  inner.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_digest_notifier_keeps_leads_on_failure():
+  inner = AsyncMock()
+  inner.notify_many.side_effect = [ConnectionError("smtp down"), None]
+  notifier = DigestNotifier(inner, window=60, max_size=10)
+  await notifier.notify(make_lead(1))
+  await notifier.flush()
+  assert notifier.pending == 1
+  await notifier.close()
+  assert [lead.id for lead in inner.notify_many.await_args.args[0]] == [1]
+  assert notifier.pending == 0
+
+
 @pytest.mark.asyncio
 async def test_lead_service_process_lead(mock_aiofiles_open, mock_aiosmtplib):
   service = LeadService()
@@ -273,7 +862,7 @@ async def test_lead_service_process_lead(mock_aiofiles_open, mock_aiosmtplib):
 
 
 @pytest.mark.asyncio
-async def test_lead_service_get_all_leads(mock_aiofiles_open):
+async def test_lead_service_iter_leads(mock_leads_file):
   service = LeadService()
   existing_leads = [{
     "id": 1,
@@ -285,8 +874,305 @@ async def test_lead_service_get_all_leads(mock_aiofiles_open):
     "contact_method": "email",
     "email": "test@example.com"
   }]
-  mock_aiofiles_open.return_value.__aenter__.return_value.read.return_value = json.dumps(existing_leads)
-  leads = await service.get_all_leads()
+  mock_leads_file.write_text(json.dumps(existing_leads), encoding="utf-8")
+  leads = [lead async for lead in service.iter_leads(LeadFilter())]
   assert len(leads) == 1
   assert isinstance(leads[0], Lead)
   assert leads[0].id == 1
+
+
+@pytest.mark.asyncio
+async def test_lead_service_start_and_close(mock_leads_file, monkeypatch):
+  stored = dict(sample_leads(1)[0], timestamp=datetime.now().isoformat())
+  mock_leads_file.write_text(json.dumps([stored]), encoding="utf-8")
+  notifier = AsyncMock()
+  service = LeadService(notifier=notifier)
+  await service.start()
+  notifier.start.assert_awaited_once()
+  get_all = AsyncMock()
+  monkeypatch.setattr(JsonLeadRepository, "get_all", get_all)
+  lead_data = LeadCreate(
+    name="Test",
+    services=["site"],
+    description="long description with enough words to pass validation for the test case",
+    budget="30-50k",
+    contact_method="email",
+    email="user1@example.com"
+  )
+  with pytest.raises(HTTPException):
+    await service.process_lead(lead_data)
+  get_all.assert_not_awaited()
+  await service.close()
+  notifier.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lead_repository_close(tmp_path):
+  repository = SqliteLeadRepository(str(tmp_path / "leads.sqlite3"))
+  await repository.add(sample_leads(1)[0])
+  await repository.close()
+  assert await repository.max_id() == 1
+  await repository.close()
+
+
+@pytest.mark.asyncio
+async def test_batching_repository_coalesces_concurrent_adds(tmp_path):
+  inner = JsonLinesLeadRepository(str(tmp_path / "leads.jsonl"))
+  inner.add_many = AsyncMock(wraps=inner.add_many)
+  repo = BatchingLeadRepository(inner, max_delay=0.01, max_batch=100)
+  await asyncio.gather(*[repo.add(lead) for lead in sample_leads(10)])
+  inner.add_many.assert_awaited_once()
+  assert repo.commits == 1
+  assert [lead["id"] for lead in await repo.get_all()] == list(range(1, 11))
+
+
+@pytest.mark.asyncio
+async def test_batching_repository_flushes_full_batch(tmp_path):
+  inner = AsyncMock()
+  repo = BatchingLeadRepository(inner, max_delay=60, max_batch=3)
+  await asyncio.wait_for(asyncio.gather(*[repo.add(lead) for lead in sample_leads(3)]), timeout=1)
+  assert [lead["id"] for lead in inner.add_many.await_args.args[0]] == [1, 2, 3]
+  await repo.close()
+  inner.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batching_repository_propagates_write_errors():
+  inner = AsyncMock()
+  inner.add_many.side_effect = [OSError("disk full"), None]
+  repo = BatchingLeadRepository(inner, max_delay=0, max_batch=10)
+  results = await asyncio.gather(*[repo.add(lead) for lead in sample_leads(2)], return_exceptions=True)
+  assert all(isinstance(result, OSError) for result in results)
+  await repo.add(sample_leads(1)[0])
+  assert repo.commits == 1
+
+
+def month_leads():
+  months = [1, 1, 2, 3, 3]
+  return [
+    dict(lead, timestamp=f"2024-{month:02d}-{lead['id']:02d}T12:00:00")
+    for lead, month in zip(sample_leads(len(months)), months)
+  ]
+
+
+@pytest.mark.asyncio
+async def test_segmented_repository_writes_monthly_segments(tmp_path):
+  repo = SegmentedLeadRepository(str(tmp_path / "leads.segments"))
+  await repo.add_many(month_leads())
+  assert sorted(path.name for path in (tmp_path / "leads.segments").glob("*.jsonl")) == [
+    "2024-01.jsonl", "2024-02.jsonl", "2024-03.jsonl"
+  ]
+  manifest = repo.read_manifest()
+  assert manifest["2024-01"]["count"] == 2
+  assert manifest["2024-03"]["min_id"] == 4 and manifest["2024-03"]["max_id"] == 5
+  assert [lead["id"] for lead in await repo.get_all()] == [1, 2, 3, 4, 5]
+  assert await repo.max_id() == 5
+
+
+@pytest.mark.asyncio
+async def test_segmented_repository_reads_only_relevant_segments(tmp_path, monkeypatch):
+  repo = SegmentedLeadRepository(str(tmp_path / "leads.segments"))
+  await repo.add_many(month_leads())
+  read = []
+  original = repo._read_segment
+  monkeypatch.setattr(repo, "_read_segment", lambda name: read.append(name) or original(name))
+  page, _ = await repo.query(LeadQuery(date_from=datetime(2024, 3, 1)))
+  assert [lead["id"] for lead in page] == [4, 5]
+  assert read == ["2024-03"]
+  read.clear()
+  assert await repo.has_recent_contact("email", "user5@example.com", datetime(2024, 3, 1))
+  assert not await repo.has_recent_contact("email", "user1@example.com", datetime(2024, 3, 1))
+  assert read == ["2024-03", "2024-03"]
+
+
+@pytest.mark.asyncio
+async def test_create_lead_repository_keeps_segment_pruning(tmp_path, monkeypatch):
+  monkeypatch.setattr(config, "leads_storage", "segmented")
+  monkeypatch.setattr(config, "leads_cache", True)
+  backend = SegmentedLeadRepository(str(tmp_path / "leads.segments"))
+  await backend.add_many(month_leads())
+  read = []
+  original = backend._read_segment
+  monkeypatch.setattr(backend, "_read_segment", lambda name: read.append(name) or original(name))
+  repo = create_lead_repository(backend)
+  page, _ = await repo.query(LeadQuery(date_from=datetime(2024, 3, 1)))
+  assert [lead["id"] for lead in page] == [4, 5]
+  assert read == ["2024-03"]
+  await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_segmented_repository_compacts_and_gzips_old_segments(tmp_path):
+  directory = tmp_path / "leads.segments"
+  repo = SegmentedLeadRepository(str(directory))
+  leads = month_leads()
+  await repo.add_many(leads)
+  with open(directory / "2024-01.jsonl", "a", encoding="utf-8") as f:
+    f.write("not json\n" + json.dumps(leads[0]) + "\n")
+  assert await repo.compact("2024-03", compress=True) == ["2024-01", "2024-02"]
+  assert (directory / "2024-01.jsonl.gz").exists()
+  assert not (directory / "2024-01.jsonl").exists()
+  assert (directory / "2024-03.jsonl").exists()
+  manifest = repo.read_manifest()
+  assert manifest["2024-01"]["compressed"] and manifest["2024-01"]["count"] == 2
+  late = dict(sample_leads(6)[5], timestamp="2024-01-20T12:00:00")
+  await repo.add(late)
+  assert [lead["id"] for lead in await repo.get_all()] == [1, 2, 6, 3, 4, 5]
+  assert repo.read_manifest()["2024-01"]["count"] == 3
+  assert await repo.compact("2024-02") == ["2024-01"]
+  assert not (directory / "2024-01.jsonl.gz").exists()
+  assert [lead["id"] for lead in await repo.get_all()] == [1, 2, 6, 3, 4, 5]
+
+
+def import_record(index, **fields):
+  return {
+    "name": "Test",
+    "services": ["site"],
+    "description": "long description with enough words to pass validation for the test case",
+    "budget": "30-50k",
+    "contact_method": "email",
+    "email": f"import{index}@example.com",
+    **fields
+  }
+
+
+async def aiter_records(records):
+  for record in records:
+    yield record
+
+
+@pytest.mark.asyncio
+async def test_lead_service_import_leads(mock_leads_file, monkeypatch):
+  mock_leads_file.write_text(json.dumps([dict(sample_leads(1)[0], timestamp=datetime.now().isoformat())]), encoding="utf-8")
+  notifier = AsyncMock()
+  service = LeadService(notifier=notifier)
+  add_many = AsyncMock(wraps=service._repository.add_many)
+  monkeypatch.setattr(service._repository, "add_many", add_many)
+  records = [
+    import_record(1),
+    import_record(2, budget="1k"),
+    import_record(3, email="user1@example.com"),
+    import_record(4),
+    import_record(5, email="IMPORT1@example.com"),
+    "not json",
+    import_record(7, contact_method="telegram", email=None)
+  ]
+  result = await service.import_leads(aiter_records(records), batch_size=10)
+  assert result.imported == 2
+  assert result.ids == [2, 3]
+  assert result.duplicates == 2
+  assert [error.row for error in result.errors] == [2, 6, 7]
+  assert result.errors[0].error.startswith("budget:")
+  add_many.assert_awaited_once()
+  notifier.notify_many.assert_not_awaited()
+  stored = json.loads(mock_leads_file.read_text(encoding="utf-8"))
+  assert [lead["email"] for lead in stored[1:]] == ["import1@example.com", "import4@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_lead_service_import_keeps_timestamps_and_returning_contacts(mock_leads_file):
+  mock_leads_file.write_text(json.dumps([dict(sample_leads(1)[0], email="import1@example.com")]), encoding="utf-8")
+  service = LeadService(notifier=AsyncMock())
+  result = await service.import_leads(aiter_records([
+    import_record(1, timestamp="2024-03-05T10:00:00"),
+    import_record(1, timestamp="2024-03-05T10:01:00"),
+    import_record(2, timestamp="2024-03-05T07:00:00+00:00"),
+    import_record(3, timestamp="yesterday")
+  ]))
+  assert result.imported == 2
+  assert result.duplicates == 1
+  assert [error.row for error in result.errors] == [4]
+  assert result.errors[0].error.startswith("timestamp:")
+  stored = json.loads(mock_leads_file.read_text(encoding="utf-8"))
+  assert stored[1]["timestamp"] == "2024-03-05T10:00:00"
+  assert stored[2]["timestamp"] == datetime(2024, 3, 5, 7, tzinfo=timezone.utc).astimezone().replace(tzinfo=None).isoformat()
+
+
+@pytest.mark.asyncio
+async def test_lead_service_import_leads_batches_and_summary(mock_leads_file):
+  notifier = AsyncMock()
+  service = LeadService(notifier=notifier)
+  result = await service.import_leads(aiter_records([import_record(i) for i in range(5)]), notify=True, batch_size=2)
+  assert result.ids == [1, 2, 3, 4, 5]
+  assert result.errors == []
+  notifier.notify_many.assert_not_awaited()
+  notifier.notify_import.assert_awaited_once_with(result)
+  assert await service._id_allocator.next_id() == 6
+
+
+@pytest.mark.asyncio
+async def test_lead_service_stats_follow_adds_and_rebuild(mock_leads_file, monkeypatch):
+  monkeypatch.setattr(config, "stats_rebuild_interval", 0)
+  mock_leads_file.write_text(json.dumps(sample_leads(2)), encoding="utf-8")
+  service = LeadService(notifier=AsyncMock())
+  await service.start()
+  await service.import_leads(aiter_records([import_record(1), import_record(2, budget="500k+")]))
+  get_all = AsyncMock()
+  monkeypatch.setattr(JsonLeadRepository, "get_all", get_all)
+  stats = await service.get_stats(LeadStatsQuery())
+  get_all.assert_not_awaited()
+  assert stats.total == 4
+  assert stats.by_budget == {"30-50k": 3, "500k+": 1}
+  assert stats.by_contact_method["email"] == 3
+  monkeypatch.undo()
+  mock_leads_file.write_text(json.dumps(sample_leads(1)), encoding="utf-8")
+  await service.rebuild_stats()
+  assert (await service.get_stats(LeadStatsQuery())).by_day == {"2024-01-01": 1}
+  await service.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("storage", ["sqlite", "segmented", "jsonl"])
+async def test_repository_get_many(tmp_path, storage):
+  if storage == "sqlite":
+    repo = SqliteLeadRepository(str(tmp_path / "leads.sqlite3"))
+  elif storage == "segmented":
+    repo = SegmentedLeadRepository(str(tmp_path / "leads.segments"))
+  else:
+    repo = JsonLinesLeadRepository(str(tmp_path / "leads.jsonl"))
+  await repo.add_many(month_leads())
+  assert [lead["id"] for lead in await repo.get_many([5, 1, 42, 3])] == [5, 1, 3]
+  assert await repo.get_many([]) == []
+  await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_lead_service_search_leads(mock_leads_file, monkeypatch):
+  monkeypatch.setattr(config, "stats_rebuild_interval", 0)
+  service = LeadService(notifier=AsyncMock())
+  await service.start()
+  await service.import_leads(aiter_records([
+    import_record(1, description="Нужен телеграм бот для записи клиентов в салон красоты и напоминаний"),
+    import_record(2, description="Интернет магазин одежды с доставкой по всей России и оплатой картой"),
+    import_record(3, description="Два телеграм бота для поддержки клиентов и рассылки новостей магазина")
+  ]))
+  leads, total = await service.search_leads(LeadSearchQuery(q="телеграм боты", limit=1))
+  assert total == 2
+  assert [lead.id for lead in leads] == [3]
+  await service.close()
+
+  restarted = LeadService(notifier=AsyncMock())
+  await restarted.start()
+  leads, total = await restarted.search_leads(LeadSearchQuery(q="магазин"))
+  assert [lead.id for lead in leads] == [3, 2]
+  assert mock_leads_file.with_suffix(".search.jsonl").exists()
+  await restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_lead_service_search_and_stats_see_other_workers(mock_leads_file, monkeypatch):
+  monkeypatch.setattr(config, "stats_rebuild_interval", 0)
+  first, second = LeadService(notifier=AsyncMock()), LeadService(notifier=AsyncMock())
+  await first.start()
+  await second.start()
+  await first.import_leads(aiter_records([import_record(1, description="Нужен телеграм бот для записи клиентов в салон красоты и напоминаний")]))
+  await second.import_leads(aiter_records([import_record(2, description="Интернет магазин и телеграм бот для приёма заказов и доставки цветов")]))
+  for service in (first, second):
+    leads, total = await service.search_leads(LeadSearchQuery(q="телеграм бот"))
+    assert total == 2
+    assert [lead.id for lead in leads] == [2, 1]
+    assert (await service.get_stats(LeadStatsQuery())).total == 2
+  await first.rebuild_stats()
+  assert (await first.get_stats(LeadStatsQuery())).total == 2
+  await first.close()
+  await second.close()
@@ -0,0 +1,143 @@
+import asyncio
+import pytest
+import socket
+import aiosmtplib
+from email.mime.text import MIMEText
+from unittest.mock import AsyncMock, MagicMock
+from backend.smtp import SmtpConnectionPool
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+  clients = []
+
+  def factory(**kwargs):
+    client = MagicMock()
+    client.kwargs = kwargs
+    client.is_connected = True
+    client.connect = AsyncMock()
+    client.login = AsyncMock()
+    client.noop = AsyncMock()
+    client.send_message = AsyncMock()
+    client.quit = AsyncMock()
+    clients.append(client)
+    return client
+
+  monkeypatch.setattr("backend.smtp.aiosmtplib.SMTP", factory)
+  return clients
+
+
+def make_message():
+  msg = MIMEText("body", "plain", "utf-8")
+  msg["From"] = "from@test.com"
+  msg["To"] = "to@test.com"
+  msg["Subject"] = "Test"
+  return msg
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_reuses_connection(fake_smtp):
+  pool = SmtpConnectionPool("smtp.test.com", 465, "user", "pass")
+  for _ in range(3):
+    await pool.send_message(make_message())
+  assert len(fake_smtp) == 1
+  assert fake_smtp[0].kwargs == {"hostname": "smtp.test.com", "port": 465, "use_tls": True}
+  fake_smtp[0].login.assert_awaited_once_with("user", "pass")
+  assert fake_smtp[0].send_message.await_count == 3
+  await pool.close()
+  fake_smtp[0].quit.assert_awaited_once()
+  assert pool.idle == 0
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_idle_timeout(fake_smtp):
+  pool = SmtpConnectionPool("smtp.test.com", 465, idle_timeout=0)
+  await pool.send_message(make_message())
+  await pool.send_message(make_message())
+  assert pool.connects == 2
+  fake_smtp[0].quit.assert_awaited_once()
+  fake_smtp[0].login.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_reaps_idle_connections(fake_smtp):
+  pool = SmtpConnectionPool("smtp.test.com", 465, idle_timeout=0.05)
+  await pool.send_message(make_message())
+  assert pool.idle == 1
+  await asyncio.sleep(0.1)
+  assert pool.idle == 0
+  fake_smtp[0].quit.assert_awaited_once()
+  await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_closes_client_on_login_failure(fake_smtp, monkeypatch):
+  pool = SmtpConnectionPool("smtp.test.com", 465, "user", "wrong")
+  login = AsyncMock(side_effect=aiosmtplib.SMTPAuthenticationError(535, "bad credentials"))
+  original = aiosmtplib.SMTP
+
+  def factory(**kwargs):
+    client = original(**kwargs)
+    client.login = login
+    return client
+
+  monkeypatch.setattr("backend.smtp.aiosmtplib.SMTP", factory)
+  with pytest.raises(aiosmtplib.SMTPAuthenticationError):
+    await pool.send_message(make_message())
+  fake_smtp[0].close.assert_called_once()
+  assert pool.connects == 0
+  assert pool.idle == 0
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_health_check(fake_smtp):
+  pool = SmtpConnectionPool("smtp.test.com", 465, health_check_after=0)
+  await pool.send_message(make_message())
+  fake_smtp[0].noop.side_effect = aiosmtplib.SMTPResponseException(421, "timeout")
+  await pool.send_message(make_message())
+  assert pool.connects == 2
+  fake_smtp[1].send_message.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_reconnects_after_disconnect(fake_smtp):
+  pool = SmtpConnectionPool("smtp.test.com", 465)
+  await pool.send_message(make_message())
+  fake_smtp[0].send_message.side_effect = aiosmtplib.SMTPServerDisconnected("closed")
+  await pool.send_message(make_message())
+  assert pool.connects == 2
+  fake_smtp[1].send_message.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_with_local_server():
+  pytest.importorskip("aiosmtpd")
+  from aiosmtpd.controller import Controller
+  from aiosmtpd.smtp import AuthResult
+
+  class Handler:
+    def __init__(self):
+      self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+      self.messages.append(envelope)
+      return "250 OK"
+
+  with socket.socket() as sock:
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+  handler = Handler()
+  controller = Controller(
+    handler, hostname="127.0.0.1", port=port, auth_require_tls=False,
+    authenticator=lambda *args: AuthResult(success=True)
+  )
+  controller.start()
+  try:
+    pool = SmtpConnectionPool("127.0.0.1", port, "user", "pass", use_tls=False)
+    for _ in range(3):
+      await pool.send_message(make_message())
+    await pool.close()
+  finally:
+    controller.stop()
+  assert len(handler.messages) == 3
+  assert pool.connects == 1